@@ -0,0 +1,51 @@
+"""
+Reports, for every persona in personas/agents, how many prompt tokens each persona encoding takes.
+
+Usage: python scripts/persona_token_report.py [--agents-dir personas/agents]
+"""
+import sys
+import json
+import argparse
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from tinytroupe.agent.context_window import count_tokens
+from tinytroupe.agent.persona_encoding import encode_persona, PERSONA_ENCODINGS
+
+# Root path for all relative project assets
+ROOT = Path(__file__).parent.parent.absolute()
+
+
+def persona_token_report(agents_dir) -> list:
+    """
+    Returns one row per persona file: its name and the token count of each encoding.
+    """
+    rows = []
+    for path in sorted(Path(agents_dir).glob("*.agent.json")):
+        with open(path, "r", encoding="utf-8") as f:
+            persona = json.load(f).get("persona", {})
+        rows.append({"file": path.name, **{encoding: count_tokens(encode_persona(persona, encoding)) for encoding in PERSONA_ENCODINGS}})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Token cost of each persona encoding.")
+    parser.add_argument("--agents-dir", default=str(ROOT / "personas" / "agents"))
+    args = parser.parse_args()
+
+    rows = persona_token_report(args.agents_dir)
+
+    print(f"{'persona':<40} {'json':>8} {'compact':>8} {'outline':>8} {'delta':>8}")
+    for row in rows:
+        delta = row["outline"] - row["json"]
+        print(f"{row['file']:<40} {row['json']:>8} {row['compact_json']:>8} {row['outline']:>8} {delta:>+8} ({delta / row['json']:+.0%})")
+
+    totals = {encoding: sum(row[encoding] for row in rows) for encoding in PERSONA_ENCODINGS}
+    delta = totals["outline"] - totals["json"]
+    print(f"{'TOTAL':<40} {totals['json']:>8} {totals['compact_json']:>8} {totals['outline']:>8} {delta:>+8} ({delta / totals['json']:+.0%})")
+
+
+if __name__ == "__main__":
+    main()
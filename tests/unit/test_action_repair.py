@@ -0,0 +1,107 @@
+import json
+import pytest
+from unittest.mock import patch
+from tinytroupe.agent import TinyPerson
+from tinytroupe.agent.action_repair import repair_cognitive_action
+from tinytroupe.cost_manager import cost_manager
+
+PREVIOUS = {"goals": "Secure the corridor.", "attention": "The envoy.", "emotions": "Wary", "emotional_intensity": 0.6}
+
+def test_valid_message_needs_no_repair():
+    message = {"action": {"type": "TALK", "content": "No.", "target": "everyone"},
+               "cognitive_state": {"goals": "g", "attention": "a", "emotions": "e", "emotional_intensity": 0.4}}
+
+    repaired, repairs = repair_cognitive_action(message, PREVIOUS)
+
+    assert repairs == []
+    assert repaired["action"] == message["action"]
+
+def test_missing_cognitive_state_fields_carry_over():
+    message = {"action": {"type": "TALK", "content": "No.", "target": "everyone"},
+               "cognitive_state": {"goals": "New goal.", "emotions": "Angry"}}
+
+    repaired, repairs = repair_cognitive_action(message, PREVIOUS)
+
+    assert repaired["cognitive_state"] == {"goals": "New goal.", "attention": "The envoy.", "emotions": "Angry", "emotional_intensity": 0.6}
+    assert "cognitive_state.attention" in repairs
+
+def test_types_are_coerced():
+    message = {"action": {"type": "talk", "content": ["We", "refuse."], "target": None},
+               "cognitive_state": {"goals": ["Hold", "Win"], "attention": "a", "emotions": "e", "emotional_intensity": "70%"}}
+
+    repaired, _ = repair_cognitive_action(message, PREVIOUS)
+
+    assert repaired["action"] == {"type": "TALK", "content": "We; refuse.", "target": ""}
+    assert repaired["cognitive_state"]["goals"] == "Hold; Win"
+    assert repaired["cognitive_state"]["emotional_intensity"] == pytest.approx(0.7)
+
+@pytest.mark.parametrize("intensity, expected", [("8", 0.8), (85, 0.85), (-1, 0.0), ("very", 0.6)])
+def test_intensity_scales(intensity, expected):
+    message = {"action": {"type": "DONE", "content": "", "target": ""}, "cognitive_state": {"emotional_intensity": intensity}}
+    assert repair_cognitive_action(message, PREVIOUS)[0]["cognitive_state"]["emotional_intensity"] == pytest.approx(expected)
+
+def test_bare_actions_are_wrapped():
+    assert repair_cognitive_action({"type": "DONE"}, PREVIOUS)[0]["action"]["type"] == "DONE"
+    assert repair_cognitive_action({"action": "done"}, PREVIOUS)[0]["action"]["type"] == "DONE"
+    assert [a["type"] for a in repair_cognitive_action({"actions": ["THINK", {"type": "TALK", "content": "Hi"}]}, PREVIOUS)[0]["actions"]] == ["THINK", "TALK"]
+
+@pytest.mark.parametrize("message", [{}, {"cognitive_state": {}}, {"action": "I refuse to answer."}, [], None])
+def test_messages_without_actions_are_unrecoverable(message):
+    assert repair_cognitive_action(message, PREVIOUS)[0] is None
+
+def test_single_actions_are_required_outside_batches():
+    single = {"actions": [{"type": "TALK", "content": "No.", "target": "everyone"}]}
+    batch = {"actions": ["THINK", "DONE"]}
+
+    repaired, repairs = repair_cognitive_action(single, PREVIOUS, batch=False)
+    assert repaired["action"] == single["actions"][0] and "actions" not in repaired
+    assert "actions" in repairs
+
+    assert repair_cognitive_action(batch, PREVIOUS, batch=False)[0] is None
+    assert len(repair_cognitive_action(batch, PREVIOUS)[0]["actions"]) == 2
+
+def test_agent_takes_a_single_batched_action_and_retries_batches():
+    agent = TinyPerson("SingleAction")
+    cost_manager.reset()
+
+    with patch("tinytroupe.openai_utils.client") as mock_client_func:
+        mock_client_func.return_value.send_message.side_effect = [
+            {"role": "assistant", "content": json.dumps({"actions": ["THINK", "DONE"]})},
+            {"role": "assistant", "content": json.dumps({"actions": [{"type": "DONE", "content": "", "target": ""}]})},
+        ]
+        actions = agent.act(return_actions=True)
+
+    assert mock_client_func.return_value.send_message.call_count == 2
+    assert actions[0]["action"]["type"] == "DONE"
+    assert cost_manager.get_summary()["response_repairs"] == {"valid": 0, "repaired": 1, "retries": 1, "failed": 0}
+    cost_manager.reset()
+
+def test_agent_repairs_locally_and_only_retries_unrecoverable_output():
+    agent = TinyPerson("Repaired")
+    agent.listen("Your answer?")
+    cost_manager.reset()
+
+    with patch("tinytroupe.openai_utils.client") as mock_client_func:
+        mock_client_func.return_value.send_message.side_effect = [
+            {"role": "assistant", "content": "I cannot comply."},
+            {"role": "assistant", "content": json.dumps({"action": {"type": "TALK", "content": "Fine.", "target": "everyone"}})},
+        ]
+        actions = agent.act(return_actions=True)
+
+    assert mock_client_func.return_value.send_message.call_count == 2
+    assert actions[0]["action"]["content"] == "Fine."
+    assert cost_manager.get_summary()["response_repairs"] == {"valid": 0, "repaired": 1, "retries": 1, "failed": 0}
+    cost_manager.reset()
+
+def test_agent_gives_up_after_bounded_retries():
+    agent = TinyPerson("Unrepairable")
+    cost_manager.reset()
+
+    with patch("tinytroupe.openai_utils.client") as mock_client_func:
+        mock_client_func.return_value.send_message.return_value = {"role": "assistant", "content": "No JSON here."}
+        actions = agent.act(return_actions=True)
+
+    assert mock_client_func.return_value.send_message.call_count == TinyPerson.MAX_UNRECOVERABLE_RESPONSE_RETRIES + 1
+    assert "remains silent" in actions[0]["action"]["content"]
+    assert cost_manager.get_summary()["response_repairs"]["failed"] == 1
+    cost_manager.reset()
@@ -0,0 +1,78 @@
+import json
+import pytest
+from unittest.mock import patch
+from tinytroupe.agent import TinyPerson
+from tinytroupe.environment import TinyWorld
+from tinytroupe.environment.batched_turns import build_batched_turn_messages, per_agent_prompt_tokens
+
+def _turn(agent, content, target="everyone"):
+    return {"agent": agent,
+            "actions": [{"type": "TALK", "content": content, "target": target}],
+            "cognitive_state": {"goals": "Win.", "attention": "The talks.", "emotions": "Resolute", "emotional_intensity": 0.7}}
+
+@pytest.fixture
+def summit():
+    TinyPerson.clear_agents()
+    TinyWorld.clear_environments()
+    TinyPerson.communication_display = False
+    TinyWorld.communication_display = False
+    agents = [TinyPerson(f"Envoy {i}") for i in range(3)]
+    for agent in agents:
+        agent.define("occupation", {"title": "Envoy", "description": "Negotiates at length. " * 50})
+    world = TinyWorld("Batched Summit", agents, batch_turns=True)
+    world.broadcast("The summit is open. State your positions.")
+    yield world
+    TinyPerson.communication_display = True
+    TinyWorld.communication_display = True
+    TinyPerson.clear_agents()
+    TinyWorld.clear_environments()
+
+def test_shared_scene_is_written_once(summit):
+    prompt = build_batched_turn_messages(summit, summit.agents)[0]["content"]
+
+    assert prompt.count("The summit is open. State your positions.") == 1
+    for agent in summit.agents:
+        assert f"#### {agent.name}" in prompt
+
+def test_one_call_generates_the_turns_of_all_agents(summit):
+    response = {"turns": [_turn("Envoy 0", "We demand the port."), _turn("Envoy 1", "Never.", target="Envoy 0"),
+                          _turn("Envoy 2", "Let us talk.")]}
+
+    with patch("tinytroupe.openai_utils.client") as mock_client_func:
+        mock_client_func.return_value.send_message.return_value = {"role": "assistant", "content": json.dumps(response)}
+        actions = summit.run(1, return_actions=True)[0]
+
+    assert mock_client_func.return_value.send_message.call_count == 1
+    assert actions["Envoy 1"][0]["action"]["content"] == "Never."
+
+    # actions go through the agents' usual path: memory, cognitive state, and the environment's handlers
+    envoy_0, envoy_1, _ = summit.agents
+    said = [episode["content"]["action"]["content"] for episode in envoy_1.episodic_memory.retrieve_recent(include_omission_info=False)
+            if episode["type"] == "action"]
+    assert said == ["Never."]
+    assert envoy_1._mental_state["emotions"] == "Resolute"
+    heard = [stimulus["content"] for episode in envoy_0.episodic_memory.retrieve_recent(include_omission_info=False)
+             for stimulus in episode["content"].get("stimuli", [])]
+    assert "Never." in heard
+
+    report = summit._last_batch_reports[0]
+    assert report["generated"] == 3
+
+    # the comparison with per-agent calls is computed on demand, without rebuilding the agents' prompts
+    current_messages = [list(agent.current_messages) for agent in summit.agents]
+    assert report["batched_prompt_tokens"] < per_agent_prompt_tokens(summit.agents)
+    assert [agent.current_messages for agent in summit.agents] == current_messages
+
+def test_agents_missing_from_the_batch_act_on_their_own(summit):
+    batched = {"turns": [_turn("Envoy 0", "We demand the port."), _turn("Envoy 1", "Never.")]}
+    single = {"action": {"type": "DONE", "content": "", "target": ""},
+              "cognitive_state": {"goals": "g", "attention": "a", "emotions": "Calm"}}
+
+    with patch("tinytroupe.openai_utils.client") as mock_client_func:
+        mock_client_func.return_value.send_message.side_effect = [
+            {"role": "assistant", "content": json.dumps(batched)},
+            {"role": "assistant", "content": json.dumps(single)}]
+        actions = summit.run(1, return_actions=True)[0]
+
+    assert mock_client_func.return_value.send_message.call_count == 2
+    assert actions["Envoy 2"][0]["action"]["type"] == "DONE"
@@ -0,0 +1,90 @@
+import os
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+from tinytroupe.agent.bm25 import BM25Index, chunk_text
+from tinytroupe.agent.grounding import LocalFilesGroundingConnector
+from tinytroupe.agent.mental_faculty import FilesAndWebGroundingFaculty
+
+def _write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+
+@pytest.fixture
+def corpus(tmp_path):
+    _write(tmp_path / "data" / "facts" / "nile.txt", "The Grand Ethiopian Renaissance Dam regulates the Blue Nile.\n\nEgypt disputes the filling schedule.")
+    _write(tmp_path / "data" / "trade" / "tariffs.md", "Steel tariffs were raised to 25 percent.\n\nThe WTO panel is reviewing the case.")
+    _write(tmp_path / "data" / "ignored.json", "{}")
+    return tmp_path / "data"
+
+def test_chunk_text_respects_paragraphs_and_size():
+    text = "First paragraph.\n\nSecond paragraph.\n\n" + "word " * 400
+    chunks = chunk_text(text, chunk_size=100)
+    assert chunks[0] == "First paragraph.\n\nSecond paragraph."
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    assert "".join(chunks[1:]).replace(" ", "") == ("word" * 400)
+
+def test_bm25_ranks_and_replaces_sources():
+    index = BM25Index()
+    index.add_source("a", ["the dam on the nile", "fishing rights"])
+    index.add_source("b", ["steel tariffs and trade", "nile river trade"])
+
+    assert index.search("nile dam", top_k=1)[0][:2] == ("a", "the dam on the nile")
+
+    index.add_source("a", ["nothing relevant"])
+    assert len(index) == 3
+    assert all(source == "b" for source, _, _ in index.search("nile dam", top_k=5))
+
+    index.remove_source("b")
+    assert index.search("nile", top_k=5) == []
+
+def test_connector_indexes_folder_recursively(corpus):
+    connector = LocalFilesGroundingConnector(folders_paths=[str(corpus)])
+
+    assert sorted(os.path.basename(s) for s in connector.list_sources()) == ["nile.txt", "tariffs.md"]
+
+    results = connector.retrieve_relevant("filling of the dam", top_k=1)
+    assert len(results) == 1
+    assert results[0].startswith("SOURCE: " + str(corpus / "facts" / "nile.txt"))
+    assert "Egypt disputes" in results[0]
+
+    assert "WTO panel" in connector.retrieve_by_name("tariffs.md")[0]
+    assert connector.retrieve_by_name("missing.txt") == []
+
+def test_persisted_index_reindexes_only_changed_files(corpus, tmp_path):
+    index_path = str(tmp_path / "index" / "grounding.json")
+    LocalFilesGroundingConnector(folders_paths=[str(corpus)], index_path=index_path)
+    assert os.path.exists(index_path)
+
+    # unchanged files are not read again
+    reloaded = LocalFilesGroundingConnector(folders_paths=[str(corpus)], index_path=index_path)
+    with patch("builtins.open", side_effect=AssertionError("file re-read")):
+        reloaded.add_folder(str(corpus))
+
+    # a modified file is re-indexed, and a deleted one dropped
+    nile = corpus / "facts" / "nile.txt"
+    nile.write_text("Sudan mediates the talks on the reservoir.", encoding="utf-8")
+    os.utime(nile, (time.time() + 10, time.time() + 10))
+    os.remove(corpus / "trade" / "tariffs.md")
+
+    updated = LocalFilesGroundingConnector(folders_paths=[str(corpus)], index_path=index_path)
+    assert [os.path.basename(s) for s in updated.list_sources()] == ["nile.txt"]
+    assert "Sudan mediates" in updated.retrieve_relevant("reservoir talks", top_k=1)[0]
+
+def test_search_documents_action(corpus):
+    faculty = FilesAndWebGroundingFaculty(folders_paths=[str(corpus)])
+    agent = MagicMock()
+
+    assert faculty.process_action(agent, {"type": "SEARCH_DOCUMENTS", "content": "steel tariffs", "target": ""})
+    thought = agent.think.call_args[0][0]
+    assert "Steel tariffs were raised" in thought
+
+def test_grounding_briefing_keeps_documents_out_of_memory(corpus):
+    from tinytruce_sim import grounding_briefing
+
+    nile = str(corpus / "facts" / "nile.txt")
+    briefing = grounding_briefing("SCENARIO INTEL", [nile])
+
+    assert "nile.txt: The Grand Ethiopian Renaissance Dam regulates the Blue Nile." in briefing
+    assert "filling schedule" not in briefing
+    assert "SEARCH_DOCUMENTS" in briefing
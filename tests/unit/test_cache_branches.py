@@ -0,0 +1,97 @@
+import json
+import pytest
+from unittest.mock import MagicMock, patch
+from tinytroupe.control import Simulation, Transaction
+
+def _step(i):
+    return i
+
+def _started_simulation():
+    sim = Simulation(id="branch_test")
+    sim.status = Simulation.STATUS_STARTED
+    return sim
+
+def _run_branch(sim, obj, steps):
+    """
+    Replays a fresh execution of the given steps, from the root of the cache tree.
+    """
+    sim.execution_trace = []
+    return [Transaction(obj, sim, _step, i).execute() for i in steps]
+
+@pytest.fixture
+def obj():
+    obj = MagicMock()
+    obj.simulation_id = "branch_test"
+    return obj
+
+def test_divergent_branches_coexist_and_share_prefix(obj):
+    """
+    Verifies that diverging from a cached prefix keeps the earlier branch and replays the shared prefix.
+    """
+    sim = _started_simulation()
+
+    with patch.object(sim, '_decode_simulation_state'), \
+         patch.object(sim, '_encode_simulation_state', return_value={}):
+        _run_branch(sim, obj, [1, 2, 3, 4])
+        assert sim.cache_misses == 4
+
+        # variant shares the first two steps
+        _run_branch(sim, obj, [1, 2, 30, 40])
+        assert sim.cache_hits == 2
+        assert sim.cache_misses == 6
+        assert len(sim.cache_tree) == 6
+
+        # both variants now replay entirely from cache
+        _run_branch(sim, obj, [1, 2, 3, 4])
+        _run_branch(sim, obj, [1, 2, 30, 40])
+        assert sim.cache_misses == 6
+        assert sim.cache_hits == 10
+
+    branches = sim.list_branches()
+    assert len(branches) == 2
+    assert all(b["length"] == 4 for b in branches)
+    assert branches[0]["fork_point"] == branches[1]["fork_point"] is not None
+    assert [b["current"] for b in branches].count(True) == 1
+
+def test_prune_branch_keeps_shared_nodes(obj):
+    sim = _started_simulation()
+
+    with patch.object(sim, '_decode_simulation_state'), \
+         patch.object(sim, '_encode_simulation_state', return_value={}):
+        _run_branch(sim, obj, [1, 2, 3])
+        _run_branch(sim, obj, [1, 2, 30])
+
+    current_leaf = sim.execution_trace[-1]
+    other_leaf = [b["leaf"] for b in sim.list_branches() if b["leaf"] != current_leaf][0]
+
+    with pytest.raises(ValueError):
+        sim.prune_branch(current_leaf)
+
+    assert sim.prune_branch(other_leaf) == 1
+    assert len(sim.cache_tree) == 3
+    assert len(sim.list_branches()) == 1
+
+def test_cache_file_roundtrip_and_legacy_format(obj, tmp_path):
+    sim = _started_simulation()
+    with patch.object(sim, '_decode_simulation_state'), \
+         patch.object(sim, '_encode_simulation_state', return_value={"k": 1}):
+        _run_branch(sim, obj, [1, 2])
+        _run_branch(sim, obj, [1, 5])
+
+    path = str(tmp_path / "tree.cache.json")
+    sim._save_cache_file(path)
+
+    reloaded = Simulation(id="reloaded")
+    reloaded._load_cache_file(path)
+    assert reloaded.cache_tree == {k: tuple(v) for k, v in json.loads(json.dumps(sim.cache_tree)).items()}
+
+    # a version 1 (linear) cache file, with its str((function_name, args, kwargs)) event hashes, can't be matched anymore
+    legacy_path = str(tmp_path / "legacy.cache.json")
+    legacy_trace = [[None, str(("_step", (i,), {})), {"type": "JSON", "value": i}, {}] for i in range(3)]
+    with open(legacy_path, "w") as f:
+        json.dump(legacy_trace, f)
+
+    legacy = Simulation(id="legacy")
+    with pytest.raises(ValueError, match="cache format changed"):
+        legacy._load_cache_file(legacy_path)
+    assert legacy.cache_tree == {}
@@ -0,0 +1,223 @@
+import pytest
+from unittest.mock import MagicMock, patch
+from tinytroupe.agent import TinyPerson
+from tinytroupe.agent.context_window import ContextWindowManager, MemorySummarizer, episode_tokens, count_tokens, messages_tokens
+from tinytruce_sim import compress_agent_memory
+
+class FakeSummarizer(MemorySummarizer):
+    def __init__(self):
+        self.summarized = []
+
+    def summarize(self, episodes):
+        self.summarized.append([e["content"] for e in episodes])
+        return f"Summary of {len(episodes)} episodes."
+
+    def condense(self, anchors):
+        return "Condensed."
+
+def _fill(agent, contents):
+    for content in contents:
+        agent.store_in_memory({"role": "user", "content": content, "type": "stimulus", "simulation_timestamp": None})
+
+def test_episodes_are_weighed_by_tokens():
+    short = {"role": "assistant", "content": "Fine."}
+    long = {"role": "assistant", "content": "grounding " * 2000}
+    assert episode_tokens(long) > 100 * episode_tokens(short)
+    assert count_tokens("") == 0
+
+def test_nothing_is_evicted_within_budget():
+    agent = TinyPerson("WithinBudget")
+    _fill(agent, [f"Turn {i}" for i in range(30)])
+    summarizer = FakeSummarizer()
+
+    report = ContextWindowManager(token_budget=100_000, summarizer=summarizer).manage(agent)
+
+    assert report["evicted_episodes"] == 0
+    assert agent.episodic_memory.count() == 30
+    assert summarizer.summarized == []
+
+def test_over_budget_evicts_oldest_unpinned_episodes():
+    agent = TinyPerson("OverBudget")
+    _fill(agent, ["LAYER 0 GROUNDING " + "identity " * 3000])
+    agent.episodic_memory.pin()
+    _fill(agent, [f"Speech {i}: " + "words " * 400 for i in range(10)])
+
+    manager = ContextWindowManager(keep_recent=2, summarizer=FakeSummarizer())
+    manager.token_budget = manager.prompt_tokens(agent) - 1000
+
+    report = manager.manage(agent)
+
+    memory = agent.episodic_memory
+    assert report["evicted_episodes"] > 0
+    assert report["tokens_after"] <= manager.token_budget * manager.target_ratio
+    assert memory.memory[0]["content"].startswith("LAYER 0 GROUNDING")
+    assert memory.pinned_length == 1
+    assert memory.memory[1]["content"].startswith(f"Speech {report['evicted_episodes']}:")
+    assert agent._episodic_anchors == [f"Summary of {report['evicted_episodes']} episodes."]
+
+def test_prompt_tokens_do_not_render_the_prompt_again():
+    agent = TinyPerson("NoRender")
+    _fill(agent, [f"Turn {i}" for i in range(5)])
+    manager = ContextWindowManager(token_budget=100_000, summarizer=FakeSummarizer())
+    tokens = manager.prompt_tokens(agent)
+
+    with patch.object(agent, "generate_agent_system_prompt", wraps=agent.generate_agent_system_prompt) as render:
+        # stimuli stored since the last render are counted all the same
+        _fill(agent, ["A new stimulus."])
+        report = manager.manage(agent)
+
+    assert render.call_count == 0
+    assert report["tokens_before"] == tokens + episode_tokens({"content": "A new stimulus."})
+
+    agent.reset_prompt()
+    assert report["tokens_before"] == messages_tokens(agent.current_messages)
+
+def test_pinned_and_recent_episodes_are_never_evicted():
+    agent = TinyPerson("AllPinned")
+    _fill(agent, ["grounding " * 1000] * 3)
+    agent.episodic_memory.pin()
+    _fill(agent, ["recent " * 1000] * 2)
+
+    report = ContextWindowManager(token_budget=10, keep_recent=2, summarizer=FakeSummarizer()).manage(agent)
+
+    assert report["evicted_episodes"] == 0
+    assert agent.episodic_memory.count() == 5
+
+def test_failed_summarization_keeps_memory():
+    agent = TinyPerson("FailedSummary")
+    _fill(agent, ["words " * 500] * 10)
+    summarizer = MagicMock()
+    summarizer.summarize.side_effect = RuntimeError("LLM unavailable")
+
+    report = ContextWindowManager(token_budget=100, summarizer=summarizer).manage(agent)
+
+    assert report["evicted_episodes"] == 0
+    assert agent.episodic_memory.count() == 10
+
+def test_unanswered_summarization_keeps_memory_and_is_retried(tmp_path):
+    agent = TinyPerson("NoAnswer")
+    _fill(agent, ["words " * 500] * 10)
+    manager = ContextWindowManager(token_budget=100, keep_recent=2,
+                                   summarizer=MemorySummarizer(str(tmp_path / "summaries.jsonl")))
+
+    with patch("tinytroupe.openai_utils.client") as mock_client_func:
+        # e.g., the request deadline was exceeded
+        mock_client_func.return_value.send_message.return_value = None
+        report = manager.manage(agent)
+
+        assert report["evicted_episodes"] == 0
+        assert agent.episodic_memory.count() == 10 and agent._episodic_anchors == []
+
+        # nothing was memoized, so the next manage asks again
+        mock_client_func.return_value.send_message.return_value = {"content": "Summary."}
+        report = manager.manage(agent)
+
+    assert report["evicted_episodes"] > 0
+    assert agent._episodic_anchors == ["Summary."]
+
+def test_unanswered_background_summarization_keeps_memory():
+    agent = TinyPerson("NoAnswerBackground")
+    _fill(agent, ["words " * 500] * 10)
+    summarizer = FakeSummarizer()
+    summarizer.summarize = lambda episodes: None
+    manager = ContextWindowManager(token_budget=100, keep_recent=2, summarizer=summarizer, background=True)
+
+    manager.manage(agent)
+    report = manager.manage(agent)
+    manager.close()
+
+    assert report["evicted_episodes"] == 0
+    assert agent.episodic_memory.count() == 10 and agent._episodic_anchors == []
+
+def test_unanswered_condensing_keeps_the_anchors():
+    agent = TinyPerson("NoCondensing")
+    agent._episodic_anchors = ["a", "b", "c"]
+    _fill(agent, ["words"] * 6)
+    summarizer = FakeSummarizer()
+    summarizer.condense = lambda anchors: None
+
+    assert ContextWindowManager(summarizer=summarizer, max_anchors=3).compact(agent, 0, 2)
+
+    assert agent._episodic_anchors == ["a", "b", "c", "Summary of 2 episodes."]
+
+def test_anchors_are_condensed():
+    agent = TinyPerson("Condensed")
+    agent._episodic_anchors = ["a", "b", "c"]
+    _fill(agent, ["words"] * 6)
+
+    ContextWindowManager(summarizer=FakeSummarizer(), max_anchors=3).compact(agent, 0, 2)
+
+    assert agent._episodic_anchors == ["Condensed."]
+
+def test_fixed_count_policy_skips_pinned_episodes():
+    agent = TinyPerson("FixedCount")
+    _fill(agent, ["Layer 0"])
+    agent.episodic_memory.pin()
+    _fill(agent, [f"Turn {i}" for i in range(9)])
+
+    with patch("tinytroupe.openai_utils.client") as mock_client_func:
+        mock_client_func.return_value.send_message.return_value = {"content": "Summary."}
+        compress_agent_memory([agent], window_size=8, prune_count=4)
+
+    assert [e["content"] for e in agent.episodic_memory.memory][:2] == ["Layer 0", "Turn 4"]
+
+def test_prompt_tokens_are_recorded_per_turn():
+    agent = TinyPerson("Reported")
+    agent.listen("Hello there.")
+
+    with patch("tinytroupe.openai_utils.client") as mock_client_func:
+        mock_client_func.return_value.send_message.return_value = {
+            "role": "assistant",
+            "content": '{"action": {"type": "DONE", "content": "", "target": ""}, "cognitive_state": {"goals": "g", "attention": "a", "emotions": "calm"}}'}
+        agent.act()
+
+    # the system message plus, at least, the stimulus
+    assert agent._last_prompt_tokens > count_tokens(agent._init_system_message) + count_tokens("Hello there.")
+
+def test_background_compaction_is_swapped_in_at_the_next_safe_point():
+    agent = TinyPerson("Background")
+    _fill(agent, [f"Speech {i}: " + "words " * 400 for i in range(10)])
+    manager = ContextWindowManager(keep_recent=2, summarizer=FakeSummarizer(), background=True)
+    manager.token_budget = manager.prompt_tokens(agent) - 1000
+
+    report = manager.manage(agent)
+    pending = report["pending_episodes"]
+
+    # the agent keeps acting on its full memory meanwhile
+    assert pending > 0 and report["evicted_episodes"] == 0
+    assert agent.episodic_memory.count() == 10 and agent._episodic_anchors == []
+    _fill(agent, ["A new stimulus."])
+
+    report = manager.manage(agent)
+    manager.close()
+
+    assert report["evicted_episodes"] == pending
+    assert agent.episodic_memory.count() == 11 - pending
+    assert agent._episodic_anchors == [f"Summary of {pending} episodes."]
+
+def test_background_compaction_is_discarded_if_memory_changed():
+    agent = TinyPerson("Changed")
+    _fill(agent, [f"Speech {i}: " + "words " * 400 for i in range(10)])
+    manager = ContextWindowManager(token_budget=100, keep_recent=2, summarizer=FakeSummarizer(), background=True)
+
+    manager.manage(agent)
+    agent.episodic_memory.delete_episodes(0, 1)
+    manager.manage(agent)
+    manager.close()
+
+    assert agent._episodic_anchors == []
+    assert agent.episodic_memory.count() == 9
+
+def test_summaries_are_memoized_by_episode_hash(tmp_path):
+    cache_path = str(tmp_path / "summaries.jsonl")
+    episodes = [{"role": "user", "content": "The border talks stalled."}]
+
+    with patch("tinytroupe.openai_utils.client") as mock_client_func:
+        mock_client_func.return_value.send_message.return_value = {"content": "Talks stalled."}
+        assert MemorySummarizer(cache_path).summarize(episodes) == "Talks stalled."
+
+        # a new summarizer, e.g. when resuming a simulation, reads the summary back instead of asking the LLM
+        assert MemorySummarizer(cache_path).summarize([dict(e) for e in episodes]) == "Talks stalled."
+        assert MemorySummarizer(cache_path).summarize(episodes + episodes) == "Talks stalled."
+
+    assert mock_client_func.return_value.send_message.call_count == 2
@@ -0,0 +1,74 @@
+import os
+import pytest
+from unittest.mock import patch
+import docx
+from tinytroupe.agent.ingestion import DocumentIngestor, normalize_text, list_documents
+from tinytroupe.agent.grounding import LocalFilesGroundingConnector
+from tinytroupe.agent.memory import SemanticMemory
+
+@pytest.fixture
+def documents(tmp_path):
+    folder = tmp_path / "docs"
+    (folder / "reports").mkdir(parents=True)
+    (folder / "brief.txt").write_text("Border  talks\r\n\r\n\r\n\r\nresume   on Monday.", encoding="utf-8")
+    (folder / "notes.md").write_text("# Notes\n\nThe delegation arrives by train.", encoding="utf-8")
+
+    report = docx.Document()
+    report.add_paragraph("Annual report on desalination plants.")
+    report.add_paragraph("Capacity doubled in the northern region.")
+    report.save(str(folder / "reports" / "annual.docx"))
+
+    (folder / "image.png").write_bytes(b"\x89PNG")
+    return folder
+
+def test_normalize_text():
+    assert normalize_text("a  \t b\r\n\r\n\r\n\r\n  c ") == "a b\n\nc"
+
+def test_ingest_parses_supported_formats_in_parallel(documents, tmp_path):
+    ingestor = DocumentIngestor(cache_dir=str(tmp_path / "cache"), max_workers=2)
+    chunks = ingestor.ingest_folder(str(documents))
+
+    assert sorted(os.path.basename(p) for p in chunks) == ["annual.docx", "brief.txt", "notes.md"]
+    assert chunks[str(documents / "brief.txt")] == ["Border talks\n\nresume on Monday."]
+    assert "Capacity doubled" in chunks[str(documents / "reports" / "annual.docx")][0]
+
+def test_reingestion_skips_parsing_unchanged_contents(documents, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    first = DocumentIngestor(cache_dir=cache_dir).ingest_folder(str(documents))
+
+    # a copy with a different name, but the same contents, is not parsed either
+    copy_path = documents / "brief_copy.txt"
+    copy_path.write_bytes((documents / "brief.txt").read_bytes())
+
+    with patch.object(DocumentIngestor, '_parse', return_value={}) as mock_parse:
+        second = DocumentIngestor(cache_dir=cache_dir).ingest_folder(str(documents))
+
+    mock_parse.assert_called_once_with([])
+    assert second[str(copy_path)] == first[str(documents / "brief.txt")]
+
+def test_list_documents_requires_existing_folder(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        list_documents(str(tmp_path / "missing"))
+
+def test_grounding_connector_indexes_docx(documents, tmp_path):
+    connector = LocalFilesGroundingConnector(folders_paths=[str(documents)], index_path=str(tmp_path / "index" / "grounding.json"))
+
+    assert "desalination" in connector.retrieve_relevant("desalination capacity", top_k=1)[0]
+    assert os.path.isdir(tmp_path / "index" / "extracted_text")
+
+def test_semantic_memory_reads_documents(documents, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    memory = SemanticMemory()
+    memory.add_documents_path(str(documents))
+
+    assert "annual.docx" in memory.semantic_grounding_connector.list_sources()
+    assert "desalination" in memory.retrieve_relevant("desalination plants", top_k=1)[0]
+
+    # documents are re-ingested, from the text cache, once a loaded memory is used, and not when it is decoded
+    with patch.object(DocumentIngestor, "ingest", autospec=True, side_effect=DocumentIngestor.ingest) as ingest:
+        restored = SemanticMemory.from_json(memory.to_json())
+        ingest.assert_not_called()
+
+        assert restored.count() == memory.count()
+        assert "desalination" in restored.retrieve_relevant("desalination plants", top_k=1)[0]
+    assert ingest.call_count == 1
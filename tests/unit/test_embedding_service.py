@@ -0,0 +1,74 @@
+import copy
+import numpy as np
+import pytest
+from unittest.mock import MagicMock, patch
+from tinytroupe.agent.embeddings import EmbeddingService, EmbeddingCache, HashedNGramEmbedder, APIEmbedder
+
+class CountingEmbedder(HashedNGramEmbedder):
+    def __init__(self):
+        super().__init__(dimensions=64)
+        self.batches = []
+
+    def embed(self, texts):
+        self.batches.append(list(texts))
+        return super().embed(texts)
+
+def test_batches_and_deduplicates_requests():
+    embedder = CountingEmbedder()
+    service = EmbeddingService(embedder, batch_size=2)
+
+    texts = ["alpha", "beta", "alpha", "gamma", "beta"]
+    vectors = service.embed(texts)
+
+    assert vectors.shape == (5, 64)
+    assert embedder.batches == [["alpha", "beta"], ["gamma"]]
+    assert np.allclose(vectors[0], vectors[2])
+
+def test_disk_cache_is_reused_across_services(tmp_path):
+    first_embedder = CountingEmbedder()
+    first = EmbeddingService(first_embedder, cache_dir=str(tmp_path), batch_size=8)
+    original = first.embed(["persona text", "grounding chunk"])
+
+    second_embedder = CountingEmbedder()
+    second = EmbeddingService(second_embedder, cache_dir=str(tmp_path), batch_size=8)
+    cached = second.embed(["grounding chunk", "persona text", "new memory"])
+
+    assert second_embedder.batches == [["new memory"]]
+    assert np.allclose(cached[0], original[1], atol=1e-3)
+    assert np.allclose(cached[1], original[0], atol=1e-3)
+
+    # float16 storage: 2 bytes per dimension
+    cache = EmbeddingCache(str(tmp_path), second_embedder.name)
+    assert len(cache) == 3
+    assert (tmp_path / second_embedder.name / "vectors.f16").stat().st_size == 3 * 64 * 2
+
+def test_cache_ignores_incomplete_writes(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "model")
+    cache.put(["a", "b"], np.ones((2, 4)))
+
+    # simulate an interrupted append: a dangling key and a partial vector
+    with open(cache._keys_path, "a") as f:
+        f.write("c 2\n")
+    with open(cache._vectors_path, "ab") as f:
+        f.write(b"\x00\x01\x02")
+
+    reopened = EmbeddingCache(str(tmp_path), "model")
+    assert set(reopened.get(["a", "b", "c"]).keys()) == {"a", "b"}
+
+    reopened.put(["d"], np.full((1, 4), 2.0))
+    assert np.allclose(EmbeddingCache(str(tmp_path), "model").get(["d"])["d"], 2.0)
+
+def test_api_embedder_sends_one_request_per_batch():
+    mock_client = MagicMock()
+    mock_client.get_embeddings.side_effect = lambda texts, model: [[1.0, 0.0]] * len(texts)
+
+    with patch("tinytroupe.openai_utils.client", return_value=mock_client):
+        service = EmbeddingService(APIEmbedder(model="test-model"), batch_size=10)
+        vectors = service.embed(["a", "b", "c"])
+
+    mock_client.get_embeddings.assert_called_once_with(["a", "b", "c"], model="test-model")
+    assert vectors.shape == (3, 2)
+
+def test_service_is_shared_when_deep_copied():
+    service = EmbeddingService(HashedNGramEmbedder())
+    assert copy.deepcopy(service) is service
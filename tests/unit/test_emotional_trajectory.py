@@ -0,0 +1,82 @@
+import json
+import pytest
+from tinytroupe.agent import TinyPerson
+from tinytroupe.agent.emotional_trajectory import EmotionalTrajectory
+from tinytruce_sim import draw_mood_bar
+
+def test_trajectory_stays_bounded():
+    trajectory = EmotionalTrajectory(max_points=32, recent_points=8)
+    for turn in range(1000):
+        trajectory.record(f"Emotion {turn % 50}", (turn % 10) / 10)
+
+    assert len(trajectory) <= 32
+    assert trajectory.recorded == 1000
+    assert len(trajectory.emotions) <= 32
+
+    # recent points are kept at full resolution, older ones are downsampled
+    turns = [turn for turn, _, _ in trajectory.points()]
+    assert turns[-8:] == list(range(993, 1001))
+    assert turns == sorted(turns) and turns[0] == 1
+    assert trajectory.spans.sum() == 1000
+
+def test_downsampling_averages_old_intensities():
+    trajectory = EmotionalTrajectory(max_points=4, recent_points=2)
+    for intensity in [0.2, 0.4, 0.6, 0.8, 1.0]:
+        trajectory.record("Tense", intensity)
+
+    assert [round(intensity, 2) for _, _, intensity in trajectory.points()] == [0.3, 0.6, 0.8, 1.0]
+    assert [turn for turn, _, _ in trajectory.points()] == [1, 3, 4, 5]
+    assert trajectory.summary()["mean"] == pytest.approx(0.6)
+
+def test_summary_statistics():
+    trajectory = EmotionalTrajectory()
+    assert trajectory.summary()["mean"] is None
+    assert trajectory.describe() == ""
+
+    for turn in range(10):
+        trajectory.record("Angry", 0.1 + 0.08 * turn)
+
+    summary = trajectory.summary()
+    assert summary["mean"] == pytest.approx(0.46, abs=1e-4)
+    assert summary["trend"] == pytest.approx(0.08, abs=1e-4)
+    assert summary["volatility"] == pytest.approx(0.0, abs=1e-4)
+    assert summary["last_emotion"] == "Angry"
+    assert trajectory.trend_label() == "rising"
+    assert "rising" in trajectory.describe()
+
+def test_trajectory_roundtrips_through_json():
+    trajectory = EmotionalTrajectory(max_points=8, recent_points=4)
+    for turn in range(20):
+        trajectory.record("Wary" if turn % 2 else "Calm", turn / 20)
+
+    restored = EmotionalTrajectory.from_json(json.loads(json.dumps(trajectory.to_json())))
+
+    assert restored.points() == trajectory.points()
+    assert restored.summary() == pytest.approx(trajectory.summary())
+
+def test_agent_trajectory_is_in_prompt_and_state():
+    agent = TinyPerson("Trajectory")
+    agent.emotional_trajectory().record("Defiant", 0.9)
+    agent.reset_prompt()
+
+    assert "emotional_trajectory" not in agent._mental_state
+    assert "over 1 turns, mean intensity 0.90" in agent._init_system_message
+
+    state = json.loads(json.dumps(agent.encode_complete_state()))
+    agent.emotional_trajectory().record("Calm", 0.1)
+    agent.decode_complete_state(state)
+
+    assert agent.emotional_trajectory().points() == [(1, "Defiant", pytest.approx(0.9))]
+
+def test_legacy_trajectory_list_is_migrated():
+    specification = TinyPerson("Legacy").to_json(serialization_type_field_name="type")
+    specification["mental_state"]["emotional_trajectory"] = [{"turn": 1, "emotion": "Calm", "intensity": 0.4, "timestamp": None}]
+
+    agent = TinyPerson.load_specification(specification, new_agent_name="Legacy Loaded")
+
+    assert "emotional_trajectory" not in agent._mental_state
+    assert agent.emotional_trajectory().points() == [(1, "Calm", pytest.approx(0.4))]
+
+def test_mood_bar_shows_trend():
+    assert draw_mood_bar("Agent", "Calm", 0.5, trend="rising").endswith("0.5 ↑")
+    assert draw_mood_bar("Agent", "Calm", 0.5).endswith("0.5")
@@ -0,0 +1,83 @@
+import pytest
+from unittest.mock import MagicMock, patch
+from tinytroupe.control import Simulation, Transaction
+
+def _cached_simulation(n_cached=5, fast_forward=True):
+    """
+    Builds a started simulation whose cache holds `n_cached` calls to `step`.
+    """
+    hasher = Simulation(id="ff_hasher")
+    trace = [(None, hasher._function_call_hash("step", i), {"type": "JSON", "value": i}, {"marker": i}) for i in range(n_cached)]
+
+    sim = Simulation(id="ff_test", cached_trace=trace)
+    sim.status = Simulation.STATUS_STARTED
+    sim.fast_forward = fast_forward
+    return sim
+
+def _run(sim, obj, function, *args):
+    return Transaction(obj, sim, function, *args).execute()
+
+def test_fast_forward_decodes_only_last_state_of_hit_run():
+    """
+    Verifies that a run of cache hits decodes only its last state, right before the next miss.
+    """
+    sim = _cached_simulation(n_cached=5)
+    obj = MagicMock()
+    obj.simulation_id = sim.id
+
+    def step(i):
+        return i
+
+    with patch.object(sim, '_decode_simulation_state') as mock_decode, \
+         patch.object(sim, '_encode_simulation_state', return_value={"marker": "fresh"}):
+        outputs = [_run(sim, obj, step, i) for i in range(5)]
+
+        # cached outputs are still returned for every skipped call
+        assert outputs == [0, 1, 2, 3, 4]
+        assert sim.cache_hits == 5
+        mock_decode.assert_not_called()
+
+        # a miss materializes the last replayed state before running fresh
+        assert _run(sim, obj, step, 99) == 99
+        mock_decode.assert_called_once_with({"marker": 4})
+        assert sim.cache_misses == 1
+
+def test_fast_forward_materializes_on_end():
+    """
+    Verifies that ending a fast-forwarded simulation decodes the pending state.
+    """
+    sim = _cached_simulation(n_cached=3)
+    obj = MagicMock()
+    obj.simulation_id = sim.id
+
+    def step(i):
+        return i
+
+    with patch.object(sim, '_decode_simulation_state') as mock_decode, \
+         patch.object(sim, 'checkpoint'):
+        for i in range(3):
+            _run(sim, obj, step, i)
+
+        sim.end()
+        mock_decode.assert_called_once_with({"marker": 2})
+
+        # nothing left to decode afterwards
+        sim.materialize()
+        assert mock_decode.call_count == 1
+
+def test_regular_replay_decodes_every_hit():
+    """
+    Verifies that without fast-forward every cache hit is still decoded.
+    """
+    sim = _cached_simulation(n_cached=3, fast_forward=False)
+    obj = MagicMock()
+    obj.simulation_id = sim.id
+
+    def step(i):
+        return i
+
+    with patch.object(sim, '_decode_simulation_state') as mock_decode:
+        for i in range(3):
+            _run(sim, obj, step, i)
+
+        assert mock_decode.call_count == 3
@@ -0,0 +1,134 @@
+import threading
+import time
+import pytest
+from unittest.mock import patch
+from tinytroupe.llm_dispatcher import LLMDispatcher, RequestPriority, DeadlineExceeded, request_context, current_request_context
+from tinytroupe.steering import Intervention
+
+def _queue_up(dispatcher, requests):
+    """Starts one thread per (priority, session, deadline) request and waits until all are queued."""
+    served = []
+    failures = []
+
+    def request(label, priority, session, deadline):
+        try:
+            dispatcher.acquire(priority, session, deadline)
+        except DeadlineExceeded:
+            failures.append(label)
+            return
+        served.append(label)
+        dispatcher.release()
+
+    threads = []
+    for label, priority, session, deadline in requests:
+        thread = threading.Thread(target=request, args=(label, priority, session, deadline))
+        thread.start()
+        threads.append(thread)
+        # queued one at a time, so that arrival order is deterministic
+        while len(dispatcher._waiting) < len(threads) and thread.is_alive():
+            time.sleep(0.001)
+
+    return threads, served, failures
+
+def test_waiting_requests_are_served_by_priority():
+    dispatcher = LLMDispatcher(max_concurrent=1, reserved_interactive=0)
+    dispatcher.acquire(RequestPriority.INTERACTIVE)
+
+    threads, served, _ = _queue_up(dispatcher, [("analytics", RequestPriority.ANALYTICS, "s", None),
+                                                ("background", RequestPriority.BACKGROUND, "s", None),
+                                                ("monitor", RequestPriority.MONITOR, "s", None),
+                                                ("turn", RequestPriority.INTERACTIVE, "s", None)])
+    dispatcher.release()
+    for thread in threads:
+        thread.join()
+
+    assert served == ["turn", "monitor", "background", "analytics"]
+    assert dispatcher.report()["INTERACTIVE"]["requests"] == 2
+
+def test_turns_never_wait_behind_background_work():
+    dispatcher = LLMDispatcher(max_concurrent=2, reserved_interactive=1)
+    dispatcher.acquire(RequestPriority.BACKGROUND)
+
+    # the remaining slot is reserved: more background work waits, but a turn goes right through
+    threads, served, _ = _queue_up(dispatcher, [("background", RequestPriority.BACKGROUND, "s", None)])
+    assert dispatcher.acquire(RequestPriority.INTERACTIVE) < 0.1
+    assert served == []
+
+    dispatcher.release()
+    dispatcher.release()
+    for thread in threads:
+        thread.join()
+    assert served == ["background"]
+
+def test_earliest_deadline_first_within_a_priority():
+    dispatcher = LLMDispatcher(max_concurrent=1, reserved_interactive=0)
+    dispatcher.acquire(RequestPriority.INTERACTIVE)
+    now = time.monotonic()
+
+    threads, served, _ = _queue_up(dispatcher, [("later", RequestPriority.MONITOR, "s", now + 60),
+                                                ("none", RequestPriority.MONITOR, "s", None),
+                                                ("sooner", RequestPriority.MONITOR, "s", now + 30)])
+    dispatcher.release()
+    for thread in threads:
+        thread.join()
+
+    assert served == ["sooner", "later", "none"]
+
+def test_requests_that_miss_their_deadline_expire():
+    dispatcher = LLMDispatcher(max_concurrent=1, reserved_interactive=0)
+    dispatcher.acquire(RequestPriority.INTERACTIVE)
+
+    with pytest.raises(DeadlineExceeded):
+        dispatcher.acquire(RequestPriority.MONITOR, deadline=time.monotonic() + 0.05)
+
+    dispatcher.release()
+    assert dispatcher.report()["MONITOR"] == {"requests": 0, "expired": 1, "wait_seconds": 0.0, "max_wait_seconds": 0.0}
+    assert dispatcher._waiting == []
+
+def test_sessions_share_a_priority_fairly():
+    dispatcher = LLMDispatcher(max_concurrent=1, reserved_interactive=0)
+    for session in ["quiet", "busy", "busy", "busy"]:
+        dispatcher.acquire(RequestPriority.BACKGROUND, session)
+        dispatcher.release()
+    dispatcher.acquire(RequestPriority.INTERACTIVE, "other")
+
+    threads, served, _ = _queue_up(dispatcher, [("busy", RequestPriority.BACKGROUND, "busy", None),
+                                                ("quiet", RequestPriority.BACKGROUND, "quiet", None)])
+    dispatcher.release()
+    for thread in threads:
+        thread.join()
+
+    assert served == ["quiet", "busy"]
+
+def test_request_context_nests_and_fills_in_the_slot():
+    with request_context(priority=RequestPriority.BACKGROUND, session="summit"):
+        with request_context(deadline=10):
+            context = current_request_context()
+        assert current_request_context()["deadline"] is None
+
+    assert context["priority"] == RequestPriority.BACKGROUND
+    assert context["session"] == "summit"
+    assert context["deadline"] > time.monotonic()
+    assert current_request_context()["priority"] == RequestPriority.INTERACTIVE
+
+    dispatcher = LLMDispatcher()
+    with request_context(priority=RequestPriority.ANALYTICS):
+        with dispatcher.slot():
+            assert dispatcher._in_flight == 1
+    assert dispatcher._in_flight == 0
+    assert dispatcher.report()["ANALYTICS"]["requests"] == 1
+
+def test_invalid_capacity_is_rejected():
+    with pytest.raises(ValueError):
+        LLMDispatcher(max_concurrent=1, reserved_interactive=1)
+
+def test_intervention_checks_run_as_monitor_requests():
+    seen = []
+    intervention = Intervention([], name="Monitor").set_monitor_deadline(5)
+    intervention.set_textual_precondition("The talks are stalled.")
+
+    with patch("tinytroupe.steering.intervention.Proposition.check", side_effect=lambda **kwargs: seen.append(current_request_context()) or False):
+        assert not intervention.check_precondition()
+
+    assert seen[0]["priority"] == RequestPriority.MONITOR
+    assert seen[0]["deadline"] is not None
@@ -0,0 +1,78 @@
+import copy
+import numpy as np
+import pytest
+from tinytroupe.agent.memory import EpisodicMemory, EpisodeStore
+from tinytroupe.agent.minhash import MinHasher
+
+def _stimulus(content, source="World", timestamp=None):
+    return {"role": "user", "content": {"stimuli": [{"type": "CONVERSATION", "content": content, "source": source}]},
+            "type": "stimulus", "simulation_timestamp": timestamp}
+
+BROADCAST = "SITUATION ROOM ALERT: daily search quota exceeded for the news feed, retry after the next briefing cycle."
+
+def test_minhash_estimates_similarity():
+    hasher = MinHasher()
+    a = hasher.signature(BROADCAST)
+    assert hasher.similarity(a, hasher.signature(BROADCAST)) == 1.0
+    assert hasher.similarity(a, hasher.signature(BROADCAST.replace("daily", "hourly"))) > 0.6
+    assert hasher.similarity(a, hasher.signature("The delegates discussed fishing quotas over dinner.")) < 0.2
+
+def test_near_duplicate_stimuli_are_collapsed():
+    memory = EpisodicMemory(dedup_threshold=0.6)
+    memory.store(_stimulus(BROADCAST, timestamp="t1"))
+    memory.store(_stimulus("Bob: we will not sign."))
+    memory.store(_stimulus(BROADCAST.replace("daily", "hourly"), timestamp="t3"))
+    memory.store(_stimulus(BROADCAST, timestamp="t4"))
+
+    assert memory.count() == 2
+    collapsed = memory.memory[-1]
+    assert collapsed["repeat_count"] == 3
+    assert collapsed["repeated_at"] == ["t1", "t3"]
+    assert collapsed["simulation_timestamp"] == "t4"
+
+    # retrieval renders the collapsed episode once, with its repeat count
+    rendered = memory.retrieve_recent(include_omission_info=False)[-1]
+    assert rendered["content"]["repeat_count"] == 3
+    assert "repeat_count" not in memory.memory[-1]["content"]
+
+def test_actions_and_pinned_episodes_are_not_collapsed():
+    memory = EpisodicMemory(dedup_threshold=0.6)
+    memory.store(_stimulus(BROADCAST))
+    memory.pin()
+    memory.store(_stimulus(BROADCAST))
+    memory.store({"role": "assistant", "content": {"action": {"type": "TALK", "content": BROADCAST}}, "type": "action"})
+    memory.store({"role": "assistant", "content": {"action": {"type": "TALK", "content": BROADCAST}}, "type": "action"})
+
+    assert memory.count() == 4
+
+def test_disabled_by_default():
+    memory = EpisodicMemory()
+    for _ in range(3):
+        memory.store(_stimulus(BROADCAST))
+    assert memory.count() == 3
+
+def test_collapsing_keeps_forks_independent():
+    memory = EpisodicMemory(dedup_threshold=0.6)
+    memory.store(_stimulus(BROADCAST))
+    forked = memory.fork()
+    forked.store(_stimulus(BROADCAST))
+
+    assert "repeat_count" not in memory.memory[0]
+    assert forked.memory[0]["repeat_count"] == 2
+
+def test_long_session_memory_stays_small():
+    memory = EpisodicMemory(dedup_threshold=0.8)
+    for turn in range(500):
+        memory.store(_stimulus(f"Delegate {turn} argues about clause {turn * 7}: the border must be opened on day {turn}."))
+        memory.store(_stimulus(BROADCAST))
+
+    # distinct statements are all kept, while the broadcast is kept once per open segment at most
+    assert 500 <= memory.count() < 500 + 500 // 10
+    assert sum(e.get("repeat_count", 1) for e in memory.memory) == 1000
+
+def test_supersede_only_touches_the_open_segment():
+    store = EpisodeStore(list(range(EpisodeStore.SEGMENT_SIZE + 3)))
+    with pytest.raises(IndexError):
+        store.supersede(0, "x")
+    store.supersede(EpisodeStore.SEGMENT_SIZE, "x")
+    assert list(store)[-3:] == [EpisodeStore.SEGMENT_SIZE + 1, EpisodeStore.SEGMENT_SIZE + 2, "x"]
@@ -0,0 +1,74 @@
+import time
+import numpy as np
+import pytest
+from tinytroupe.agent import TinyPerson
+from tinytroupe.agent.memory import SemanticMemory
+from tinytroupe.agent.embeddings import HashedNGramEmbedder, VectorIndex
+
+def _action(content):
+    return {"role": "assistant", "content": content, "type": "action", "simulation_timestamp": "2026-01-01T00:00:00"}
+
+def test_embedder_is_deterministic_and_normalized():
+    embedder = HashedNGramEmbedder(dimensions=128)
+    vectors = embedder.embed(["ceasefire negotiations", "ceasefire negotiations", ""])
+
+    assert vectors.shape == (3, 128)
+    assert np.allclose(vectors[0], vectors[1])
+    assert np.isclose(np.linalg.norm(vectors[0]), 1.0)
+    assert not vectors[2].any()
+
+def test_vector_index_grows_and_ranks_by_similarity():
+    index = VectorIndex(dimensions=2, initial_capacity=1)
+    assert list(index.add(np.array([[1.0, 0.0], [0.0, 1.0]]))) == [0, 1]
+    assert list(index.add(np.array([[0.6, 0.8]]))) == [2]
+
+    results = index.search(np.array([[0.0, 1.0], [1.0, 0.0]]), top_k=2)
+    assert [i for i, _ in results[0]] == [1, 2]
+    assert [i for i, _ in results[1]] == [0, 2]
+
+def test_semantic_memory_retrieves_stored_memories():
+    memory = SemanticMemory()
+    memory.store(_action("We demand the immediate withdrawal of troops from the border."))
+    memory.store(_action("The trade tariffs on steel imports must be lifted."))
+    memory.store(_action("I enjoyed the dinner at the embassy."))
+
+    results = memory.retrieve_relevant("steel tariffs", top_k=1)
+    assert len(results) == 1
+    assert "steel imports" in results[0]
+
+def test_semantic_memory_roundtrips_with_agent_state():
+    memory = SemanticMemory()
+    memory.store(_action("Water rights along the river are non-negotiable."))
+
+    encoded = memory.to_json()
+    assert set(encoded.keys()) == {"json_serializable_class_name", "memories", "documents_paths", "namespace"}
+
+    decoded = SemanticMemory.from_json(encoded)
+    assert decoded.count() == 1
+    assert "Water rights" in decoded.retrieve_relevant("river water", top_k=3)[0]
+
+def test_context_retrieval_skipped_when_semantic_memory_is_empty():
+    agent = TinyPerson("EmptyRecall")
+    assert agent.retrieve_relevant_memories_for_current_context() == []
+
+def test_retrieval_latency_at_10k_memories():
+    """
+    Benchmarks retrieval over 10k memories. Indexing happens once, in batch; queries must then be fast.
+    """
+    topics = ["border", "tariffs", "sanctions", "water", "energy", "refugees", "elections", "ceasefire"]
+    memory = SemanticMemory()
+    for i in range(10_000):
+        memory.store(_action(f"Statement {i} about {topics[i % len(topics)]} and delegation {i % 97}."))
+
+    start = time.perf_counter()
+    memory.retrieve_relevant("sanctions", top_k=5)
+    indexing = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(20):
+        results = memory.retrieve_relevant("energy delegation", top_k=5)
+    per_query = (time.perf_counter() - start) / 20
+
+    print(f"10k memories: indexing {indexing:.3f}s, retrieval {per_query * 1000:.2f}ms per query")
+    assert all("energy" in r for r in results)
+    assert per_query < 0.1
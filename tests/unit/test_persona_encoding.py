@@ -0,0 +1,74 @@
+import os
+import json
+import pytest
+from tinytroupe.agent import TinyPerson
+from tinytroupe.agent.context_window import count_tokens
+from tinytroupe.agent.persona_encoding import encode_persona, PERSONA_ENCODINGS
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+PERSONA = {
+    "name": "Ada",
+    "age": 41,
+    "occupation": {"title": "Envoy", "description": "Leads the talks."},
+    "personality": {"traits": ["Patient", "Blunt"], "big_five": {"openness": "High"}},
+    "relationships": [{"name": "Bo", "description": "Rival"}],
+    "preferences": {},
+    "deep_profile": "First line.\nSecond line.",
+    "redlines": ["Never cede the port."],
+    "vocabulary_priority": ["Sovereignty"],
+    "syntax_constraints": "Short sentences.",
+}
+
+def test_outline_encoding():
+    outline = encode_persona(PERSONA, "outline")
+
+    assert outline.splitlines()[:7] == [
+        "name: Ada",
+        "age: 41",
+        "occupation:",
+        "  title: Envoy",
+        "  description: Leads the talks.",
+        "personality:",
+        "  traits:",
+    ]
+    assert "  - name: Bo\n    description: Rival" in outline
+    assert "deep_profile: First line.\n  Second line." in outline
+
+    # empty fields and fields rendered elsewhere in the prompt are left out
+    assert "preferences" not in outline
+    for field in ["redlines", "vocabulary_priority", "syntax_constraints"]:
+        assert field not in outline
+
+def test_compact_json_keeps_the_structure():
+    compact = encode_persona(PERSONA, "compact_json")
+    assert json.loads(compact)["personality"] == PERSONA["personality"]
+    assert "\n" not in compact and ": " not in compact
+
+def test_json_encoding_is_unchanged():
+    assert encode_persona(PERSONA, "json") == json.dumps(PERSONA, indent=4)
+
+def test_unknown_encoding_is_rejected():
+    with pytest.raises(ValueError):
+        encode_persona(PERSONA, "yaml")
+
+def test_compact_encodings_save_tokens_on_persona_files():
+    with open(os.path.join(project_root, "personas", "agents", "donald_trump.agent.json"), "r", encoding="utf-8") as f:
+        persona = json.load(f)["persona"]
+
+    tokens = {encoding: count_tokens(encode_persona(persona, encoding)) for encoding in PERSONA_ENCODINGS}
+
+    assert tokens["compact_json"] < 0.85 * tokens["json"]
+    assert tokens["outline"] < 0.85 * tokens["json"]
+
+def test_system_prompt_uses_the_selected_encoding(monkeypatch):
+    agent = TinyPerson("Encoded")
+    agent.define("redlines", ["No ceasefire without guarantees."])
+
+    assert "name: Encoded" in agent._init_system_message
+    # the redline is only rendered once, in its own section
+    assert agent._init_system_message.count("No ceasefire without guarantees.") == 1
+
+    monkeypatch.setattr(TinyPerson, "persona_encoding", "json")
+    agent.reset_prompt()
+    assert '"name": "Encoded"' in agent._init_system_message
@@ -0,0 +1,102 @@
+import pytest
+from unittest.mock import patch
+from tinytroupe.agent import TinyPerson
+from tinytroupe.environment import TinyWorld
+from tinytroupe.steering import Intervention, RepetitionGate
+
+FRESH = ["We propose a ceasefire along the river, monitored by neutral observers.",
+         "Grain exports through the southern port could restart next month.",
+         "Any prisoner exchange has to include the journalists detained last winter.",
+         "Reconstruction funds should be managed by an international trust."]
+
+STUCK = ["We will not withdraw from the eastern corridor until our security guarantees are signed.",
+         "You will not get the eastern corridor until our security guarantees are signed.",
+         "We will not withdraw from the eastern corridor until our security guarantees are signed, as I said.",
+         "Again: we will not withdraw from the eastern corridor until our security guarantees are signed."]
+
+def _say(agent, text):
+    agent.episodic_memory.store({"role": "assistant", "type": "action", "simulation_timestamp": None,
+                                 "content": {"action": {"type": "TALK", "content": text, "target": ""}, "cognitive_state": {}}})
+
+@pytest.fixture
+def summit():
+    TinyPerson.clear_agents()
+    TinyWorld.clear_environments()
+    agents = [TinyPerson("Envoy A"), TinyPerson("Envoy B")]
+    yield TinyWorld("Gated Summit", agents)
+    TinyPerson.clear_agents()
+    TinyWorld.clear_environments()
+
+def _answers(*verdicts):
+    """A stand-in for Proposition.check that gives the verdicts in turn, None being a dropped check."""
+    verdicts = list(verdicts)
+
+    def check(proposition, **model_params):
+        verdict = verdicts.pop(0)
+        proposition.raw_llm_response = "" if verdict is None else str(verdict)
+        return bool(verdict)
+
+    return check
+
+def _talk(world, lines):
+    for i, line in enumerate(lines):
+        _say(world.agents[i % 2], line)
+
+def test_repetition_scores(summit):
+    gate = RepetitionGate()
+    assert gate.score(summit) is None
+
+    _talk(summit, FRESH)
+    fresh_score = gate.score(summit)
+    _talk(summit, STUCK)
+    stuck_score = gate.score([summit])
+
+    assert fresh_score < gate.threshold < stuck_score
+    assert gate.score(summit.agents[0]) > gate.threshold
+
+def test_fresh_turns_skip_the_llm_check(summit):
+    gate = RepetitionGate()
+    intervention = Intervention(summit).set_precondition_gate(gate)
+    intervention.set_textual_precondition("The negotiation is in a stalemate.")
+    _talk(summit, FRESH)
+
+    with patch("tinytroupe.steering.intervention.Proposition.check") as check:
+        assert not intervention.check_precondition()
+
+    check.assert_not_called()
+    assert "not checked by the LLM" in intervention.precondition_justification()
+    assert gate.report()["skip_rate"] == 1.0
+
+def test_repetitive_turns_go_to_the_llm_and_agreement_is_tracked(summit):
+    gate = RepetitionGate()
+    intervention = Intervention(summit).set_precondition_gate(gate)
+    intervention.set_textual_precondition("The negotiation is in a stalemate.")
+    _talk(summit, STUCK)
+
+    with patch("tinytroupe.steering.intervention.Proposition.check", autospec=True, side_effect=_answers(True, False, None)) as check:
+        assert intervention.check_precondition()
+        assert not intervention.check_precondition()
+        assert not intervention.check_precondition()
+
+    # the dropped check is not counted as a verdict
+    assert check.call_count == 3
+    report = gate.report()
+    assert report["judged"] == 2
+    assert report["agreement_rate"] == 0.5
+
+def test_skipped_checks_are_audited(summit):
+    gate = RepetitionGate(audit_every=2)
+    intervention = Intervention(summit).set_precondition_gate(gate)
+    intervention.set_textual_precondition("The negotiation is in a stalemate.")
+    _talk(summit, FRESH)
+
+    with patch("tinytroupe.steering.intervention.Proposition.check", autospec=True, side_effect=_answers(True, True)) as check:
+        results = [intervention.check_precondition() for _ in range(4)]
+
+    # the audits follow the LLM's verdict, and count against the gate when it disagrees
+    assert results == [False, True, False, True]
+    assert check.call_count == 2
+    report = gate.report()
+    assert report["skipped"] == 4 and report["audited"] == 2
+    assert report["false_skips"] == 2
+    assert report["agreement_rate"] == 0.0
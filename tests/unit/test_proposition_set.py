@@ -0,0 +1,84 @@
+import json
+import pytest
+from unittest.mock import patch
+from tinytroupe.agent import TinyPerson
+from tinytroupe.environment import TinyWorld
+from tinytroupe.experimentation import Proposition, PropositionSet
+
+def _response(content):
+    return {"role": "assistant", "content": content if isinstance(content, str) else json.dumps(content)}
+
+def _result(value, justification="Because.", confidence=0.9):
+    return {"value": value, "justification": justification, "confidence": confidence}
+
+@pytest.fixture
+def world():
+    TinyPerson.clear_agents()
+    TinyWorld.clear_environments()
+    agents = [TinyPerson("Envoy A"), TinyPerson("Envoy B")]
+    for agent in agents:
+        agent.listen("The talks on the eastern corridor have resumed. " * 20)
+    yield TinyWorld("Proposition Summit", agents)
+    TinyPerson.clear_agents()
+    TinyWorld.clear_environments()
+
+CLAIMS = ["The envoys reached an agreement.", "The talks are about the eastern corridor.", "Envoy A walked out."]
+
+def test_claims_about_the_same_context_share_one_call(world):
+    propositions = PropositionSet([Proposition(world, claim) for claim in CLAIMS])
+
+    with patch("tinytroupe.openai_utils.client") as mock_client_func:
+        mock_client_func.return_value.send_message.return_value = _response(
+            {"results": [_result(False), _result(True, "They said so.", 0.8), _result("no")]})
+        values = propositions.check_all()
+
+    assert values == [False, True, False]
+    assert mock_client_func.return_value.send_message.call_count == 1
+    assert propositions.propositions[1].justification == "They said so."
+    assert propositions.propositions[1].confidence == 0.8
+
+    # the shared context is sent once, rather than once per claim
+    prompt = mock_client_func.return_value.send_message.call_args[0][0][1]["content"]
+    assert prompt.count("Simulation Trajectory") == 1
+    report = propositions.last_report
+    assert report["calls_per_claim"] == pytest.approx(1 / 3)
+    assert report["prompt_tokens"] < report["per_claim_prompt_tokens"] / 2
+
+def test_different_contexts_are_checked_separately(world):
+    propositions = PropositionSet([Proposition(world, CLAIMS[0]), Proposition(world.agents[0], CLAIMS[1]),
+                                   Proposition(world, CLAIMS[2])])
+
+    with patch("tinytroupe.openai_utils.client") as mock_client_func:
+        mock_client_func.return_value.send_message.side_effect = [
+            _response([_result(True), _result(False)]), _response({"results": [_result(True)]})]
+        values = propositions.check_all()
+
+    assert values == [True, True, False]
+    assert propositions.last_report["calls"] == 2
+
+def test_unparsed_claims_fall_back_to_single_checks(world):
+    propositions = PropositionSet([Proposition(world, claim) for claim in CLAIMS])
+
+    with patch("tinytroupe.openai_utils.client") as mock_client_func:
+        mock_client_func.return_value.send_message.side_effect = [
+            _response({"results": [_result(True), {"justification": "Unsure."}]}),
+            _response(_result(True, "Checked alone.")),
+            _response(_result(False, "Checked alone."))]
+        values = propositions.check_all()
+
+    assert values == [True, True, False]
+    assert mock_client_func.return_value.send_message.call_count == 3
+    assert propositions.propositions[2].justification == "Checked alone."
+    assert propositions.last_report["fallback_calls"] == 2
+    assert propositions.last_report["calls_per_claim"] == 1.0
+
+def test_unparseable_response_falls_back_for_every_claim(world):
+    propositions = PropositionSet([Proposition(world, claim) for claim in CLAIMS[:2]])
+
+    with patch("tinytroupe.openai_utils.client") as mock_client_func:
+        mock_client_func.return_value.send_message.side_effect = [
+            _response("I cannot answer that."), _response(_result(True)), _response(_result(True))]
+        values = propositions.check_all()
+
+    assert values == [True, True]
+    assert propositions.last_report["fallback_calls"] == 2
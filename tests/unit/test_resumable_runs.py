@@ -0,0 +1,95 @@
+import os
+import inspect
+import random
+import pytest
+from pathlib import Path
+from unittest.mock import patch
+import tinytroupe.control as control
+from tinytroupe.control import transactional
+from tinytroupe.agent import TinyPerson
+from tinytroupe.environment import TinyWorld
+import tinytruce_sim as sim
+
+@pytest.fixture(autouse=True)
+def quiet_display():
+    old_agent, old_world = TinyPerson.communication_display, TinyWorld.communication_display
+    TinyPerson.communication_display = False
+    TinyWorld.communication_display = False
+    control.reset()
+    yield
+    control.reset()
+    TinyPerson.communication_display, TinyWorld.communication_display = old_agent, old_world
+
+def _run_summit(cache_path, turns, executed):
+    """
+    A miniature version of the summit loop: setup followed by cached, seeded turns.
+    """
+    control.begin(cache_path=cache_path, fast_forward=True)
+    alice = TinyPerson("Alice")
+    world = TinyWorld("Mini Summit", [alice])
+    world.broadcast("Welcome.")
+    world._fired_injects = []
+
+    @transactional
+    def run_turn(world, turn):
+        executed.append(turn)
+        rng = random.Random(f"seed:{turn}")
+        if rng.random() < 0.5:
+            world._fired_injects.append(turn)
+        alice.think(f"Turn {turn} reflection.")
+
+    for turn in range(turns):
+        run_turn(world, turn)
+        control.checkpoint()
+
+    control.materialize()
+    state = (alice.episodic_memory.count(), list(world._fired_injects))
+    control.end()
+    return state
+
+def test_resume_replays_completed_turns_and_continues_live(tmp_path):
+    cache_path = str(tmp_path / sim.SIMULATION_CACHE_FILE)
+
+    first_executed = []
+    partial_state = _run_summit(cache_path, turns=3, executed=first_executed)
+    assert first_executed == [0, 1, 2]
+
+    # "resume" with more turns: the first three are replayed, the rest run live
+    control.reset()
+    resumed_executed = []
+    full_state = _run_summit(cache_path, turns=5, executed=resumed_executed)
+    assert resumed_executed == [3, 4]
+
+    # a fresh full run yields the same final state
+    control.reset()
+    fresh_executed = []
+    fresh_state = _run_summit(str(tmp_path / "fresh.cache.json"), turns=5, executed=fresh_executed)
+    assert fresh_executed == [0, 1, 2, 3, 4]
+    assert full_state == fresh_state
+    assert full_state[0] == partial_state[0] + 2
+
+def test_run_config_roundtrip(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    session_dir = Path("DOCUMENTS/runs/abc123")
+    session_dir.mkdir(parents=True)
+
+    config = {"scenario_key": "domestic", "turns": 15, "agent_names": ["a.agent.json"], "seed": "abc123",
+              "spill_dir": str(session_dir / sim.SPILL_DIR)}
+    sim.save_run_config(session_dir, config)
+    assert sim.load_run_config("abc123") == config
+
+    # --resume passes the whole config back, including where episodes were spilled to
+    inspect.signature(sim.run_tinytruce_simulation).bind(**sim.load_run_config("abc123"), session_id="abc123", resume=True)
+
+    with pytest.raises(FileNotFoundError):
+        sim.load_run_config("missing")
+
+def test_cleanup_keeps_resumed_session(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for name in ["old_a", "old_b"]:
+        Path(f"DOCUMENTS/runs/{name}").mkdir(parents=True)
+        os.utime(f"DOCUMENTS/runs/{name}", (0, 0))
+
+    sim.cleanup_old_sessions(ttl_hours=1, keep="old_b")
+    assert not Path("DOCUMENTS/runs/old_a").exists()
+    assert Path("DOCUMENTS/runs/old_b").exists()
@@ -0,0 +1,104 @@
+import os
+import pytest
+from tinytroupe.agent.memory import EpisodicMemory, EpisodeStore
+
+def _episode(i):
+    return {"role": "user", "content": f"Turn {i}", "type": "stimulus", "simulation_timestamp": None}
+
+def _filled_memory(n, **kwargs):
+    memory = EpisodicMemory(**kwargs)
+    for i in range(n):
+        memory.store(_episode(i))
+    return memory
+
+def test_store_behaves_like_a_list():
+    """
+    Verifies indexing, slicing and deletion against a plain list, across segment boundaries.
+    """
+    episodes = [_episode(i) for i in range(300)]
+    store = EpisodeStore(episodes)
+    reference = list(episodes)
+
+    assert len(store) == 300
+    assert store[0] is episodes[0] and store[-1] is episodes[-1]
+    assert store[60:130] == reference[60:130]
+    assert store[-70:] == reference[-70:]
+    assert store[::7] == reference[::7]
+
+    del store[0:100]
+    del reference[0:100]
+    assert store == reference
+    assert store[0]["content"] == "Turn 100"
+
+    del store[10:20]
+    del reference[10:20]
+    assert list(store) == reference
+
+def test_prefix_deletion_drops_whole_segments():
+    store = EpisodeStore([_episode(i) for i in range(EpisodeStore.SEGMENT_SIZE * 4)])
+    del store[:EpisodeStore.SEGMENT_SIZE * 2 + 3]
+    assert len(store._segments) == 2
+    assert store._head_offset == 3
+    assert store[0]["content"] == f"Turn {EpisodeStore.SEGMENT_SIZE * 2 + 3}"
+
+def test_cold_segments_are_spilled_and_read_back(tmp_path):
+    """
+    Verifies that only the fixed prefix and lookback stay in RAM, while retrieval still sees every episode.
+    """
+    memory = _filled_memory(1000, fixed_prefix_length=10, lookback_length=50, spill_dir=str(tmp_path))
+
+    assert memory.memory.spilled_segments_count() > 10
+    assert len(os.listdir(tmp_path)) == 1
+
+    recent = memory.retrieve_recent()
+    assert recent[0]["content"] == "Turn 0"
+    assert recent[-1]["content"] == "Turn 999"
+    assert [e["content"] for e in memory.retrieve_all()] == [f"Turn {i}" for i in range(1000)]
+
+    # deleting the prefix brings the new prefix back into RAM
+    memory.delete_episodes(0, 500)
+    assert memory.count() == 500
+    assert memory.retrieve_first(1, include_omission_info=False)[0]["content"] == "Turn 500"
+    assert isinstance(memory.memory._segments[0], tuple)
+
+def test_json_roundtrip_is_a_plain_list(tmp_path):
+    memory = _filled_memory(200, fixed_prefix_length=5, lookback_length=5, spill_dir=str(tmp_path))
+
+    encoded = memory.to_json()
+    assert isinstance(encoded["memory"], list)
+    assert encoded["memory"][150] == _episode(150)
+
+    decoded = EpisodicMemory.from_json(encoded)
+    assert decoded.count() == 200
+    assert decoded.memory.spilled_segments_count() > 0
+    assert decoded.retrieve_all() == memory.retrieve_all()
+
+    # older encodings, without a spill directory, still load
+    del encoded["spill_dir"]
+    assert EpisodicMemory.from_json(encoded).memory.spilled_segments_count() == 0
+
+def test_fork_shares_sealed_segments(tmp_path):
+    memory = _filled_memory(300, fixed_prefix_length=5, lookback_length=5, spill_dir=str(tmp_path))
+    forked = memory.fork()
+
+    forked.store(_episode(300))
+    assert forked.count() == 301
+    assert memory.count() == 300
+    assert forked.memory[150] == memory.memory[150]
+
+def test_spill_file_is_closed_and_removed_with_its_memory(tmp_path):
+    memory = _filled_memory(300, fixed_prefix_length=5, lookback_length=5, spill_dir=str(tmp_path / "spill"))
+    assert memory.retrieve_all()[100] == _episode(100)
+
+    spill_file = memory.memory._spill_file
+    current_map = spill_file._maps[0]
+    assert current_map is not None
+
+    del memory, spill_file
+    assert current_map.closed
+    assert os.listdir(tmp_path / "spill") == []
+
+def test_to_json_writes_to_a_bare_file_name(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _filled_memory(3).to_json(file_path="episodes.json")
+    assert os.path.exists(tmp_path / "episodes.json")
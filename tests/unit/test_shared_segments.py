@@ -0,0 +1,71 @@
+import json
+import pytest
+import tinytroupe.control as control
+from tinytroupe.agent import TinyPerson
+from tinytroupe.agent.shared_segments import SharedSegmentPool, REFERENCE_KEY
+import tinytroupe.agent.shared_segments as shared_segments_module
+
+GROUNDING = "### GLOBAL INTELLIGENCE BRIEFING ###\n" + " ".join(f"fact-{i}" for i in range(6000))
+
+@pytest.fixture
+def fresh_pool(monkeypatch):
+    pool = SharedSegmentPool()
+    monkeypatch.setattr(shared_segments_module, "_default_pool", pool)
+    # grounding is injected silently, as the summit does
+    monkeypatch.setattr(TinyPerson, "communication_display", False)
+    return pool
+
+def test_pool_interns_large_texts_only():
+    pool = SharedSegmentPool(min_length=10)
+    first = pool.intern("x" * 20)
+    assert pool.intern("".join(["x"] * 20)) is first
+    assert pool.intern("short") == "short" and len(pool) == 1
+
+    referenced = pool.reference({"content": [first, "short"]})
+    assert referenced == {"content": [{REFERENCE_KEY: referenced["content"][0][REFERENCE_KEY]}, "short"]}
+    assert pool.resolve(referenced)["content"][0] is first
+
+def test_agents_share_one_copy_of_injected_grounding(fresh_pool):
+    agents = [TinyPerson(f"Delegate{i}") for i in range(5)]
+    for agent in agents:
+        # built separately for each agent, as the summit does
+        agent.think("".join(GROUNDING))
+
+    texts = [agent.episodic_memory.memory[0]["content"]["stimuli"][0]["content"] for agent in agents]
+    assert all(text is texts[0] for text in texts)
+    assert len(fresh_pool) == 1
+
+def test_snapshots_store_references(fresh_pool):
+    agent = TinyPerson("Snapshot")
+    agent.think(GROUNDING)
+    agent.reset_prompt()
+
+    state = agent.encode_complete_state()
+    encoded = json.dumps(state)
+    assert GROUNDING not in encoded
+    assert len(encoded) < len(GROUNDING)
+
+    restored = TinyPerson("Restored").decode_complete_state(state)
+    assert restored.episodic_memory.memory[0]["content"]["stimuli"][0]["content"] == GROUNDING
+    assert any("fact-5999" in str(message["content"]) for message in restored.current_messages)
+
+def test_cache_file_stores_shared_segments_once(fresh_pool, tmp_path):
+    cache_path = str(tmp_path / "cache.json")
+    control.reset()
+    control.begin(cache_path)
+    agents = [TinyPerson(f"Cached{i}") for i in range(4)]
+    for agent in agents:
+        agent.think(GROUNDING)
+    control.checkpoint()
+    control.end()
+    control.reset()
+
+    with open(cache_path, "r") as f:
+        text = f.read()
+    assert text.count("fact-5999") == 1
+
+    # a new process only knows the segments from the cache file
+    pool = SharedSegmentPool()
+    shared_segments_module._default_pool = pool
+    control.Simulation()._load_cache_file(cache_path)
+    assert pool.export() == fresh_pool.export()
@@ -0,0 +1,134 @@
+import copy
+import numpy as np
+import pytest
+from unittest.mock import patch
+from tinytroupe.agent.embeddings import SharedVectorIndex, VectorIndex
+from tinytroupe.agent.memory import SemanticMemory
+import tinytroupe.agent.embeddings as embeddings
+
+def _unit_vectors(n, dimensions=32, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(n, dimensions)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+@pytest.fixture
+def fresh_default_index(monkeypatch):
+    monkeypatch.setattr(embeddings, "_default_shared_index", SharedVectorIndex())
+    return embeddings._default_shared_index
+
+def _action(content):
+    return {"role": "assistant", "content": content, "type": "action", "simulation_timestamp": None}
+
+def test_namespaces_are_isolated_but_see_shared_vectors():
+    index = SharedVectorIndex()
+    vectors = _unit_vectors(3)
+    alice, bob = index.handle("alice"), index.handle("bob")
+
+    assert list(alice.add(vectors[:1])) == [0]
+    assert list(bob.add(vectors[1:2])) == [0]
+    index.add(SharedVectorIndex.SHARED_NAMESPACE, vectors[2:], [("atlas", "shared fact")])
+
+    # bob's vector is never returned to alice
+    assert len(alice.search(vectors[1:2], top_k=5)[0]) == 2
+    payloads = [payload for payload, _ in alice.search(vectors[2:], top_k=5)[0]]
+    assert payloads == [("atlas", "shared fact"), 0]
+    assert [payload for payload, _ in alice.search(vectors[2:], top_k=5, include_shared=False)[0]] == [0]
+
+def test_ivf_search_approximates_exact_search():
+    vectors = _unit_vectors(6000)
+    queries = vectors[:50] + 0.05 * _unit_vectors(50, seed=1)
+
+    index = SharedVectorIndex(train_threshold=4096, exact_search_limit=100)
+    handle = index.handle("population")
+    handle.add(vectors)
+    assert index._centroids is not None
+
+    exact = VectorIndex(32)
+    exact.add(vectors)
+
+    recalled = 0
+    for approximate, reference in zip(handle.search(queries, top_k=1), exact.search(queries, top_k=1)):
+        recalled += approximate[0][0] == reference[0][0]
+    assert recalled >= 45
+
+def test_removed_namespaces_are_compacted():
+    index = SharedVectorIndex(exact_search_limit=10)
+    vectors = _unit_vectors(40)
+    index.handle("keep").add(vectors[:5])
+    for i in range(7):
+        index.remove_namespace("churn")
+        index.handle("churn").add(vectors[5:40])
+
+    assert len(index) == 40
+    assert len(index._vectors) < 40 + 7 * 35
+    assert [payload for payload, _ in index.search(["keep"], vectors[:1], top_k=1)[0]] == [0]
+
+def test_semantic_memory_in_shared_namespace(fresh_default_index):
+    memory = SemanticMemory(namespace="Alice")
+    memory.store(_action("The water treaty must be renewed."))
+    memory.store(_action("Fishing quotas are too low."))
+
+    # memories are indexed lazily, on retrieval
+    assert "water treaty" in memory.retrieve_relevant("water treaty renewal", top_k=1)[0]
+    assert fresh_default_index.namespace_size("Alice") == 2
+
+    # a reloaded copy indexes itself in a namespace of its own, leaving the live memory's one alone
+    restored = SemanticMemory.from_json(memory.to_json())
+    assert restored.namespace == "Alice"
+    assert "water treaty" in restored.retrieve_relevant("water treaty renewal", top_k=1)[0]
+    assert "water treaty" in memory.retrieve_relevant("water treaty renewal", top_k=1)[0]
+    assert fresh_default_index.namespace_size("Alice") == 2
+    assert len(fresh_default_index) == 4
+
+    # once the original memory is gone, its vectors go too
+    del memory
+    assert len(fresh_default_index) == 2
+    assert "water treaty" in restored.retrieve_relevant("water treaty renewal", top_k=1)[0]
+
+def test_copied_semantic_memory_gets_its_own_namespace(fresh_default_index):
+    memory = SemanticMemory(namespace="Bob")
+    memory.store(_action("Tariffs on grain are unacceptable."))
+    memory.retrieve_relevant("grain", top_k=1)
+
+    forked = copy.deepcopy(memory)
+    forked.store(_action("Only in the fork."))
+
+    forked.retrieve_relevant("fork", top_k=1)
+    assert fresh_default_index.namespace_size("Bob") == 1
+    assert len(forked.semantic_grounding_connector.index) == 2
+    assert all("Only in the fork" not in r for r in memory.retrieve_relevant("fork", top_k=5))
+
+def test_handles_attach_to_existing_vectors():
+    index = SharedVectorIndex()
+    vectors = _unit_vectors(3)
+    index.handle("alice").add(vectors[:2])
+
+    attached = index.handle("alice")
+    assert len(attached) == 2
+    assert list(attached.add(vectors[2:])) == [2]
+    assert index.namespace_size("alice") == 3
+
+    index.remove_namespace("alice")
+    assert len(index.handle("alice")) == 0
+
+def test_shared_documents_are_stored_once(fresh_default_index, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    brief = tmp_path / "brief.txt"
+    brief.write_text("The desalination plant in the delta is shared by both countries.", encoding="utf-8")
+    (tmp_path / "other.txt").write_text("Fishing rights in the northern lakes.", encoding="utf-8")
+
+    alice, bob, carol = SemanticMemory(namespace="Alice"), SemanticMemory(namespace="Bob"), SemanticMemory(namespace="Carol")
+    alice.add_document_path(str(brief))
+    bob.add_document_path(str(brief))
+    carol.add_document_path(str(tmp_path / "other.txt"))
+
+    assert len(fresh_default_index) == 2
+    assert alice.count() == bob.count() == 1
+    assert "desalination" in bob.retrieve_relevant("desalination plant", top_k=1)[0]
+    assert all("desalination" not in r for r in carol.retrieve_relevant("desalination plant", top_k=5))
+
+    # reloading neither parses nor embeds the document again
+    with patch("tinytroupe.agent.memory.DocumentIngestor.ingest", return_value={}) as ingest:
+        restored = SemanticMemory.from_json(bob.to_json())
+        assert "desalination" in restored.retrieve_relevant("desalination plant", top_k=1)[0]
+    ingest.assert_called_once_with([])
+    assert len(fresh_default_index) == 2
@@ -0,0 +1,93 @@
+import pytest
+from unittest.mock import patch
+from tinytroupe.agent import TinyPerson
+from tinytroupe.agent.context_window import ContextWindowManager
+
+DONE = '{"action": {"type": "DONE", "content": "", "target": ""}, "cognitive_state": {"goals": "g", "attention": "a", "emotions": "calm"}}'
+
+def _act(agent):
+    with patch("tinytroupe.openai_utils.client") as mock_client_func:
+        mock_client_func.return_value.send_message.return_value = {"role": "assistant", "content": DONE}
+        agent.act()
+
+def test_directives_are_rendered_in_the_system_prompt_not_stored():
+    agent = TinyPerson("Directed")
+    agent.set_directive("verbosity", "Answer in two sentences.")
+
+    assert "Answer in two sentences." in agent.current_messages[0]["content"]
+    assert agent.episodic_memory.count() == 0
+
+    agent.set_directive("verbosity", "Answer in one sentence.")
+    assert agent.directives() == {"verbosity": "Answer in one sentence."}
+    assert "two sentences" not in agent.current_messages[0]["content"]
+
+    agent.remove_directive("verbosity")
+    assert "STANDING DIRECTIVES" not in agent.current_messages[0]["content"]
+
+def test_directives_set_at_once_render_the_prompt_once():
+    agent = TinyPerson("Batched")
+
+    with patch.object(agent, "generate_agent_system_prompt", wraps=agent.generate_agent_system_prompt) as render:
+        agent.set_directives({"identity": "You are Batched.", "verbosity": "Answer in two sentences."})
+
+    assert render.call_count == 1
+    assert agent.directives() == {"identity": "You are Batched.", "verbosity": "Answer in two sentences."}
+    assert "Answer in two sentences." in agent.current_messages[0]["content"]
+
+def test_prepared_prompts_are_not_rendered_again():
+    agent = TinyPerson("Prepared")
+    directives = {"identity": "You are Prepared.", "engagement": "Answer Bob."}
+    messages = agent.current_messages
+
+    tokens = agent.prepare_prompt(directives)
+
+    # preparing does not change the agent
+    assert agent.directives() == {} and agent.current_messages is messages
+
+    with patch.object(agent, "generate_agent_system_prompt", wraps=agent.generate_agent_system_prompt) as render:
+        agent.listen("Bob: where do you stand?")
+        agent.set_directives(directives)
+        report = ContextWindowManager().manage(agent)
+        _act(agent)
+
+    # the prompt is only rendered again after the act, which changed the cognitive state
+    assert render.call_count == 1
+    assert report["tokens_before"] > tokens
+    assert "Answer Bob." in agent.current_messages[0]["content"]
+
+def test_directives_expire_after_acts():
+    agent = TinyPerson("Expiring")
+    agent.set_directive("opening", "Open with a greeting.", expires_after_acts=1)
+    agent.set_directive("identity", "You are Expiring.")
+
+    _act(agent)
+    assert "opening" in agent.directives()
+
+    _act(agent)
+    assert agent.directives() == {"identity": "You are Expiring."}
+
+def test_directives_reduce_input_tokens_per_turn():
+    """
+    Compares the prompt after 10 turns of re-injecting the same boilerplate as thoughts (as the summit used to)
+    with the prompt when it is set as standing directives.
+    """
+    boilerplate = {
+        "identity": "REINFORCE IDENTITY: You are Alice. Use only your specific persona's allowed vocabulary.",
+        "verbosity": "### CORE DIRECTIVE: INTERACTIVITY & VERBOSITY ###\nConstraint: Output 50-100 words. Engage directly.",
+        "engagement": "CRITICAL: Address the arguments made by Bob immediately. Use their names.",
+    }
+
+    thinking, directed = TinyPerson("Thinking"), TinyPerson("Directed10")
+    for turn in range(10):
+        for agent in (thinking, directed):
+            agent.listen(f"Bob: my argument number {turn}.")
+        for key, text in boilerplate.items():
+            thinking.think(text)
+            directed.set_directive(key, text)
+
+    manager = ContextWindowManager()
+    thinking_tokens, directed_tokens = manager.prompt_tokens(thinking), manager.prompt_tokens(directed)
+    print(f"prompt tokens after 10 turns: {thinking_tokens} with thoughts, {directed_tokens} with directives")
+
+    assert directed.episodic_memory.count() == 10
+    assert thinking_tokens - directed_tokens > 9 * sum(len(text) // 4 for text in boilerplate.values())
@@ -0,0 +1,53 @@
+import pytest
+from unittest.mock import MagicMock, patch
+import tinytroupe.control as control
+from tinytroupe.control import Simulation, transactional
+
+class Dummy:
+    simulation_id = None
+
+    @transactional
+    def echo(self, value):
+        return value
+
+def test_transactional_skips_transaction_without_simulation():
+    """
+    Verifies that no Transaction is built when no simulation is active.
+    """
+    control.reset()
+    with patch.object(control, 'Transaction') as mock_transaction:
+        assert Dummy().echo(42) == 42
+        mock_transaction.assert_not_called()
+
+def test_transactional_preserves_function_metadata():
+    assert Dummy.echo.__name__ == "echo"
+
+def test_function_call_hash_is_stable_and_discriminating():
+    """
+    Verifies that the event fingerprint is deterministic and sensitive to every argument.
+    """
+    sim = Simulation(id="hash_test")
+    grounding = "x" * 22000
+
+    h1 = sim._function_call_hash("think", grounding, max_content_length=100)
+    h2 = sim._function_call_hash("think", "x" * 22000, max_content_length=100)
+    assert h1 == h2
+    assert h1.startswith("think:")
+
+    assert h1 != sim._function_call_hash("think", grounding + "y", max_content_length=100)
+    assert h1 != sim._function_call_hash("think", grounding, max_content_length=101)
+    assert h1 != sim._function_call_hash("listen", grounding, max_content_length=100)
+    assert sim._function_call_hash("f", "a", "b") != sim._function_call_hash("f", "ab")
+
+def test_large_argument_digests_are_memoized_and_bounded():
+    control._large_argument_digests.clear()
+    sim = Simulation(id="memo_test")
+    payload = "grounding " * 500
+
+    sim._function_call_hash("think", payload)
+    sim._function_call_hash("think", payload)
+    assert len(control._large_argument_digests) == 1
+
+    for i in range(control.MAX_MEMOIZED_ARGUMENT_DIGESTS + 10):
+        sim._function_call_hash("think", payload + str(i))
+    assert len(control._large_argument_digests) <= control.MAX_MEMOIZED_ARGUMENT_DIGESTS
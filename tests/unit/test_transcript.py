@@ -0,0 +1,80 @@
+import pytest
+from tinytroupe.agent import TinyPerson
+from tinytroupe.agent.memory import EpisodicMemory
+from tinytroupe.agent.transcript import transcript_cache
+from tinytroupe.environment import TinyWorld
+
+def _say(agent, text, kind="TALK"):
+    agent.episodic_memory.store({"role": "assistant", "type": "action", "simulation_timestamp": None,
+                                 "content": {"action": {"type": kind, "content": text, "target": ""}, "cognitive_state": {}}})
+
+@pytest.fixture
+def envoys():
+    TinyPerson.clear_agents()
+    TinyWorld.clear_environments()
+    transcript_cache().clear()
+    agents = [TinyPerson("Envoy A"), TinyPerson("Envoy B")]
+    for i in range(10):
+        agents[i % 2].listen(f"Point {i} about the [bold]port[/].", source=agents[(i + 1) % 2])
+        _say(agents[i % 2], f"Reply {i}.")
+    yield agents
+    TinyPerson.clear_agents()
+    TinyWorld.clear_environments()
+
+def test_episodes_are_rendered_once(envoys):
+    agent = envoys[0]
+    first = agent.pretty_current_interactions()
+    misses = transcript_cache().misses
+
+    assert agent.pretty_current_interactions() == first
+    assert transcript_cache().misses == misses
+
+    _say(agent, "Something new.")
+    updated = agent.pretty_current_interactions()
+    assert transcript_cache().misses == misses + 1
+    assert updated.startswith(first) and "Something new." in updated
+
+def test_windows_only_render_what_they_show(envoys):
+    agent = envoys[0]
+    transcript = agent.pretty_current_interactions(last_n=3)
+
+    # the three episodes, and the omission marker
+    assert transcript_cache().misses == 4
+    assert "Reply 8." in transcript and "Reply 0." not in transcript
+
+def test_plain_transcripts_have_no_markup(envoys):
+    world = TinyWorld("Transcript Summit", envoys)
+    plain = world.pretty_current_interactions(plain=True)
+    rich = world.pretty_current_interactions()
+
+    assert "Envoy B -> Envoy A (CONVERSATION): Point 0 about the [bold]port[/]." in plain
+    assert "Envoy A (TALK): Reply 0." in plain
+    assert "\\[bold]" in rich and "\\[bold]" not in plain
+    assert len(plain) < len(rich)
+
+def test_hidden_thoughts_are_not_served_from_the_cache(envoys):
+    agent = envoys[0]
+    _say(agent, "A private calculation.", kind="THINK")
+    assert "A private calculation." in agent.pretty_current_interactions(plain=True)
+
+    agent.show_thoughts = False
+    assert "A private calculation." not in agent.pretty_current_interactions(plain=True)
+
+def test_spilled_episodes_are_cached_by_content(tmp_path):
+    TinyPerson.clear_agents()
+    transcript_cache().clear()
+    agent = TinyPerson("Archivist")
+    agent.episodic_memory = EpisodicMemory(fixed_prefix_length=5, lookback_length=5, spill_dir=str(tmp_path))
+    for i in range(300):
+        _say(agent, f"Archived point {i}.")
+    assert agent.episodic_memory.memory.spilled_segments_count() > 0
+
+    first = agent.pretty_current_interactions(plain=True)
+    misses, entries = transcript_cache().misses, len(transcript_cache())
+
+    assert agent.pretty_current_interactions(plain=True) == first
+    assert transcript_cache().misses == misses
+    assert len(transcript_cache()) == entries
+    # spilled episodes are not kept in RAM by the cache
+    assert sum(1 for pinned, _ in transcript_cache()._entries.values() if pinned is None) > 0
+    TinyPerson.clear_agents()
@@ -0,0 +1,151 @@
+import threading
+import time
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+import tinytroupe.control as control
+from tinytroupe.control import Transaction
+from tinytroupe.agent import TinyPerson
+from tinytroupe.agent.context_window import ContextWindowManager
+from tinytroupe.environment import TinyWorld
+from tinytroupe.steering import TurnPipeline
+
+DONE = '{"action": {"type": "DONE", "content": "", "target": ""}, "cognitive_state": {"goals": "g", "attention": "a", "emotions": "calm"}}'
+
+def _agents(n):
+    return [SimpleNamespace(name=f"Envoy {i}") for i in range(n)]
+
+@pytest.fixture
+def pipeline():
+    pipeline = TurnPipeline()
+    yield pipeline
+    pipeline.close()
+
+def test_agents_act_in_order_with_their_preparation(pipeline):
+    acted = []
+
+    def action(agent, prepared):
+        acted.append((agent.name, prepared))
+        return prepared
+
+    results = pipeline.run(_agents(3), lambda agent: f"ready:{agent.name}", action)
+
+    assert acted == [(f"Envoy {i}", f"ready:Envoy {i}") for i in range(3)]
+    assert results == [f"ready:Envoy {i}" for i in range(3)]
+
+def test_next_turn_is_prepared_while_the_current_one_acts(pipeline):
+    prepared_during_action = []
+    preparing = {}
+
+    def prepare(agent):
+        preparing[agent.name] = threading.current_thread() is not threading.main_thread()
+        time.sleep(0.05)
+        return agent.name
+
+    def action(agent, prepared):
+        time.sleep(0.1)
+        prepared_during_action.append(sorted(preparing))
+
+    pipeline.run(_agents(3), prepare, action)
+
+    assert all(preparing.values())
+    assert prepared_during_action[0] == ["Envoy 0", "Envoy 1"]
+    report = pipeline.report()
+    assert report["agents"] == 3
+    assert report["overlapped_seconds"] > 0.05
+    assert report["critical_path_seconds"] < 3 * 0.1 + 3 * 0.05
+    # against preparing each turn right before its action
+    assert report["sequential_seconds"] >= 3 * 0.1 + 3 * 0.05
+    assert report["saved_seconds"] > 0.05
+
+def test_starts_are_paced_by_the_minimum_interval():
+    pipeline = TurnPipeline(min_interval=0.1)
+    starts = []
+    try:
+        pipeline.run(_agents(3), lambda agent: None, lambda agent, prepared: starts.append(time.monotonic()))
+    finally:
+        pipeline.close()
+
+    assert all(b - a >= 0.095 for a, b in zip(starts, starts[1:]))
+
+def test_preparation_failures_surface_when_the_agent_acts(pipeline):
+    acted = []
+
+    def prepare(agent):
+        if agent.name == "Envoy 1":
+            raise RuntimeError("no context")
+        return None
+
+    with pytest.raises(RuntimeError, match="no context"):
+        pipeline.run(_agents(3), prepare, lambda agent, prepared: acted.append(agent.name))
+
+    assert acted == ["Envoy 0"]
+
+def _simulated_rounds(cache_path, rounds, transaction_threads, monkeypatch):
+    execute = Transaction.execute
+
+    def recorded_execute(transaction):
+        transaction_threads.add(threading.current_thread().name)
+        return execute(transaction)
+
+    monkeypatch.setattr(Transaction, "execute", recorded_execute)
+    control.begin(cache_path=cache_path)
+    agents = [TinyPerson("Envoy A"), TinyPerson("Envoy B")]
+    world = TinyWorld("Pipelined Summit", agents)
+    world.broadcast("The talks are open.")
+    manager = ContextWindowManager()
+    pipeline = TurnPipeline()
+
+    def prepare(agent):
+        directives = {"identity": f"You are {agent.name}.", "engagement": f"Answer {agent._accessible_agents[0].name}."}
+        agent.prepare_prompt(directives)
+        return directives
+
+    def action(agent, directives):
+        agent.set_directives(directives)
+        manager.manage(agent)
+        agent.act()
+
+    try:
+        for agent, other in [(agents[0], agents[1]), (agents[1], agents[0])]:
+            agent.make_agent_accessible(other)
+
+        with patch("tinytroupe.openai_utils.client") as mock_client_func:
+            mock_client_func.return_value.send_message.return_value = {"role": "assistant", "content": DONE}
+            for _ in range(rounds):
+                pipeline.run(agents, prepare, action)
+        state = [(agent.directives(), agent.episodic_memory.count()) for agent in agents]
+    finally:
+        pipeline.close()
+        control.end()
+
+    return state
+
+def test_pipelined_agents_in_an_active_simulation(tmp_path, monkeypatch):
+    """
+    Preparations only compute, so the simulation's transactions all run in the main thread, in the same order on
+    every run, and a second run replays the first one from the cache.
+    """
+    old_agent, old_world = TinyPerson.communication_display, TinyWorld.communication_display
+    TinyPerson.communication_display = TinyWorld.communication_display = False
+    cache_path = str(tmp_path / "pipeline.cache.json")
+    try:
+        control.reset()
+        threads = set()
+        state = _simulated_rounds(cache_path, 2, threads, monkeypatch)
+        first_misses = control.cache_misses()
+
+        control.reset()
+        replayed = _simulated_rounds(cache_path, 2, threads, monkeypatch)
+        replay_hits, replay_misses = control.cache_hits(), control.cache_misses()
+    finally:
+        control.reset()
+        TinyPerson.clear_agents()
+        TinyWorld.clear_environments()
+        TinyPerson.communication_display, TinyWorld.communication_display = old_agent, old_world
+
+    assert threads == {threading.main_thread().name}
+    assert state[0][0] == {"identity": "You are Envoy A.", "engagement": "Answer Envoy B."}
+    assert replayed == state
+    assert first_misses > 0
+    assert replay_misses == 0 and replay_hits > 0
@@ -0,0 +1,117 @@
+import os
+import json
+import pytest
+from unittest.mock import MagicMock, patch
+import tinytroupe.control as control
+from tinytroupe.agent import TinyPerson
+from tinytroupe.environment import TinyWorld
+
+@pytest.fixture(autouse=True)
+def clean_registries():
+    control.reset()
+    TinyPerson.clear_agents()
+    TinyWorld.clear_environments()
+    yield
+    TinyPerson.clear_agents()
+    TinyWorld.clear_environments()
+
+def _summit():
+    alice = TinyPerson("Alice")
+    bob = TinyPerson("Bob")
+    world = TinyWorld("Summit", [alice, bob])
+    alice.make_agent_accessible(bob)
+    bob.make_agent_accessible(alice)
+    alice.listen("Opening statement.")
+    return world, alice, bob
+
+def test_fork_creates_independent_namespaced_copies():
+    world, alice, bob = _summit()
+
+    forks = world.fork(2)
+    assert [f.name for f in forks] == ["Summit [fork 1]", "Summit [fork 2]"]
+
+    fork_alice = forks[0].get_agent_by_name("Alice")
+    assert fork_alice is not alice
+    assert fork_alice.name == "Alice"
+    assert TinyPerson.get_agent_by_name("Summit [fork 1]/Alice") is fork_alice
+    assert TinyPerson.get_agent_by_name("Alice") is alice
+    assert fork_alice.environment is forks[0]
+
+    # accessible agents point inside the fork
+    assert fork_alice._accessible_agents == [forks[0].get_agent_by_name("Bob")]
+
+    # stored episodes are shared, but new ones only go to the fork that received them
+    assert fork_alice.episodic_memory.memory[0] is alice.episodic_memory.memory[0]
+    fork_alice.listen("Inject only in fork 1.")
+    assert fork_alice.episodic_memory.count() == alice.episodic_memory.count() + 1
+    assert forks[1].get_agent_by_name("Alice").episodic_memory.count() == alice.episodic_memory.count()
+
+    # mutable state is not shared
+    fork_alice._mental_state["emotions"] = "Furious"
+    assert alice._mental_state["emotions"] != "Furious"
+
+DONE = '{"action": {"type": "DONE", "content": "", "target": ""}, "cognitive_state": {"goals": "g", "attention": "a", "emotions": "calm"}}'
+
+def _forked_mid_run(cache_path):
+    control.reset()
+    TinyPerson.clear_agents()
+    TinyWorld.clear_environments()
+
+    control.begin(cache_path=cache_path, fast_forward=True)
+    try:
+        world, alice, _ = _summit()
+        alice.listen("Second statement.")
+        control.checkpoint()
+        misses = control.cache_misses()
+
+        fork = world.fork(1)[0]
+        fork_alice = fork.get_agent_by_name("Alice")
+        forked_episodes = fork_alice.episodic_memory.count()
+
+        # the fork acts while the simulation is active, without touching its cache
+        with patch("tinytroupe.openai_utils.client") as mock_client_func:
+            mock_client_func.return_value.send_message.return_value = {"role": "assistant", "content": DONE}
+            fork_alice.listen_and_act("Inject only in the fork.")
+        assert control.cache_misses() == misses
+
+        # and the simulation goes on
+        alice.listen("The summit goes on.")
+    finally:
+        control.end()
+
+    return forked_episodes, fork_alice.episodic_memory.count(), alice.episodic_memory.count()
+
+def test_fork_mid_run_under_an_active_simulation(tmp_path):
+    TinyPerson.communication_display = False
+    cache_path = str(tmp_path / "summit.cache.json")
+    try:
+        first = _forked_mid_run(cache_path)
+        # the second run replays the first one, so the fork must see the fast-forwarded state
+        replayed = _forked_mid_run(cache_path)
+    finally:
+        TinyPerson.communication_display = True
+
+    assert first == replayed
+    forked_episodes, fork_episodes, original_episodes = first
+    assert forked_episodes == 2
+    assert fork_episodes > forked_episodes
+    assert original_episodes == 3
+
+def test_run_forks_collects_results_per_branch(tmp_path):
+    world, _, _ = _summit()
+    TinyWorld.communication_display = False
+    forks = world.fork(2)
+
+    def fake_run(self, steps, timedelta_per_step=None, return_actions=False):
+        return [{"Alice": [{"type": "DONE", "content": self.name, "target": ""}]}]
+
+    try:
+        with patch.object(TinyWorld, 'run', fake_run):
+            results = TinyWorld.run_forks(forks, steps=1, output_folder=str(tmp_path))
+    finally:
+        TinyWorld.communication_display = True
+
+    assert set(results.keys()) == {"Summit [fork 1]", "Summit [fork 2]"}
+    saved = json.load(open(tmp_path / "Summit_fork_1" / "actions.json"))
+    assert saved[0]["Alice"][0]["content"] == "Summit [fork 1]"
+    assert (tmp_path / "Summit_fork_2" / "interactions.txt").exists()
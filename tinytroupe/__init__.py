@@ -31,6 +31,8 @@ utils.start_logger(config)
 default = {}
 default["embedding_model"] = config["OpenAI"].get("EMBEDDING_MODEL", "text-embedding-3-small")
 default["max_content_display_length"] = config["OpenAI"].getint("MAX_CONTENT_DISPLAY_LENGTH", 1024)
+default["context_token_budget"] = config["Simulation"].getint("CONTEXT_TOKEN_BUDGET", 32000)
+default["persona_encoding"] = config["Simulation"].get("PERSONA_ENCODING", "outline")
 if config["OpenAI"].get("API_TYPE") == "azure":
     default["azure_embedding_model_api_version"] = config["OpenAI"].get("AZURE_EMBEDDING_MODEL_API_VERSION", "2023-05-15")
 
@@ -49,15 +49,24 @@ class CognitiveActionModel(BaseModel):
     cognitive_state: Optional[CognitiveState] = None
     thought: Optional[str] = None
 
+class AgentTurn(BaseModel):
+    agent: str
+    actions: list[Action]
+    cognitive_state: Optional[CognitiveState] = None
+
+class MultiAgentTurnModel(BaseModel):
+    turns: list[AgentTurn]
+
 
 ###########################################################################
 # Exposed API
 ###########################################################################
 # from. grounding ... ---> not exposing this, clients should not need to know about detailed grounding mechanisms
 from .memory import SemanticMemory, EpisodicMemory
+from .context_window import ContextWindowManager
 from .mental_faculty import CustomMentalFaculty, RecallFaculty, FilesAndWebGroundingFaculty, TinyToolUse, SituationRoomFaculty
 from .tiny_person import TinyPerson
 
-__all__ = ["SemanticMemory", "EpisodicMemory", 
+__all__ = ["SemanticMemory", "EpisodicMemory", "ContextWindowManager",
            "CustomMentalFaculty", "RecallFaculty", "FilesAndWebGroundingFaculty", "TinyToolUse", "SituationRoomFaculty",
            "TinyPerson"]
@@ -0,0 +1,163 @@
+"""
+Local repair of the agents' action messages. Models often return messages that are almost right (a missing
+cognitive state field, an intensity given as "70%", an action given as a bare string, ...). Rather than asking the
+model again, which costs a full round trip, such messages are repaired here against `CognitiveActionModel`, filling
+missing fields from the agent's previous cognitive state. Only messages without any usable action are unrecoverable.
+"""
+
+import json
+from typing import Any
+
+from pydantic import ValidationError
+
+from tinytroupe.agent import logger, CognitiveActionModel
+
+
+# the fields of the cognitive state that carry over from the previous state when missing
+CARRIED_OVER_FIELDS = ("goals", "attention", "emotions")
+
+
+def repair_cognitive_action(message: Any, previous_state: dict, batch: bool = True) -> tuple:
+    """
+    Repairs an action message so that it conforms to `CognitiveActionModel`.
+
+    Args:
+        message (Any): The parsed message (normally a dict).
+        previous_state (dict): The agent's previous mental state, used to fill in missing cognitive state fields.
+        batch (bool): Whether a batch of actions (an "actions" list, as in eco-mode) is acceptable. If not, the
+          message must have a single action: a one-element "actions" list is turned into it, and longer batches
+          are unrecoverable.
+
+    Returns:
+        tuple: The repaired message (or None, if it cannot be repaired) and the list of repairs made.
+    """
+    repairs = []
+    if not isinstance(message, dict):
+        return None, repairs
+
+    message = dict(message)
+
+    # a bare action, without its envelope
+    if "action" not in message and "actions" not in message and "type" in message:
+        message = {"action": {key: message.pop(key) for key in ("type", "content", "target") if key in message}, **message}
+        repairs.append("action envelope")
+
+    actions = message.get("actions")
+    if actions is not None:
+        actions = actions if isinstance(actions, list) else [actions]
+        repaired_actions = [_repair_action(action, repairs) for action in actions]
+        message["actions"] = [action for action in repaired_actions if action is not None]
+        if not message["actions"]:
+            message.pop("actions")
+
+    if message.get("action") is not None:
+        message["action"] = _repair_action(message["action"], repairs)
+
+    if not batch and "actions" in message:
+        actions = message.pop("actions")
+        if message.get("action") is None:
+            if len(actions) != 1:
+                return None, repairs
+            message["action"] = actions[0]
+        repairs.append("actions")
+
+    if message.get("action") is None:
+        if not message.get("actions"):
+            return None, repairs
+        message.pop("action", None)
+
+    message["cognitive_state"] = _repair_cognitive_state(message.get("cognitive_state"), previous_state, repairs)
+
+    try:
+        validated = CognitiveActionModel.model_validate(message)
+    except ValidationError as e:
+        logger.debug(f"Action message could not be repaired: {e}")
+        return None, repairs
+
+    return validated.model_dump(exclude_none=True), repairs
+
+
+def _repair_action(action: Any, repairs: list) -> dict:
+    if isinstance(action, str):
+        # e.g., "DONE"
+        if not action.strip() or " " in action.strip():
+            return None
+        repairs.append("action type only")
+        return {"type": action.strip().upper(), "content": "", "target": ""}
+
+    if not isinstance(action, dict) or not action.get("type"):
+        return None
+
+    repaired = dict(action)
+    if not isinstance(repaired["type"], str) or repaired["type"] != repaired["type"].strip().upper():
+        repaired["type"] = str(repaired["type"]).strip().upper()
+        repairs.append("action.type")
+
+    for field in ("content", "target"):
+        value = repaired.get(field)
+        if not isinstance(value, str):
+            repaired[field] = _as_text(value)
+            repairs.append(f"action.{field}")
+
+    return repaired
+
+
+def _repair_cognitive_state(state: Any, previous_state: dict, repairs: list) -> dict:
+    if not isinstance(state, dict):
+        if state is not None:
+            repairs.append("cognitive_state")
+        state = {}
+
+    repaired = dict(state)
+    for field in CARRIED_OVER_FIELDS:
+        value = repaired.get(field)
+        if value is None or value == "":
+            previous = previous_state.get(field)
+            if previous is not None and previous != []:
+                repaired[field] = _as_text(previous)
+                repairs.append(f"cognitive_state.{field}")
+            else:
+                repaired.pop(field, None)
+        elif not isinstance(value, str):
+            repaired[field] = _as_text(value)
+            repairs.append(f"cognitive_state.{field}")
+
+    intensity = _as_intensity(repaired.get("emotional_intensity"))
+    if intensity is None:
+        intensity = _as_intensity(previous_state.get("emotional_intensity"))
+        intensity = 0.5 if intensity is None else intensity
+    if intensity != repaired.get("emotional_intensity"):
+        repaired["emotional_intensity"] = intensity
+        repairs.append("cognitive_state.emotional_intensity")
+
+    return repaired
+
+
+def _as_text(value: Any) -> str:
+    if value is None:
+        return ""
+    elif isinstance(value, str):
+        return value
+    elif isinstance(value, list):
+        return "; ".join(_as_text(item) for item in value)
+    elif isinstance(value, dict):
+        return json.dumps(value, ensure_ascii=False)
+    else:
+        return str(value)
+
+
+def _as_intensity(value: Any) -> float:
+    # intensities are in [0, 1], but models also give them as percentages or on a 0-10 scale
+    if isinstance(value, bool) or value is None:
+        return None
+    try:
+        intensity = float(str(value).strip().rstrip("%")) if not isinstance(value, (int, float)) else float(value)
+    except ValueError:
+        return None
+
+    if (isinstance(value, str) and value.strip().endswith("%")) or intensity > 10:
+        intensity /= 100
+    elif intensity > 1:
+        intensity /= 10
+
+    return min(max(intensity, 0.0), 1.0)
@@ -0,0 +1,199 @@
+"""
+A small, dependency-free BM25 inverted index over chunked text, used for lexical retrieval of grounding passages.
+"""
+
+import os
+import re
+import json
+import math
+import heapq
+from collections import Counter
+
+from tinytroupe.agent import logger
+
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# very common English words, which carry little signal for retrieval and have huge posting lists
+STOPWORDS = frozenset("""
+    a an and are as at be but by for from has have he her his i if in into is it its of on or our she so than that the
+    their them then there these they this to was we were what when which who will with you your
+""".split())
+
+
+def tokenize(text: str) -> list:
+    """
+    Splits the text into lowercase word tokens, dropping stopwords.
+    """
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def chunk_text(text: str, chunk_size: int = 1200) -> list:
+    """
+    Splits the text into chunks of roughly `chunk_size` characters, preferably at paragraph boundaries. Paragraphs
+    longer than `chunk_size` are split at word boundaries.
+    """
+    chunks = []
+    current = ""
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+
+        if len(current) + len(paragraph) + 2 <= chunk_size:
+            current = f"{current}\n\n{paragraph}" if current else paragraph
+            continue
+
+        if current:
+            chunks.append(current)
+        current = ""
+
+        while len(paragraph) > chunk_size:
+            cut = paragraph.rfind(" ", 0, chunk_size)
+            cut = cut if cut > 0 else chunk_size
+            chunks.append(paragraph[:cut].strip())
+            paragraph = paragraph[cut:].strip()
+        current = paragraph
+
+    if current:
+        chunks.append(current)
+
+    return chunks
+
+
+class BM25Index:
+    """
+    An inverted index of text chunks grouped by source (e.g., a file), scored with Okapi BM25. Sources can be
+    replaced or removed individually, which allows incremental re-indexing, and the whole index can be saved to and
+    loaded from a JSON file.
+    """
+
+    INDEX_FILE_VERSION = 1
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+
+        self.chunks = {}        # chunk id -> (source, text)
+        self.sources = {}       # source -> {"chunk_ids": [...], plus any metadata given when indexing it}
+        self._term_frequencies = {}  # chunk id -> Counter of its terms
+        self._postings = {}     # term -> {chunk id: term frequency}
+        self._lengths = {}      # chunk id -> number of terms
+        self._total_length = 0
+        self._next_chunk_id = 0
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def add_source(self, source: str, chunks: list, **metadata) -> None:
+        """
+        Indexes the given chunks under `source`, replacing whatever was previously indexed for it.
+        """
+        self.remove_source(source)
+
+        chunk_ids = []
+        for text in chunks:
+            chunk_id = self._next_chunk_id
+            self._next_chunk_id += 1
+            self._index_chunk(chunk_id, source, text, Counter(tokenize(text)))
+            chunk_ids.append(chunk_id)
+
+        self.sources[source] = {**metadata, "chunk_ids": chunk_ids}
+
+    def remove_source(self, source: str) -> None:
+        """
+        Removes everything indexed for `source`, if anything.
+        """
+        for chunk_id in self.sources.pop(source, {"chunk_ids": []})["chunk_ids"]:
+            terms = self._term_frequencies.pop(chunk_id)
+            for term in terms:
+                postings = self._postings[term]
+                del postings[chunk_id]
+                if not postings:
+                    del self._postings[term]
+            self._total_length -= self._lengths.pop(chunk_id)
+            del self.chunks[chunk_id]
+
+    def source_chunks(self, source: str) -> list:
+        """
+        Returns the texts of the chunks of `source`, in order.
+        """
+        return [self.chunks[chunk_id][1] for chunk_id in self.sources.get(source, {"chunk_ids": []})["chunk_ids"]]
+
+    def search(self, query: str, top_k: int = 5) -> list:
+        """
+        Finds the `top_k` chunks that best match the query.
+
+        Returns:
+            list: (source, text, score) tuples, sorted by decreasing score.
+        """
+        if not self.chunks:
+            return []
+
+        n = len(self.chunks)
+        average_length = self._total_length / n if self._total_length else 1.0
+
+        scores = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for chunk_id, frequency in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[chunk_id] / average_length)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+
+        best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+        logger.debug(f"BM25 search for '{query[:50]}' scored {len(scores)} of {n} chunks.")
+        return [(self.chunks[chunk_id][0], self.chunks[chunk_id][1], score) for chunk_id, score in best]
+
+    def save(self, path: str) -> None:
+        """
+        Saves the index to a JSON file. Postings are not stored, since they are cheaply rebuilt from term frequencies.
+        """
+        data = {
+            "version": self.INDEX_FILE_VERSION,
+            "k1": self.k1,
+            "b": self.b,
+            "next_chunk_id": self._next_chunk_id,
+            "sources": self.sources,
+            "chunks": {str(chunk_id): [source, text, self._term_frequencies[chunk_id]]
+                       for chunk_id, (source, text) in self.chunks.items()},
+        }
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        """
+        Loads an index previously saved with `save`.
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        if data.get("version") != cls.INDEX_FILE_VERSION:
+            raise ValueError(f"Unsupported BM25 index version in {path}: {data.get('version')}")
+
+        index = cls(k1=data["k1"], b=data["b"])
+        index._next_chunk_id = data["next_chunk_id"]
+        index.sources = data["sources"]
+        for chunk_id, (source, text, terms) in data["chunks"].items():
+            index._index_chunk(int(chunk_id), source, text, Counter(terms))
+
+        return index
+
+    def _index_chunk(self, chunk_id: int, source: str, text: str, terms: Counter) -> None:
+        self.chunks[chunk_id] = (source, text)
+        self._term_frequencies[chunk_id] = terms
+        self._lengths[chunk_id] = sum(terms.values())
+        self._total_length += self._lengths[chunk_id]
+        for term, frequency in terms.items():
+            self._postings.setdefault(term, {})[chunk_id] = frequency
@@ -0,0 +1,429 @@
+"""
+Token-budgeted management of agents' context windows. Episodes are weighed by their token counts, rather than by
+their number, so that a long grounding thought and a one-line quip are not treated alike, and old episodes are
+summarized into episodic anchors and evicted only when an agent's prompt actually exceeds its token budget.
+Pinned episodes (e.g., Layer 0 grounding) are never evicted. Summaries can be prepared in the background, while
+agents keep acting on their current memory, and are swapped in at the next safe point.
+"""
+
+import os
+import json
+import hashlib
+import threading
+import contextvars
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+
+from tinytroupe.agent import logger, default
+import tinytroupe.openai_utils as openai_utils
+from tinytroupe.llm_dispatcher import request_context, RequestPriority
+
+
+# per-message overhead of the chat format (role and separators), and the priming of the reply
+TOKENS_PER_MESSAGE = 4
+TOKENS_PER_REPLY = 3
+
+
+#######################################################################################################################
+# Token counting
+#######################################################################################################################
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # e.g., the encoding files cannot be downloaded
+        logger.debug(f"Token encoding unavailable, estimating token counts from text length instead: {e}")
+        return None
+
+
+@lru_cache(maxsize=65536)
+def count_tokens(text: str) -> int:
+    """
+    Counts the tokens in a text. Uses tiktoken when its encoding is available, and otherwise estimates the count
+    at four characters per token. Counts are memoized, so episodes are only tokenized once.
+    """
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    else:
+        return (len(text) + 3) // 4
+
+
+def episode_tokens(episode: dict) -> int:
+    """
+    Counts the tokens an episode (or any chat message) takes in a prompt.
+    """
+    content = episode.get("content", "")
+    if not isinstance(content, str):
+        # the same rendering used when the prompt is sent
+        content = str(content)
+
+    return TOKENS_PER_MESSAGE + count_tokens(content)
+
+
+def messages_tokens(messages: list) -> int:
+    """
+    Counts the tokens of a whole prompt.
+    """
+    return sum(episode_tokens(message) for message in messages) + TOKENS_PER_REPLY
+
+
+#######################################################################################################################
+# Summarization
+#######################################################################################################################
+
+class MemorySummarizer:
+    """
+    Summarizes episodes into episodic anchors, and condenses anchors when there are too many of them, using the LLM.
+    Results are memoized by the hash of what was summarized, optionally on disk, so that the same episodes (e.g.,
+    when a simulation is replayed) are never summarized twice.
+    """
+
+    def __init__(self, cache_path: str = None) -> None:
+        """
+        Initializes the summarizer.
+
+        Args:
+            cache_path (str): A JSON lines file where summaries are memoized across runs. If None, summaries are
+              only memoized in memory.
+        """
+        self.cache_path = cache_path
+        self._summaries = {}
+        self._lock = threading.Lock()
+
+        if cache_path is not None and os.path.exists(cache_path):
+            with open(cache_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        self._summaries[entry["key"]] = entry["summary"]
+                    except (json.JSONDecodeError, KeyError):
+                        # an incomplete last line, from an interrupted run
+                        continue
+
+    @staticmethod
+    def digest(values: list) -> str:
+        """
+        Hashes a list of episodes or anchors.
+        """
+        encoded = json.dumps(values, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.blake2b(encoded.encode("utf-8"), digest_size=16).hexdigest()
+
+    def summarize(self, episodes: list) -> str:
+        """
+        Summarizes the given episodes into one or two bullet points.
+
+        Returns:
+            str: The summary, or None if the LLM gave no answer.
+        """
+        return self._memoized(f"episodes:{self.digest(episodes)}", self._summarize, episodes)
+
+    def condense(self, anchors: list) -> str:
+        """
+        Condenses several anchors into a single one (a summary of summaries).
+
+        Returns:
+            str: The condensed anchor, or None if the LLM gave no answer.
+        """
+        return self._memoized(f"anchors:{self.digest(anchors)}", self._condense, anchors)
+
+    def _memoized(self, key: str, func, values: list) -> str:
+        with self._lock:
+            if key in self._summaries:
+                return self._summaries[key]
+
+        summary = func(values)
+        if summary is None:
+            # not memoized, so that the next attempt asks again
+            return None
+
+        with self._lock:
+            self._summaries[key] = summary
+            if self.cache_path is not None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+                with open(self.cache_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"key": key, "summary": summary}, ensure_ascii=False) + "\n")
+
+        return summary
+
+    def _summarize(self, episodes: list) -> str:
+        formatted_turns = ""
+        for episode in episodes:
+            role = episode.get('role', 'unknown')
+            content = episode.get('content', '')
+            # Handle dict content (Eco-Mode JSON)
+            if isinstance(content, dict):
+                content = json.dumps(content)
+            formatted_turns += f"{role.upper()}: {content}\n---\n"
+
+        summary_prompt = (
+            f"Summarize the following interaction turns into 1-2 bullet points. "
+            f"Focus on the core strategic pivot and current status of resolved points. "
+            f"Be concise and clinical.\n\n{formatted_turns}"
+        )
+
+        # Use a direct engine call to avoid polluting the agent's current thought process. Summaries are maintenance,
+        # so they give way to the agents' turns.
+        with request_context(priority=RequestPriority.BACKGROUND):
+            response = openai_utils.client().send_message([
+                {"role": "system", "content": "You are a memory compressor for high-stakes simulations. Condense history into architectural bullet points."},
+                {"role": "user", "content": summary_prompt}
+            ])
+
+        return self._answer(response, "summarize episodes")
+
+    def _condense(self, anchors: list) -> str:
+        meta_prompt = "Condense the following historical anchors into exactly two comprehensive bullet points:\n\n" + "\n".join(anchors)
+
+        with request_context(priority=RequestPriority.BACKGROUND):
+            response = openai_utils.client().send_message([
+                {"role": "system", "content": "Condense historical anchors into exactly two high-level bullet points."},
+                {"role": "user", "content": meta_prompt}
+            ])
+
+        return self._answer(response, "condense anchors")
+
+    @staticmethod
+    def _answer(response: dict, task: str) -> str:
+        # send_message returns None when the model gives no answer (e.g., the request deadline was exceeded)
+        if response is None or not response.get("content"):
+            logger.warning(f"The LLM gave no answer when asked to {task}.")
+            return None
+
+        return response["content"].strip()
+
+
+#######################################################################################################################
+# Context window management
+#######################################################################################################################
+
+class _PendingCompaction:
+    """
+    A compaction being prepared in the background: the range of episodes it evicts, their digest (to check, when it
+    is swapped in, that memory still holds them there), and the future anchors.
+    """
+
+    def __init__(self, start: int, end: int, digest: str, evicted_tokens: int, future) -> None:
+        self.start = start
+        self.end = end
+        self.digest = digest
+        self.evicted_tokens = evicted_tokens
+        self.future = future
+
+
+class ContextWindowManager:
+    """
+    Keeps agents' prompts within a token budget. Nothing happens while a prompt fits the budget; once it does not,
+    the oldest unpinned episodes are summarized into an episodic anchor and evicted, until the prompt is back under
+    `target_ratio` of the budget (so that compaction does not run again on the very next turn).
+
+    In background mode, compaction is double-buffered: the summary is prepared by a worker thread while the agent
+    keeps acting on its current memory, and the new anchors and the pruned memory are swapped in together at the
+    next call to `manage` (the safe point, e.g., the start of the next turn).
+    """
+
+    def __init__(self, token_budget: int = None, target_ratio: float = 0.75, keep_recent: int = 4,
+                 max_anchors: int = 3, summarizer: MemorySummarizer = None, background: bool = False,
+                 max_workers: int = 4) -> None:
+        """
+        Initializes the manager.
+
+        Args:
+            token_budget (int): The maximum number of prompt tokens per agent. Defaults to the configured
+              CONTEXT_TOKEN_BUDGET.
+            target_ratio (float): The fraction of the budget that compaction brings prompts down to.
+            keep_recent (int): How many of the most recent episodes are never evicted.
+            max_anchors (int): How many episodic anchors are kept before they are condensed into one.
+            summarizer (MemorySummarizer): The summarizer to use. Defaults to the LLM-based one.
+            background (bool): Whether to prepare summaries in worker threads, swapping them in at the next call
+              to `manage`, rather than summarizing inline.
+            max_workers (int): The maximum number of worker threads, in background mode.
+        """
+        self.token_budget = token_budget if token_budget is not None else default["context_token_budget"]
+        self.target_ratio = target_ratio
+        self.keep_recent = keep_recent
+        self.max_anchors = max_anchors
+        self.summarizer = summarizer if summarizer is not None else MemorySummarizer()
+        self.background = background
+        self.max_workers = max_workers
+
+        self._executor = None
+        self._pending = {} # agent name -> _PendingCompaction
+
+    def pin(self, agent, count: int = None) -> None:
+        """
+        Pins the first `count` episodes of the agent's episodic memory (by default, all current ones), so that
+        they are never evicted.
+        """
+        agent.episodic_memory.pin(count)
+
+    def prompt_tokens(self, agent) -> int:
+        """
+        Counts the tokens of the prompt the agent would currently send, without rendering it again. The system
+        message is the one the agent rendered last (whatever changes it, such as directives, anchors or the
+        cognitive state, resets the agent's prompt), so only the recent memories, which grow without a reset,
+        are gathered again. Token counts are memoized by text, so only new episodes are actually tokenized.
+        """
+        messages = agent.current_messages[:1] + agent.retrieve_recent_memories() + agent.current_messages[-1:]
+        return messages_tokens(messages)
+
+    def manage(self, agent) -> dict:
+        """
+        Swaps in the agent's pending compaction, if any, and then compacts its memory (or, in background mode,
+        starts preparing the compaction) if its prompt exceeds the token budget.
+
+        Returns:
+            dict: A report with the agent's prompt tokens, before and after, the evicted episodes and tokens, and
+              the episodes whose compaction is pending.
+        """
+        tokens = self.prompt_tokens(agent)
+        report = {"agent": agent.name, "budget": self.token_budget, "tokens_before": tokens, "tokens_after": tokens,
+                  "evicted_episodes": 0, "evicted_tokens": 0, "pending_episodes": 0}
+
+        swapped = self._swap(agent)
+        if swapped is not None:
+            report["evicted_episodes"], report["evicted_tokens"] = swapped
+            tokens = self.prompt_tokens(agent)
+
+        if tokens > self.token_budget:
+            start, end, evicted_tokens = self._select(agent, tokens)
+            if end > start:
+                if self.background:
+                    self._pending[agent.name] = self._submit(agent, start, end, evicted_tokens)
+                    report["pending_episodes"] = end - start
+
+                elif self.compact(agent, start, end):
+                    report["evicted_episodes"] += end - start
+                    report["evicted_tokens"] += evicted_tokens
+                    tokens = self.prompt_tokens(agent)
+
+            else:
+                logger.warning(f"[{agent.name}]: Prompt ({tokens} tokens) exceeds the context budget "
+                               f"({self.token_budget} tokens), but the rest is pinned or recent.")
+
+        report["tokens_after"] = tokens
+        return report
+
+    def manage_all(self, agents: list) -> list:
+        """
+        Manages the context windows of several agents. In background mode, their summaries are prepared concurrently.
+        """
+        return [self.manage(agent) for agent in agents]
+
+    def compact(self, agent, start: int, end: int) -> bool:
+        """
+        Summarizes the agent's episodes in the range [start, end) into an episodic anchor, and evicts them.
+        Memory is left untouched if summarization fails, so that the next call to `manage` tries again.
+
+        Returns:
+            bool: Whether the episodes were evicted.
+        """
+        try:
+            anchors = self._summarize_into_anchors(agent.episodic_memory.memory[start:end], agent._episodic_anchors)
+        except Exception as e:
+            logger.warning(f"Failed to compress memory for {agent.name}: {e}")
+            return False
+
+        if anchors is None:
+            logger.warning(f"[{agent.name}]: No summary of {end - start} episodes; keeping them, and retrying "
+                           f"at the next manage.")
+            return False
+
+        self._apply(agent, start, end, anchors)
+        return True
+
+    def has_pending(self, agent) -> bool:
+        """
+        Whether a compaction is being prepared for the agent.
+        """
+        return agent.name in self._pending
+
+    def close(self) -> None:
+        """
+        Discards pending compactions and stops the worker threads.
+        """
+        self._pending = {}
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _select(self, agent, tokens: int) -> tuple:
+        # the oldest unpinned, non-recent episodes whose eviction brings the prompt under the target
+        memory = agent.episodic_memory
+        start = min(memory.pinned_length, memory.count())
+        limit = memory.count() - self.keep_recent
+        target = self.token_budget * self.target_ratio
+
+        end = start
+        evicted_tokens = 0
+        while end < limit and tokens - evicted_tokens > target:
+            evicted_tokens += episode_tokens(memory.memory[end])
+            end += 1
+
+        return start, end, evicted_tokens
+
+    def _summarize_into_anchors(self, episodes: list, anchors: list) -> list:
+        # None if the episodes could not be summarized, in which case they must be kept
+        summary = self.summarizer.summarize(episodes)
+        if summary is None:
+            return None
+
+        anchors = list(anchors) + [summary]
+        if len(anchors) > self.max_anchors:
+            logger.info(f"Condensing historical anchors (Summary of Summaries)...")
+            condensed = self.summarizer.condense(anchors)
+            if condensed is not None:
+                anchors = [condensed]
+            else:
+                # the episodes are still summarized; condensing is tried again with the next anchor
+                logger.warning(f"Keeping {len(anchors)} anchors uncondensed.")
+
+        return anchors
+
+    def _submit(self, agent, start: int, end: int, evicted_tokens: int) -> _PendingCompaction:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="context_window")
+
+        # episodes are never modified in place, so the worker can safely read this snapshot
+        episodes = agent.episodic_memory.memory[start:end]
+        # the worker runs in the caller's request context (e.g., its session)
+        future = self._executor.submit(contextvars.copy_context().run,
+                                       self._summarize_into_anchors, episodes, list(agent._episodic_anchors))
+        logger.debug(f"[{agent.name}]: Preparing the compaction of {end - start} episodes in the background.")
+
+        return _PendingCompaction(start, end, self.summarizer.digest(episodes), evicted_tokens, future)
+
+    def _swap(self, agent) -> tuple:
+        pending = self._pending.pop(agent.name, None)
+        if pending is None:
+            return None
+
+        try:
+            # the summary has had a whole turn to be prepared, so this rarely blocks
+            anchors = pending.future.result()
+        except Exception as e:
+            logger.warning(f"Failed to compress memory for {agent.name}: {e}")
+            return None
+
+        if anchors is None:
+            logger.warning(f"[{agent.name}]: No summary of {pending.end - pending.start} episodes; keeping them, "
+                           f"and retrying at the next manage.")
+            return None
+
+        if self.summarizer.digest(agent.episodic_memory.memory[pending.start:pending.end]) != pending.digest:
+            logger.warning(f"[{agent.name}]: Memory changed while its compaction was being prepared; discarding it.")
+            return None
+
+        self._apply(agent, pending.start, pending.end, anchors)
+        return pending.end - pending.start, pending.evicted_tokens
+
+    def _apply(self, agent, start: int, end: int, anchors: list) -> None:
+        agent._episodic_anchors = anchors
+        agent.episodic_memory.delete_episodes(start, end)
+
+        # Rebuild current_messages to reflect the purged history
+        agent.reset_prompt()
+        logger.info(f"[{agent.name}]: Context window archived. Memory pruned by {end - start} episodes.")
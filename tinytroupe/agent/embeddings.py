@@ -0,0 +1,653 @@
+"""
+Offline text embeddings and vector indexes, used to provide semantic retrieval (e.g., for semantic memory and grounding)
+without depending on external services.
+"""
+
+import os
+import re
+import json
+import zlib
+import hashlib
+import threading
+import weakref
+from functools import lru_cache
+
+import numpy as np
+
+from tinytroupe.agent import logger
+
+
+#######################################################################################################################
+# Embedders
+#######################################################################################################################
+
+class HashedNGramEmbedder:
+    """
+    A deterministic, fully local embedder. Texts are split into word unigrams and character n-grams, which are hashed
+    into a fixed number of dimensions (the so-called "hashing trick"), weighted sublinearly and L2-normalized. Texts
+    sharing vocabulary therefore end up close in cosine similarity, which is enough for memory and document retrieval.
+    """
+
+    TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+    def __init__(self, dimensions: int = 512, char_ngram_range: tuple = (3, 4)) -> None:
+        """
+        Initializes the embedder.
+
+        Args:
+            dimensions (int): The number of dimensions of the produced vectors. Defaults to 512.
+            char_ngram_range (tuple): The (min, max) lengths of the character n-grams to extract from each word.
+        """
+        self.dimensions = dimensions
+        self.char_ngram_range = tuple(char_ngram_range)
+
+    @property
+    def name(self) -> str:
+        return f"hashed-ngram-{self.dimensions}-{self.char_ngram_range[0]}-{self.char_ngram_range[1]}"
+
+    def embed(self, texts: list) -> np.ndarray:
+        """
+        Embeds the given texts, returning a (len(texts), dimensions) float32 matrix of unit vectors.
+        """
+        rows, indices, signs = [], [], []
+        for row, text in enumerate(texts):
+            text_indices, text_signs = self._features(str(text))
+            rows.extend([row] * len(text_indices))
+            indices.extend(text_indices)
+            signs.extend(text_signs)
+
+        # all features are accumulated at once, rather than text by text
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        np.add.at(vectors, (np.array(rows, dtype=np.int64), np.array(indices, dtype=np.int64)), np.array(signs, dtype=np.float32))
+
+        # sublinear term frequency, then normalization
+        np.copyto(vectors, np.sign(vectors) * np.log1p(np.abs(vectors)))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _features(self, text: str) -> tuple:
+        indices = []
+        signs = []
+        for word in self.TOKEN_PATTERN.findall(text.lower()):
+            word_indices, word_signs = _word_features(word, self.dimensions, self.char_ngram_range)
+            indices.extend(word_indices)
+            signs.extend(word_signs)
+
+        return indices, signs
+
+
+@lru_cache(maxsize=100_000)
+def _word_features(word: str, dimensions: int, char_ngram_range: tuple) -> tuple:
+    """
+    Hashes a word and its character n-grams into (indices, signs). Memoized, since vocabularies are small
+    compared to the amount of text embedded.
+    """
+    features = [word]
+    padded = f"<{word}>"
+    for n in range(char_ngram_range[0], char_ngram_range[1] + 1):
+        features.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+
+    indices = []
+    signs = []
+    for feature in features:
+        h = zlib.crc32(feature.encode("utf-8"))
+        indices.append(h % dimensions)
+        signs.append(1.0 if (h >> 31) & 1 == 0 else -1.0)
+
+    return tuple(indices), tuple(signs)
+
+
+class APIEmbedder:
+    """
+    Embeds texts with the embedding model of the configured LLM API, one request per call.
+    """
+
+    def __init__(self, model: str = None) -> None:
+        from tinytroupe import openai_utils
+        self.model = model if model is not None else openai_utils.default["embedding_model"]
+
+    @property
+    def name(self) -> str:
+        return self.model
+
+    def embed(self, texts: list) -> np.ndarray:
+        from tinytroupe import openai_utils
+        vectors = np.array(openai_utils.client().get_embeddings(list(texts), model=self.model), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+#######################################################################################################################
+# Embedding service
+#######################################################################################################################
+
+class EmbeddingCache:
+    """
+    A persistent, append-only store of embeddings computed by one embedder. Vectors are stored as float16 in a flat
+    binary file that is read through a memory map, and located by the hash of their text.
+    """
+
+    def __init__(self, cache_dir: str, embedder_name: str) -> None:
+        safe_name = re.sub(r"[^\w.-]+", "_", embedder_name)
+        self.directory = os.path.join(cache_dir, safe_name)
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._vectors_path = os.path.join(self.directory, "vectors.f16")
+        self._keys_path = os.path.join(self.directory, "keys.txt")
+        self._meta_path = os.path.join(self.directory, "meta.json")
+
+        self.dimensions = None
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                self.dimensions = json.load(f)["dimensions"]
+
+        # each line of the keys file holds a text hash and the row of its vector
+        self._rows = {}
+        if os.path.exists(self._keys_path):
+            with open(self._keys_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) == 2:
+                        self._rows[parts[0]] = int(parts[1])
+
+        # an interrupted write may leave keys without vectors; those are not trusted
+        stored = self._stored_rows()
+        self._rows = {key: row for key, row in self._rows.items() if row < stored}
+
+        self._map = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def get(self, keys: list) -> dict:
+        """
+        Returns the cached vectors (as float32) of the given keys, for those that are cached.
+        """
+        with self._lock:
+            found = [(key, self._rows[key]) for key in keys if key in self._rows]
+            if not found:
+                return {}
+
+            if self._map is None or len(self._map) <= max(row for _, row in found):
+                self._map = np.memmap(self._vectors_path, dtype=np.float16, mode="r", shape=(self._stored_rows(), self.dimensions))
+
+            return {key: self._map[row].astype(np.float32) for key, row in found}
+
+    def put(self, keys: list, vectors: np.ndarray) -> None:
+        """
+        Appends the given vectors to the cache.
+        """
+        vectors = np.asarray(vectors, dtype=np.float16)
+        with self._lock:
+            if self.dimensions is None:
+                self.dimensions = int(vectors.shape[1])
+                with open(self._meta_path, "w", encoding="utf-8") as f:
+                    json.dump({"dimensions": self.dimensions}, f)
+
+            new = [(key, vector) for key, vector in zip(keys, vectors) if key not in self._rows]
+            if not new:
+                return
+
+            # vectors first, then keys, so that a key never points to a missing vector
+            first_row = self._stored_rows()
+            with open(self._vectors_path, "r+b" if os.path.exists(self._vectors_path) else "wb") as f:
+                # drops any partially written vector
+                f.seek(first_row * 2 * self.dimensions)
+                f.truncate()
+                f.write(np.stack([vector for _, vector in new]).tobytes())
+            with open(self._keys_path, "a", encoding="utf-8") as f:
+                f.write("".join(f"{key} {first_row + i}\n" for i, (key, _) in enumerate(new)))
+
+            for i, (key, _) in enumerate(new):
+                self._rows[key] = first_row + i
+
+    def _stored_rows(self) -> int:
+        if self.dimensions is None or not os.path.exists(self._vectors_path):
+            return 0
+        return os.path.getsize(self._vectors_path) // (2 * self.dimensions)
+
+
+class EmbeddingService:
+    """
+    Embeds texts through an embedder (e.g., `HashedNGramEmbedder` offline, or `APIEmbedder`), avoiding redundant work:
+    repeated texts within a request are embedded once, texts are sent to the embedder in batches of up to `batch_size`,
+    and, if a `cache_dir` is given, vectors are cached on disk (see `EmbeddingCache`) and reused across runs.
+    """
+
+    def __init__(self, embedder=None, cache_dir: str = None, batch_size: int = None) -> None:
+        from tinytroupe import openai_utils
+
+        self.embedder = embedder if embedder is not None else HashedNGramEmbedder()
+        self.batch_size = batch_size if batch_size is not None else openai_utils.default["embedding_batch_size"]
+        self.cache = EmbeddingCache(cache_dir, self.embedder.name) if cache_dir is not None else None
+
+    @property
+    def name(self) -> str:
+        return self.embedder.name
+
+    def __deepcopy__(self, memo) -> "EmbeddingService":
+        # services are stateless apart from their cache, which is meant to be shared
+        return self
+
+    def embed(self, texts: list) -> np.ndarray:
+        """
+        Embeds the given texts, returning a (len(texts), dimensions) float32 matrix of unit vectors.
+        """
+        keys = [self._key(text) for text in texts]
+
+        unique = {}
+        for key, text in zip(keys, texts):
+            unique.setdefault(key, text)
+
+        vectors = self.cache.get(list(unique)) if self.cache is not None else {}
+        missing = [key for key in unique if key not in vectors]
+
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start:start + self.batch_size]
+            embedded = self.embedder.embed([unique[key] for key in batch])
+            if self.cache is not None:
+                self.cache.put(batch, embedded)
+            vectors.update(zip(batch, embedded))
+
+        logger.debug(f"Embedded {len(texts)} texts: {len(unique)} unique, {len(missing)} computed.")
+
+        if not texts:
+            return np.zeros((0, getattr(self.embedder, "dimensions", 0)), dtype=np.float32)
+        return np.stack([vectors[key] for key in keys]).astype(np.float32, copy=False)
+
+    @staticmethod
+    def _key(text: str) -> str:
+        return hashlib.blake2b(str(text).encode("utf-8"), digest_size=16).hexdigest()
+
+
+_default_embedding_service = None
+
+def default_embedding_service() -> EmbeddingService:
+    """
+    Returns the embedding service shared by default by semantic memories and grounding connectors. It embeds offline,
+    and caches vectors on disk if `EMBEDDING_CACHE_DIR` is configured.
+    """
+    global _default_embedding_service
+    if _default_embedding_service is None:
+        from tinytroupe import openai_utils
+        _default_embedding_service = EmbeddingService(HashedNGramEmbedder(), cache_dir=openai_utils.default["embedding_cache_dir"])
+
+    return _default_embedding_service
+
+
+#######################################################################################################################
+# Vector indexes
+#######################################################################################################################
+
+class VectorIndex:
+    """
+    An exact, in-memory vector index over unit vectors. Vectors are kept in a preallocated NumPy matrix that grows
+    geometrically, so incremental additions are amortized O(1), and queries are answered in batch with a single
+    matrix product followed by a partial sort.
+    """
+
+    def __init__(self, dimensions: int = None, initial_capacity: int = 256) -> None:
+        """
+        Initializes the index.
+
+        Args:
+            dimensions (int, optional): The dimensions of the vectors. If None, taken from the first vectors added.
+            initial_capacity (int): How many vectors to preallocate room for.
+        """
+        self.dimensions = dimensions
+        self._initial_capacity = initial_capacity
+        self._matrix = np.zeros((initial_capacity, dimensions), dtype=np.float32) if dimensions is not None else None
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, vectors: np.ndarray) -> range:
+        """
+        Adds vectors to the index, returning the range of ids assigned to them.
+        """
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        if self._matrix is None:
+            self.dimensions = vectors.shape[1]
+            self._matrix = np.zeros((self._initial_capacity, self.dimensions), dtype=np.float32)
+
+        required = self._size + len(vectors)
+        if required > len(self._matrix):
+            capacity = max(required, 2 * len(self._matrix))
+            grown = np.zeros((capacity, self.dimensions), dtype=np.float32)
+            grown[:self._size] = self._matrix[:self._size]
+            self._matrix = grown
+
+        self._matrix[self._size:required] = vectors
+        ids = range(self._size, required)
+        self._size = required
+        return ids
+
+    def search(self, queries: np.ndarray, top_k: int) -> list:
+        """
+        Finds the `top_k` most similar vectors (by cosine similarity) to each query.
+
+        Returns:
+            list: For each query, a list of (id, score) pairs, sorted by decreasing score.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if self._size == 0 or top_k <= 0:
+            return [[] for _ in range(len(queries))]
+
+        scores = queries @ self._matrix[:self._size].T
+        k = min(top_k, self._size)
+        if k < self._size:
+            candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            candidates = np.tile(np.arange(self._size), (len(queries), 1))
+
+        results = []
+        for row, row_candidates in enumerate(candidates):
+            row_scores = scores[row, row_candidates]
+            order = np.argsort(-row_scores, kind="stable")
+            results.append([(int(row_candidates[i]), float(row_scores[i])) for i in order])
+
+        logger.debug(f"Vector search over {self._size} vectors for {len(queries)} queries.")
+        return results
+
+
+class SharedVectorIndex:
+    """
+    An approximate nearest-neighbor index meant to be shared by a whole population of agents. Each vector belongs to
+    a namespace (typically one per agent), and the `SHARED_NAMESPACE` holds vectors visible to everyone. Documents read
+    by many agents (e.g., common grounding) are stored once too, each in a namespace of its own under the shared one
+    (see `add_shared_document`), and are only visible to the handles that attached them.
+
+    Search is exact while the candidate namespaces are small. Once the index is large enough, it is partitioned with
+    k-means into inverted lists (IVF), and queries over large namespaces only scan the `n_probe` lists closest to the
+    query. The partition is retrained whenever the index doubles in size, so the cost of training is amortized.
+
+    Agents access the index through lightweight `IndexHandle`s, obtained with `handle(namespace)`.
+    """
+
+    SHARED_NAMESPACE = "shared"
+
+    def __init__(self, n_probe: int = 8, train_threshold: int = 4096, exact_search_limit: int = 2048) -> None:
+        """
+        Initializes the index.
+
+        Args:
+            n_probe (int): How many inverted lists to scan per query.
+            train_threshold (int): How many vectors must be stored before the inverted lists are first built.
+            exact_search_limit (int): Up to how many candidate vectors a query is answered by exact search.
+        """
+        self.n_probe = n_probe
+        self.train_threshold = train_threshold
+        self.exact_search_limit = exact_search_limit
+
+        self._vectors = VectorIndex()
+        self._payloads = []
+        self._namespace_of = []       # vector id -> namespace
+        self._namespace_ids = {}      # namespace -> list of (live) vector ids
+        self._namespace_arrays = {}   # namespace -> cached array version of the above
+        self._dead = 0
+        self._handles_created = 0
+        self._exclusive_handles = weakref.WeakValueDictionary() # namespace -> live exclusive handle
+
+        self._centroids = None
+        self._lists = []              # centroid -> list of vector ids
+        self._trained_size = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._vectors) - self._dead
+
+    def handle(self, namespace: str, exclusive: bool = False) -> "IndexHandle":
+        """
+        Returns a handle to the given namespace, attached to the vectors already in it. Nothing is removed; use
+        `remove_namespace` to clear a namespace explicitly.
+
+        With `exclusive`, the handle gets a namespace to itself instead, starting empty: the given one, unless a live
+        exclusive handle already holds it, in which case a new namespace is derived from it. Semantic memories use
+        exclusive handles, so that a second memory with the same namespace (e.g., decoded from a state, or forked)
+        never touches the vectors of a live one. The vectors of an exclusive handle are removed when it is collected.
+        """
+        with self._lock:
+            if not exclusive:
+                return IndexHandle(self, namespace)
+
+            base_namespace = namespace
+            while namespace in self._exclusive_handles:
+                self._handles_created += 1
+                namespace = f"{base_namespace}#{self._handles_created}"
+
+            # whatever is left in the namespace belongs to no live handle
+            self.remove_namespace(namespace)
+            handle = IndexHandle(self, namespace)
+            self._exclusive_handles[namespace] = handle
+            weakref.finalize(handle, self._release, namespace)
+            return handle
+
+    def _release(self, namespace: str) -> None:
+        with self._lock:
+            if namespace not in self._exclusive_handles:
+                self.remove_namespace(namespace)
+
+    def namespace_size(self, namespace: str) -> int:
+        return len(self._namespace_ids.get(namespace, []))
+
+    @staticmethod
+    def shared_document_namespace(key: str) -> str:
+        """
+        Returns the namespace of the shared document with the given key.
+        """
+        return f"{SharedVectorIndex.SHARED_NAMESPACE}/{key}"
+
+    def has_shared_document(self, key: str) -> bool:
+        return self.namespace_size(self.shared_document_namespace(key)) > 0
+
+    def add_shared_document(self, key: str, vectors: np.ndarray, payloads: list) -> bool:
+        """
+        Stores the vectors of a document shared by many agents (e.g., its chunks), unless a document with the same
+        key (e.g., a digest of its contents) is already stored. Returns whether the vectors were added.
+        """
+        with self._lock:
+            if self.has_shared_document(key) or len(payloads) == 0:
+                return False
+
+            self.add(self.shared_document_namespace(key), vectors, payloads)
+            return True
+
+    def add(self, namespace: str, vectors: np.ndarray, payloads: list) -> list:
+        """
+        Adds vectors to a namespace, each with a payload returned by searches (e.g., a document or a document id).
+        """
+        with self._lock:
+            ids = list(self._vectors.add(vectors))
+            self._payloads.extend(payloads)
+            self._namespace_of.extend([namespace] * len(ids))
+            self._namespace_ids.setdefault(namespace, []).extend(ids)
+            self._namespace_arrays.pop(namespace, None)
+
+            if self._centroids is not None and ids:
+                assignments = np.argmax(self._vectors._matrix[ids[0]:ids[-1] + 1] @ self._centroids.T, axis=1)
+                for vector_id, centroid in zip(ids, assignments):
+                    self._lists[centroid].append(vector_id)
+
+            if len(self) >= self.train_threshold and len(self) >= 2 * self._trained_size:
+                self._train()
+            elif self._dead > max(len(self), self.exact_search_limit):
+                self._compact()
+
+            return ids
+
+    def remove_namespace(self, namespace: str) -> None:
+        """
+        Removes all vectors of a namespace. Space is reclaimed lazily, once removed vectors outnumber live ones.
+        """
+        with self._lock:
+            removed = self._namespace_ids.pop(namespace, [])
+            self._namespace_arrays.pop(namespace, None)
+            for vector_id in removed:
+                self._namespace_of[vector_id] = None
+                self._payloads[vector_id] = None
+            self._dead += len(removed)
+
+    def search(self, namespaces: list, queries: np.ndarray, top_k: int) -> list:
+        """
+        Finds, for each query, the `top_k` most similar vectors among those of the given namespaces.
+
+        Returns:
+            list: For each query, a list of (payload, score) pairs, sorted by decreasing score.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        with self._lock:
+            candidates = [self._namespace_array(namespace) for namespace in namespaces if self.namespace_size(namespace) > 0]
+            candidates = np.concatenate(candidates) if candidates else np.zeros(0, dtype=np.int64)
+            if len(candidates) == 0 or top_k <= 0:
+                return [[] for _ in range(len(queries))]
+
+            results = []
+            for query in queries:
+                if self._centroids is None or len(candidates) <= self.exact_search_limit:
+                    ids = candidates
+                else:
+                    ids = self._probe(query, set(namespaces))
+
+                results.append(self._rank(query, ids, top_k))
+
+            return results
+
+    def _namespace_array(self, namespace: str) -> np.ndarray:
+        array = self._namespace_arrays.get(namespace)
+        if array is None:
+            array = np.array(self._namespace_ids[namespace], dtype=np.int64)
+            self._namespace_arrays[namespace] = array
+        return array
+
+    def _probe(self, query: np.ndarray, namespaces: set) -> np.ndarray:
+        closest = np.argsort(-(self._centroids @ query))[:self.n_probe]
+        ids = [vector_id for centroid in closest for vector_id in self._lists[centroid]
+               if self._namespace_of[vector_id] in namespaces]
+        return np.array(ids, dtype=np.int64)
+
+    def _rank(self, query: np.ndarray, ids: np.ndarray, top_k: int) -> list:
+        if len(ids) == 0:
+            return []
+
+        scores = self._vectors._matrix[ids] @ query
+        k = min(top_k, len(ids))
+        best = np.argpartition(-scores, k - 1)[:k] if k < len(ids) else np.arange(len(ids))
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [(self._payloads[ids[i]], float(scores[i])) for i in best]
+
+    def _train(self, iterations: int = 10, sample_size: int = 20000) -> None:
+        self._compact()
+        vectors = self._vectors._matrix[:len(self._vectors)]
+        n_lists = int(min(1024, max(8, np.sqrt(len(vectors)))))
+
+        rng = np.random.default_rng(0)
+        sample = vectors[rng.choice(len(vectors), size=min(sample_size, len(vectors)), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(n_lists):
+                members = sample[assignments == c]
+                if len(members) > 0:
+                    mean = members.sum(axis=0)
+                    norm = np.linalg.norm(mean)
+                    centroids[c] = mean / norm if norm > 0 else centroids[c]
+
+        self._centroids = centroids
+        self._lists = [[] for _ in range(n_lists)]
+        for vector_id, centroid in enumerate(np.argmax(vectors @ centroids.T, axis=1)):
+            self._lists[centroid].append(vector_id)
+
+        self._trained_size = len(vectors)
+        logger.debug(f"Trained shared vector index: {len(vectors)} vectors in {n_lists} lists.")
+
+    def _compact(self) -> None:
+        """
+        Drops removed vectors, renumbering the live ones.
+        """
+        if self._dead == 0:
+            return
+
+        live = np.array([vector_id for vector_id, namespace in enumerate(self._namespace_of) if namespace is not None], dtype=np.int64)
+        new_id = {int(old): new for new, old in enumerate(live)}
+
+        vectors = VectorIndex(self._vectors.dimensions, initial_capacity=max(len(live), 1))
+        if len(live) > 0:
+            vectors.add(self._vectors._matrix[live])
+        self._vectors = vectors
+        self._payloads = [self._payloads[i] for i in live]
+        self._namespace_of = [self._namespace_of[i] for i in live]
+        self._namespace_ids = {namespace: [new_id[i] for i in ids] for namespace, ids in self._namespace_ids.items()}
+        self._namespace_arrays = {}
+        self._lists = [[new_id[i] for i in ids if i in new_id] for ids in self._lists]
+        self._dead = 0
+
+
+class IndexHandle:
+    """
+    A view of one namespace of a `SharedVectorIndex`, with the same interface as `VectorIndex`: vectors added through
+    the handle get consecutive local ids, and searches return those ids. Searches also cover the shared namespace and
+    the shared documents attached to the handle; matches from those are returned with their payload instead of an id.
+    """
+
+    def __init__(self, index: SharedVectorIndex, namespace: str) -> None:
+        self.index = index
+        self.namespace = namespace
+        self.shared_documents = [] # keys of the attached shared documents
+        self._size = index.namespace_size(namespace)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __deepcopy__(self, memo) -> "IndexHandle":
+        # a copy (e.g., of a forked agent) gets its own namespace, starting with the same vectors
+        copied = self.index.handle(self.namespace, exclusive=True)
+        with self.index._lock:
+            ids = self.index._namespace_ids.get(self.namespace, [])
+            vectors = self.index._vectors._matrix[ids] if ids else None
+        if vectors is not None:
+            copied.add(vectors)
+        copied.shared_documents = list(self.shared_documents)
+        return copied
+
+    def attach_shared_document(self, key: str) -> None:
+        """
+        Makes a shared document (see `SharedVectorIndex.add_shared_document`) visible to searches through the handle.
+        """
+        if key not in self.shared_documents:
+            self.shared_documents.append(key)
+
+    def shared_size(self) -> int:
+        """
+        Returns how many vectors of the attached shared documents the handle can see.
+        """
+        return sum(self.index.namespace_size(self.index.shared_document_namespace(key)) for key in self.shared_documents)
+
+    def add(self, vectors: np.ndarray) -> range:
+        vectors = np.atleast_2d(vectors)
+        local_ids = range(self._size, self._size + len(vectors))
+        self.index.add(self.namespace, vectors, list(local_ids))
+        self._size += len(vectors)
+        return local_ids
+
+    def search(self, queries: np.ndarray, top_k: int, include_shared: bool = True) -> list:
+        namespaces = [self.namespace]
+        if include_shared:
+            namespaces += [SharedVectorIndex.SHARED_NAMESPACE] + [self.index.shared_document_namespace(key) for key in self.shared_documents]
+        return self.index.search(namespaces, queries, top_k)
+
+
+_default_shared_index = None
+
+def default_shared_index() -> SharedVectorIndex:
+    """
+    Returns the vector index shared by all semantic memories that use a namespace.
+    """
+    global _default_shared_index
+    if _default_shared_index is None:
+        _default_shared_index = SharedVectorIndex()
+
+    return _default_shared_index
@@ -0,0 +1,147 @@
+"""
+A bounded record of an agent's emotional trajectory. Points are kept in fixed-capacity arrays: the most recent ones
+at full resolution, and older ones progressively downsampled, so that the cost of keeping, rendering and snapshotting
+the trajectory stays constant however long the simulation runs.
+"""
+
+import numpy as np
+
+from tinytroupe.utils import JsonSerializableRegistry
+
+
+class EmotionalTrajectory(JsonSerializableRegistry):
+    """
+    The (turn, intensity, emotion) points of an agent's emotional history, with summary statistics. A downsampled
+    point stands for a span of consecutive turns: it holds the first of them, their mean intensity and the last emotion.
+    """
+
+    serializable_attributes = ["max_points", "recent_points", "recorded", "emotions", "turns", "spans", "intensities", "emotion_ids"]
+
+    custom_serialization_initializers = {
+        "turns": lambda values: np.asarray(values, dtype=np.int32),
+        "spans": lambda values: np.asarray(values, dtype=np.int32),
+        "intensities": lambda values: np.asarray(values, dtype=np.float32),
+        "emotion_ids": lambda values: np.asarray(values, dtype=np.int16),
+    }
+
+    # per-turn change in intensity above which the trajectory is considered rising or falling
+    TREND_THRESHOLD = 0.02
+
+    def __init__(self, max_points: int = 64, recent_points: int = 16) -> None:
+        """
+        Initializes the trajectory.
+
+        Args:
+            max_points (int): The maximum number of points kept.
+            recent_points (int): How many of the most recent points are never downsampled.
+        """
+        assert 0 < recent_points < max_points, "recent_points must be positive and smaller than max_points"
+
+        self.max_points = max_points
+        self.recent_points = recent_points
+        self.recorded = 0   # points ever recorded, i.e., the turn of the latest point
+        self.emotions = []  # emotion id -> label
+        self.turns = np.zeros(0, dtype=np.int32)
+        self.spans = np.zeros(0, dtype=np.int32)  # how many turns each point stands for
+        self.intensities = np.zeros(0, dtype=np.float32)
+        self.emotion_ids = np.zeros(0, dtype=np.int16)
+
+    def __len__(self) -> int:
+        return len(self.turns)
+
+    def to_json(self, include: list = None, suppress: list = None, file_path: str = None,
+                serialization_type_field_name = "json_serializable_class_name") -> dict:
+        result = super().to_json(include=include, suppress=suppress, file_path=None,
+                                 serialization_type_field_name=serialization_type_field_name)
+        for key in ("turns", "spans", "intensities", "emotion_ids"):
+            if key in result:
+                result[key] = result[key].tolist()
+        return result
+
+    def record(self, emotion: str, intensity: float) -> None:
+        """
+        Records the emotion and intensity of a new turn.
+        """
+        if len(self) >= self.max_points:
+            self._downsample()
+
+        if emotion not in self.emotions:
+            self.emotions.append(emotion)
+
+        self.recorded += 1
+        self.turns = np.append(self.turns, np.int32(self.recorded))
+        self.spans = np.append(self.spans, np.int32(1))
+        self.intensities = np.append(self.intensities, np.float32(intensity))
+        self.emotion_ids = np.append(self.emotion_ids, np.int16(self.emotions.index(emotion)))
+
+    def points(self) -> list:
+        """
+        Returns the retained points, as (turn, emotion, intensity) tuples.
+        """
+        return [(int(turn), self.emotions[emotion_id], float(intensity))
+                for turn, emotion_id, intensity in zip(self.turns, self.emotion_ids, self.intensities)]
+
+    def summary(self) -> dict:
+        """
+        Returns summary statistics of the trajectory: mean intensity, trend (intensity change per turn),
+        volatility (standard deviation of recent changes), and the latest emotion.
+        """
+        if len(self) == 0:
+            return {"turns": 0, "mean": None, "trend": 0.0, "volatility": 0.0, "last_emotion": None}
+
+        recent = self.intensities[-self.recent_points:]
+        trend = float(np.polyfit(self.turns[-self.recent_points:], recent, 1)[0]) if len(recent) > 1 else 0.0
+
+        return {"turns": self.recorded,
+                "mean": float(np.average(self.intensities, weights=self.spans)),
+                "trend": trend,
+                "volatility": float(np.diff(recent).std()) if len(recent) > 2 else 0.0,
+                "last_emotion": self.emotions[self.emotion_ids[-1]]}
+
+    def trend_label(self) -> str:
+        """
+        Returns whether recent intensity is rising, falling or stable.
+        """
+        trend = self.summary()["trend"]
+        if trend > self.TREND_THRESHOLD:
+            return "rising"
+        elif trend < -self.TREND_THRESHOLD:
+            return "falling"
+        else:
+            return "stable"
+
+    def describe(self) -> str:
+        """
+        Returns a one-line description of the trajectory, for prompts. Empty if nothing was recorded yet.
+        """
+        if len(self) == 0:
+            return ""
+
+        summary = self.summary()
+        return (f"over {summary['turns']} turns, mean intensity {summary['mean']:.2f}, {self.trend_label()}, "
+                f"volatility {summary['volatility']:.2f}")
+
+    def _downsample(self) -> None:
+        # merges pairs of the older points, which halves the resolution of the old part of the trajectory
+        old = len(self) - self.recent_points
+        pairs = old // 2
+        merged = slice(old - 2 * pairs, old)
+
+        spans = self.spans[merged].reshape(pairs, 2)
+        intensities = (self.intensities[merged].reshape(pairs, 2) * spans).sum(axis=1) / spans.sum(axis=1)
+
+        def splice(array, replacement):
+            return np.concatenate([array[:merged.start], replacement, array[old:]]).astype(array.dtype)
+
+        self.turns = splice(self.turns, self.turns[merged][0::2])
+        self.intensities = splice(self.intensities, intensities)
+        self.emotion_ids = splice(self.emotion_ids, self.emotion_ids[merged][1::2])
+        self.spans = splice(self.spans, spans.sum(axis=1))
+
+        # forget labels that no longer appear, so that free-text emotions do not accumulate either
+        used = np.unique(self.emotion_ids)
+        if len(used) < len(self.emotions):
+            remap = np.zeros(len(self.emotions), dtype=np.int16)
+            remap[used] = np.arange(len(used), dtype=np.int16)
+            self.emotions = [self.emotions[i] for i in used]
+            self.emotion_ids = remap[self.emotion_ids]
@@ -1,8 +1,13 @@
 from tinytroupe.utils import JsonSerializableRegistry
 import tinytroupe.utils as utils
 
+import os
+import json
+
 from tinytroupe.agent import logger
-# from llama_index.core import  VectorStoreIndex, SimpleDirectoryReader # Removed for TinyTruce
+from tinytroupe.agent.embeddings import VectorIndex, IndexHandle, default_embedding_service
+from tinytroupe.agent.bm25 import BM25Index
+from tinytroupe.agent.ingestion import DocumentIngestor, list_documents
 
 
 #######################################################################################################################
@@ -33,18 +38,22 @@ class GroundingConnector(JsonSerializableRegistry):
 @utils.post_init
 class BaseSemanticGroundingConnector(GroundingConnector):
     """
-    A base class for semantic grounding connectors. 
-    
+    A base class for semantic grounding connectors. A semantic grounding connector is a component that indexes and retrieves
+    documents based on so-called "semantic search" (i.e, embeddings-based search).
+
     [TINYTRUCE MODIFICATION]
-    LlamaIndex dependency has been removed. This class is now a stub.
+    The LlamaIndex dependency has been removed. Documents are plain strings, embedded through the default embedding
+    service (offline, see `default_embedding_service`) and indexed in an in-memory `VectorIndex`. Embedding happens lazily, in a single batch, on the first retrieval after
+    new documents are added, so adding documents (e.g., on every memory store) remains cheap.
     """
 
-    serializable_attributes = ["documents"]
+    serializable_attributes = ["documents", "documents_sources"]
 
     def __init__(self, name:str="Semantic Grounding") -> None:
         super().__init__(name)
 
-        self.documents = None 
+        self.documents = None
+        self.documents_sources = None
         self.name_to_document = None
 
         # @post_init ensures that _post_init is called after the __init__ method
@@ -54,31 +63,69 @@ class BaseSemanticGroundingConnector(GroundingConnector):
         This will run after __init__, since the class has the @post_init decorator.
         It is convenient to separate some of the initialization processes to make deserialize easier.
         """
-        self.index = None
-
         if not hasattr(self, 'documents') or self.documents is None:
             self.documents = []
-        
-        if not hasattr(self, 'name_to_document') or self.name_to_document is None:
-            self.name_to_document = {}
-        
-        # Stubbed out for TinyTruce
-        # self.add_documents(self.documents)       
+
+        if not hasattr(self, 'documents_sources') or self.documents_sources is None:
+            self.documents_sources = [None] * len(self.documents)
+
+        self.name_to_document = {}
+        for document, source in zip(self.documents, self.documents_sources):
+            if source is not None:
+                self.name_to_document.setdefault(source, []).append(document)
+
+        self.embedding_service = default_embedding_service()
+        self.index = VectorIndex()
+
+    def _post_deserialization_init(self):
+        BaseSemanticGroundingConnector._post_init(self)
+
+    def _update_index(self) -> None:
+        """
+        Embeds and indexes the documents that were added since the last update.
+        """
+        if len(self.index) < len(self.documents):
+            self.index.add(self.embedding_service.embed(self.documents[len(self.index):]))
 
     def retrieve_relevant(self, relevance_target:str, top_k=20) -> list:
         """
         Retrieves all values from memory that are relevant to a given target.
         """
-        # Stubbed out
-        return []
+        self._update_index()
+        if len(self.index) == 0 and not isinstance(self.index, IndexHandle):
+            return []
+
+        query = self.embedding_service.embed([relevance_target])
+        retrieved = []
+        for match, score in self.index.search(query, top_k)[0]:
+            # own documents are matched by id, shared ones (see `SharedVectorIndex`) by (source, text)
+            if isinstance(match, int):
+                source, text = self.documents_sources[match], self.documents[match]
+            else:
+                source, text = match
+
+            content = "SOURCE: " + (source or "(unknown)")
+            content += "\n" + "SIMILARITY SCORE:" + str(round(score, 4))
+            content += "\n" + "RELEVANT CONTENT:" + text
+            retrieved.append(content)
+
+            logger.debug(f"Content retrieved: {content[:200]}")
+
+        return retrieved
     
     def retrieve_by_name(self, name:str) -> list:
         """
         Retrieves a content source by its name.
         """
-        # Stubbed out
-        return []
-        
+        results = []
+        if self.name_to_document is not None and name in self.name_to_document:
+            for i, document in enumerate(self.name_to_document[name]):
+                content = f"SOURCE: {name}\n"
+                content += f"PAGE: {i}\n"
+                content += "CONTENT: \n" + document[:10000] # TODO a more intelligent way to limit the content
+                results.append(content)
+
+        return results
         
     def list_sources(self) -> list:
         """
@@ -93,237 +140,113 @@ class BaseSemanticGroundingConnector(GroundingConnector):
         """
         Indexes a document for semantic retrieval.
         """
-        pass
+        self.add_documents([document], doc_to_name_func)
 
     def add_documents(self, new_documents, doc_to_name_func=None) -> list:
         """
         Indexes documents for semantic retrieval.
         """
-        pass
-    
-    
-
-@utils.post_init
-class LocalFilesGroundingConnector(BaseSemanticGroundingConnector):
+        for document in new_documents:
+            # out of an abundance of caution, we sanitize the text
+            document = utils.sanitize_raw_string(str(document))
+            source = doc_to_name_func(document) if doc_to_name_func is not None else None
 
-    serializable_attributes = ["folders_paths"]
+            self.documents.append(document)
+            self.documents_sources.append(source)
 
-    def __init__(self, name:str="Local Files", folders_paths: list=None) -> None:
-        super().__init__(name)
-        self.folders_paths = folders_paths
+            # self.name_to_document[name] contains a list, since each source could be split into multiple pages
+            if source is not None:
+                self.name_to_document.setdefault(source, []).append(document)
 
-    def _post_init(self):
-        # Stubbed out
-        pass
-
-    def add_folders(self, folders_paths:list) -> None:
-        # Stubbed out
-        pass
-
-    def add_folder(self, folder_path:str) -> None:
-        # Stubbed out
-        pass
-    
-    def add_file_path(self, file_path:str) -> None:
-        # Stubbed out
-        pass
-    
-    def _mark_folder_as_loaded(self, folder_path:str) -> None:
-        pass
-    
 
 @utils.post_init
-class WebPagesGroundingConnector(BaseSemanticGroundingConnector):
-
-    serializable_attributes = ["web_urls"]
-
-    def __init__(self, name:str="Web Pages", web_urls: list=None) -> None:
-        super().__init__(name)
-        self.web_urls = web_urls
-    
-    def _post_init(self):
-        pass
-    
-    def add_web_urls(self, web_urls:list) -> None:
-        pass
-    
-    def add_web_url(self, web_url:str) -> None:
-        pass
-    
-    def _mark_web_url_as_loaded(self, web_url:str) -> None:
-        pass
-
-
-
-#######################################################################################################################
-# Grounding connectors
-#######################################################################################################################
-
-class GroundingConnector(JsonSerializableRegistry):
-    """
-    An abstract class representing a grounding connector. A grounding connector is a component that allows an agent to ground
-    its knowledge in external sources, such as files, web pages, databases, etc.
+class LocalFilesGroundingConnector(GroundingConnector):
     """
+    Grounds agents on local documents (see `DocumentIngestor` for the supported formats). Files are split into passages
+    and indexed with BM25 (see `BM25Index`), so that the most relevant passages can be retrieved by query instead of
+    handing whole files to agents.
 
-    serializable_attributes = ["name"]
-
-    def __init__(self, name:str) -> None:
-        self.name = name
-    
-    def retrieve_relevant(self, relevance_target:str, source:str, top_k=20) -> list:
-        raise NotImplementedError("Subclasses must implement this method.")
-    
-    def retrieve_by_name(self, name:str) -> str:
-        raise NotImplementedError("Subclasses must implement this method.")
-    
-    def list_sources(self) -> list:
-        raise NotImplementedError("Subclasses must implement this method.")
-
-
-@utils.post_init
-class BaseSemanticGroundingConnector(GroundingConnector):
-    """
-    A base class for semantic grounding connectors. A semantic grounding connector is a component that indexes and retrieves
-    documents based on so-called "semantic search" (i.e, embeddings-based search). This specific implementation
-    is based on the VectorStoreIndex class from the LLaMa-Index library. Here, "documents" refer to the llama-index's
-    data structure that stores a unit of content, not necessarily a file.
+    If an `index_path` is given, the index is persisted there and, when reloaded, only files whose modification time
+    or size changed since they were last indexed are processed again. Their extracted text is also cached next to the
+    index, so that changed files whose contents are already known are not parsed again.
     """
 
-    serializable_attributes = ["documents"]
+    serializable_attributes = ["folders_paths", "index_path"]
 
-    def __init__(self, name:str="Semantic Grounding") -> None:
+    def __init__(self, name:str="Local Files", folders_paths: list=None, index_path: str=None) -> None:
         super().__init__(name)
 
-        self.documents = None 
-        self.name_to_document = None
+        self.folders_paths = folders_paths
+        self.index_path = index_path
 
         # @post_init ensures that _post_init is called after the __init__ method
-    
+
     def _post_init(self):
         """
         This will run after __init__, since the class has the @post_init decorator.
         It is convenient to separate some of the initialization processes to make deserialize easier.
         """
+        self.loaded_folders_paths = []
+
+        if not hasattr(self, 'folders_paths') or self.folders_paths is None:
+            self.folders_paths = []
+
+        if not hasattr(self, 'index_path'):
+            self.index_path = None
+
         self.index = None
+        if self.index_path is not None and os.path.exists(self.index_path):
+            try:
+                self.index = BM25Index.load(self.index_path)
+            except (ValueError, KeyError, json.JSONDecodeError) as e:
+                logger.warning(f"Could not load grounding index from {self.index_path}, rebuilding it: {e}")
 
-        if not hasattr(self, 'documents') or self.documents is None:
-            self.documents = []
-        
-        if not hasattr(self, 'name_to_document') or self.name_to_document is None:
-            self.name_to_document = {}
+        if self.index is None:
+            self.index = BM25Index()
+
+        text_cache_dir = os.path.join(os.path.dirname(self.index_path), "extracted_text") if self.index_path is not None else None
+        self.ingestor = DocumentIngestor(cache_dir=text_cache_dir)
+
+        self.add_folders(list(self.folders_paths))
 
-        self.add_documents(self.documents)       
+    def _post_deserialization_init(self):
+        self._post_init()
 
     def retrieve_relevant(self, relevance_target:str, top_k=20) -> list:
         """
-        Retrieves all values from memory that are relevant to a given target.
+        Retrieves the passages most relevant to a given target.
         """
-        if self.index is not None:
-            retriever = self.index.as_retriever(similarity_top_k=top_k)
-            nodes = retriever.retrieve(relevance_target)
-        else:
-            nodes = []
-
         retrieved = []
-        for node in nodes:
-            content = "SOURCE: " + node.metadata.get('file_name', '(unknown)')
-            content += "\n" + "SIMILARITY SCORE:" + str(node.score)
-            content += "\n" + "RELEVANT CONTENT:" + node.text
+        for source, text, score in self.index.search(relevance_target, top_k=top_k):
+            content = "SOURCE: " + source
+            content += "\n" + "SIMILARITY SCORE:" + str(round(score, 4))
+            content += "\n" + "RELEVANT CONTENT:" + text
             retrieved.append(content)
 
-            logger.debug(f"Content retrieved: {content[:200]}")
-
         return retrieved
-    
+
     def retrieve_by_name(self, name:str) -> list:
         """
-        Retrieves a content source by its name.
+        Retrieves a file by its name, which can be either its path or just its file name.
         """
-        # TODO also optionally provide a relevance target?
-        results = []
-        if self.name_to_document is not None and name in self.name_to_document:
-            docs = self.name_to_document[name]
-            for i, doc in enumerate(docs):
-                if doc is not None:
-                    content = f"SOURCE: {name}\n"
-                    content += f"PAGE: {i}\n"
-                    content += "CONTENT: \n" + doc.text[:10000] # TODO a more intelligent way to limit the content
-                    results.append(content)
-                    
-        return results
-        
-        
-    def list_sources(self) -> list:
-        """
-        Lists the names of the available content sources.
-        """
-        if self.name_to_document is not None:
-            return list(self.name_to_document.keys())
-        else:
+        source = self._resolve_source_name(name)
+        if source is None:
             return []
-    
-    def add_document(self, document, doc_to_name_func=None) -> None:
-        """
-        Indexes a document for semantic retrieval.
-        """
-        self.add_documents([document], doc_to_name_func)
-
-    def add_documents(self, new_documents, doc_to_name_func=None) -> list:
-        """
-        Indexes documents for semantic retrieval.
-        """
-        # index documents by name
-        if len(new_documents) > 0:
-            # add the new documents to the list of documents
-            self.documents += new_documents
-
-            # process documents individually too
-            for document in new_documents:
-                
-                # out of an abundance of caution, we sanitize the text
-                document.text = utils.sanitize_raw_string(document.text)
-
-                if doc_to_name_func is not None:
-                    name = doc_to_name_func(document)
-                    
-                    # self.name_to_document[name] contains a list, since each source file could be split into multiple pages
-                    if name in self.name_to_document:
-                        self.name_to_document[name].append(document)
-                    else:
-                        self.name_to_document[name] = [document]
-
-
-            # index documents for semantic retrieval
-            if self.index is None:
-                self.index = VectorStoreIndex.from_documents(self.documents)
-            else:
-                self.index.refresh(self.documents)
-    
-    
 
-@utils.post_init
-class LocalFilesGroundingConnector(BaseSemanticGroundingConnector):
-
-    serializable_attributes = ["folders_paths"]
-
-    def __init__(self, name:str="Local Files", folders_paths: list=None) -> None:
-        super().__init__(name)
+        results = []
+        for i, text in enumerate(self.index.source_chunks(source)):
+            content = f"SOURCE: {source}\n"
+            content += f"PAGE: {i}\n"
+            content += "CONTENT: \n" + text
+            results.append(content)
 
-        self.folders_paths = folders_paths
+        return results
 
-        # @post_init ensures that _post_init is called after the __init__ method
-    
-    def _post_init(self):
+    def list_sources(self) -> list:
         """
-        This will run after __init__, since the class has the @post_init decorator.
-        It is convenient to separate some of the initialization processes to make deserialize easier.
+        Lists the paths of the indexed files.
         """
-        self.loaded_folders_paths = []
-
-        if not hasattr(self, 'folders_paths') or self.folders_paths is None:
-            self.folders_paths = []
-
-        self.add_folders(self.folders_paths)
+        return list(self.index.sources.keys())
 
     def add_folders(self, folders_paths:list) -> None:
         """
@@ -336,33 +259,70 @@ class LocalFilesGroundingConnector(BaseSemanticGroundingConnector):
                     logger.debug(f"Adding the following folder to grounding index: {folder_path}")
                     self.add_folder(folder_path)
                 except (FileNotFoundError, ValueError) as e:
-                    print(f"Error: {e}")
-                    print(f"Current working directory: {os.getcwd()}")
-                    print(f"Provided path: {folder_path}")
-                    print("Please check if the path exists and is accessible.")
+                    logger.error(f"Could not add grounding folder {folder_path} (current working directory: {os.getcwd()}): {e}")
 
     def add_folder(self, folder_path:str) -> None:
         """
-        Adds a path to a folder with files used for grounding.
+        Adds all supported files in a folder, recursively, to the grounding index. Files that were removed from the
+        folder since it was last indexed are dropped from the index.
         """
+        files_paths = list_documents(folder_path)
+        self._mark_folder_as_loaded(folder_path)
 
-        if folder_path not in self.loaded_folders_paths:
-            self._mark_folder_as_loaded(folder_path)
+        folder_prefix = os.path.join(folder_path, "")
+        current = set(files_paths)
+        removed = [source for source in self.index.sources if source.startswith(folder_prefix) and source not in current]
+        for source in removed:
+            self.index.remove_source(source)
+
+        changed = self._index_files(files_paths)
+        if removed or changed:
+            self._save_index()
 
-            # for PDF files, please note that the document will be split into pages: https://github.com/run-llama/llama_index/issues/15903
-            new_files = SimpleDirectoryReader(folder_path).load_data()
-            self.add_documents(new_files, lambda doc: doc.metadata["file_name"])
-    
     def add_file_path(self, file_path:str) -> None:
         """
         Adds a path to a file used for grounding.
         """
-        # a trick to make SimpleDirectoryReader work with a single file
-        new_files = SimpleDirectoryReader(input_files=[file_path]).load_data()
-        
-        logger.debug(f"Adding the following file to grounding index: {new_files}")
-        self.add_documents(new_files, lambda doc: doc.metadata["file_name"])
-    
+        if self._index_files([file_path]):
+            self._save_index()
+
+    def _index_files(self, files_paths:list) -> list:
+        """
+        (Re)indexes the files that changed since they were last indexed, ingesting them together. Returns the
+        indexed files.
+        """
+        changed = {}
+        for file_path in files_paths:
+            stat = os.stat(file_path)
+            indexed = self.index.sources.get(file_path)
+            if indexed is None or indexed.get("mtime") != stat.st_mtime or indexed.get("size") != stat.st_size:
+                changed[file_path] = stat
+
+        if not changed:
+            return []
+
+        logger.debug(f"Indexing {len(changed)} grounding files.")
+        for file_path, chunks in self.ingestor.ingest(list(changed)).items():
+            stat = changed[file_path]
+            self.index.add_source(file_path, chunks, mtime=stat.st_mtime, size=stat.st_size)
+
+        return list(changed)
+
+    def _save_index(self) -> None:
+        if self.index_path is not None:
+            self.index.save(self.index_path)
+
+    def _resolve_source_name(self, name:str) -> str:
+        name = name.strip()
+        if name in self.index.sources:
+            return name
+
+        for source in self.index.sources:
+            if os.path.basename(source) == name:
+                return source
+
+        return None
+
     def _mark_folder_as_loaded(self, folder_path:str) -> None:
         if folder_path not in self.loaded_folders_paths:
             self.loaded_folders_paths.append(folder_path)
@@ -378,44 +338,16 @@ class WebPagesGroundingConnector(BaseSemanticGroundingConnector):
 
     def __init__(self, name:str="Web Pages", web_urls: list=None) -> None:
         super().__init__(name)
-
         self.web_urls = web_urls
-
-        # @post_init ensures that _post_init is called after the __init__ method
     
     def _post_init(self):
-        self.loaded_web_urls = []
-
-        if not hasattr(self, 'web_urls') or self.web_urls is None:
-            self.web_urls = []
-
-        # load web urls
-        self.add_web_urls(self.web_urls)
+        pass
     
     def add_web_urls(self, web_urls:list) -> None:
-        """ 
-        Adds the data retrieved from the specified URLs to grounding.
-        """
-        filtered_web_urls = [url for url in web_urls if url not in self.loaded_web_urls]
-        for url in filtered_web_urls:
-            self._mark_web_url_as_loaded(url)
-
-        if len(filtered_web_urls) > 0:
-            new_documents = SimpleWebPageReader(html_to_text=True).load_data(filtered_web_urls)
-            self.add_documents(new_documents, lambda doc: doc.id_)
+        pass
     
     def add_web_url(self, web_url:str) -> None:
-        """
-        Adds the data retrieved from the specified URL to grounding.
-        """
-        # we do it like this because the add_web_urls could run scrapes in parallel, so it is better
-        # to implement this one in terms of the other
-        self.add_web_urls([web_url])
+        pass
     
     def _mark_web_url_as_loaded(self, web_url:str) -> None:
-        if web_url not in self.loaded_web_urls:
-            self.loaded_web_urls.append(web_url)
-        
-        if web_url not in self.web_urls:
-            self.web_urls.append(web_url)
-    
+        pass
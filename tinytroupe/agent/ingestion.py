@@ -0,0 +1,192 @@
+"""
+Document ingestion: text extraction from common file formats, normalization and chunking. Parsing runs in a process
+pool, and extracted text is cached on disk keyed by the hash of the file contents, so that unchanged documents are
+never parsed twice.
+"""
+
+import os
+import re
+import json
+import hashlib
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+
+from tinytroupe.agent import logger
+from tinytroupe.agent.bm25 import chunk_text
+
+
+SUPPORTED_EXTENSIONS = (".txt", ".md", ".docx", ".pdf")
+
+DEFAULT_CACHE_DIR = os.path.join(".tinytroupe_cache", "extracted_text")
+
+
+#######################################################################################################################
+# Extraction
+#######################################################################################################################
+
+def extract_text(file_path: str) -> str:
+    """
+    Extracts the raw text of a file, according to its extension.
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+
+    if extension in (".txt", ".md"):
+        with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
+            return f.read()
+
+    elif extension == ".docx":
+        import docx # python-docx, only needed for Word documents
+
+        document = docx.Document(file_path)
+        return "\n\n".join(paragraph.text for paragraph in document.paragraphs)
+
+    elif extension == ".pdf":
+        import pypdf # only needed for PDF documents
+
+        reader = pypdf.PdfReader(file_path)
+        return "\n\n".join(page.extract_text() or "" for page in reader.pages)
+
+    else:
+        raise ValueError(f"Unsupported document type: {file_path}")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalizes extracted text: unicode normalization, unified line breaks, collapsed runs of spaces and of blank lines.
+    """
+    text = unicodedata.normalize("NFC", text.encode("utf-8", "ignore").decode("utf-8"))
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    text = re.sub(r"[ \t\f\v]+", " ", text)
+    text = re.sub(r" *\n *", "\n", text)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    return text.strip()
+
+
+def _extract_and_normalize(file_path: str) -> str:
+    # module-level, so that it can be sent to worker processes
+    try:
+        return normalize_text(extract_text(file_path))
+    except Exception as e:
+        logger.error(f"Could not extract text from {file_path}: {e}")
+        return None
+
+
+#######################################################################################################################
+# Ingestion
+#######################################################################################################################
+
+class DocumentIngestor:
+    """
+    Turns files into normalized text chunks. Extracted text is cached in `cache_dir` under the hash of the file
+    contents, so renamed or touched-but-unchanged files are not parsed again, and files that do need parsing are
+    parsed in parallel.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_workers: int = None, chunk_size: int = 1200) -> None:
+        """
+        Initializes the ingestor.
+
+        Args:
+            cache_dir (str): Where to cache extracted text. If None, nothing is cached.
+            max_workers (int): The maximum number of parsing processes. Defaults to the number of CPUs.
+            chunk_size (int): The approximate size, in characters, of the produced chunks.
+        """
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+
+    def ingest(self, files_paths: list) -> dict:
+        """
+        Ingests the given files.
+
+        Returns:
+            dict: The chunks of each file, keyed by file path. Files that could not be parsed are left out.
+        """
+        texts = {}
+        to_parse = {}
+        for file_path in files_paths:
+            content_hash = self._content_hash(file_path)
+            cached = self._load_cached_text(content_hash)
+            if cached is not None:
+                texts[file_path] = cached
+            else:
+                to_parse[file_path] = content_hash
+
+        for file_path, text in self._parse(list(to_parse)).items():
+            self._save_cached_text(to_parse[file_path], text)
+            texts[file_path] = text
+
+        logger.debug(f"Ingested {len(texts)} documents ({len(to_parse)} parsed, {len(texts) - len(to_parse)} from cache).")
+        return {file_path: chunk_text(texts[file_path], self.chunk_size) for file_path in files_paths if file_path in texts}
+
+    def ingest_folder(self, folder_path: str) -> dict:
+        """
+        Ingests all supported files in a folder, recursively.
+        """
+        return self.ingest(list_documents(folder_path))
+
+    def _parse(self, files_paths: list) -> dict:
+        parsed = {}
+        if len(files_paths) == 0:
+            return parsed
+
+        if len(files_paths) == 1 or self.max_workers == 1:
+            results = map(_extract_and_normalize, files_paths)
+        else:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                results = list(executor.map(_extract_and_normalize, files_paths))
+
+        for file_path, text in zip(files_paths, results):
+            if text is not None:
+                parsed[file_path] = text
+
+        return parsed
+
+    @staticmethod
+    def _content_hash(file_path: str) -> str:
+        h = hashlib.blake2b(digest_size=16)
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        return h.hexdigest()
+
+    def _cache_path(self, content_hash: str) -> str:
+        return os.path.join(self.cache_dir, content_hash[:2], f"{content_hash}.json")
+
+    def _load_cached_text(self, content_hash: str) -> str:
+        if self.cache_dir is None:
+            return None
+
+        try:
+            with open(self._cache_path(content_hash), "r", encoding="utf-8") as f:
+                return json.load(f)["text"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            return None
+
+    def _save_cached_text(self, content_hash: str, text: str) -> None:
+        if self.cache_dir is None:
+            return
+
+        path = self._cache_path(content_hash)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"text": text}, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+
+
+def list_documents(folder_path: str) -> list:
+    """
+    Lists the supported documents in a folder, recursively, in a stable order.
+    """
+    if not os.path.isdir(folder_path):
+        raise FileNotFoundError(f"Documents folder not found: {folder_path}")
+
+    files_paths = []
+    for root, dirs, files in os.walk(folder_path):
+        dirs.sort()
+        for file_name in sorted(files):
+            if file_name.lower().endswith(SUPPORTED_EXTENSIONS):
+                files_paths.append(os.path.join(root, file_name))
+
+    return files_paths
@@ -1,10 +1,292 @@
 from tinytroupe.agent.mental_faculty import TinyMentalFaculty
 from tinytroupe.agent.grounding import BaseSemanticGroundingConnector
+from tinytroupe.agent.ingestion import DocumentIngestor, list_documents
+from tinytroupe.agent.embeddings import default_shared_index
+from tinytroupe.agent.minhash import MinHasher
+from tinytroupe.agent.shared_segments import shared_segments
 import tinytroupe.utils as utils
 
 # from llama_index.core import Document # Removed for TinyTruce
 from typing import Any
 import copy
+import json
+import mmap
+import os
+import tempfile
+import threading
+import weakref
+
+#######################################################################################################################
+# Episode storage
+#######################################################################################################################
+
+class TransientEpisode(dict):
+    """
+    An episode that is decoded or built anew every time it is read (e.g., from a spill file), so that its identity
+    says nothing about its contents. It is otherwise a regular dict.
+    """
+    __slots__ = ()
+
+
+class _SpillFile:
+    """
+    An append-only file holding spilled episode segments, read back through a memory map. The file is shared by
+    every store that references its segments (e.g., forked memories), and is removed once none of them is alive.
+    """
+
+    def __init__(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(prefix="episodes_", suffix=".spill", dir=directory)
+        self._file = os.fdopen(fd, "w+b")
+        self._maps = [None] # the current memory map, held in a list so that the finalizer sees it when it is replaced
+        self._lock = threading.Lock()
+        self._finalizer = weakref.finalize(self, _SpillFile._cleanup, self._file, self._maps, self.path)
+
+    @staticmethod
+    def _cleanup(file, maps: list, path: str) -> None:
+        try:
+            # the map must be closed before the file it maps
+            if maps[0] is not None:
+                maps[0].close()
+            file.close()
+            os.remove(path)
+        except OSError:
+            pass
+
+    def write(self, episodes: tuple) -> tuple:
+        """
+        Appends a segment to the file and returns its (offset, length) location.
+        """
+        data = json.dumps(episodes, ensure_ascii=False).encode("utf-8")
+        with self._lock:
+            self._file.seek(0, os.SEEK_END)
+            offset = self._file.tell()
+            self._file.write(data)
+            self._file.flush()
+        return offset, len(data)
+
+    def read(self, offset: int, length: int) -> tuple:
+        """
+        Reads back a segment previously written at the given location.
+        """
+        with self._lock:
+            current = self._maps[0]
+            if current is None or offset + length > len(current):
+                if current is not None:
+                    current.close()
+                current = self._maps[0] = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            data = current[offset:offset + length]
+        return tuple(json.loads(data.decode("utf-8")))
+
+
+class _SpilledSegment:
+    """
+    A reference to a segment that lives in a spill file rather than in RAM.
+    """
+
+    __slots__ = ("spill_file", "offset", "length")
+
+    def __init__(self, spill_file: _SpillFile, offset: int, length: int) -> None:
+        self.spill_file = spill_file
+        self.offset = offset
+        self.length = length
+
+    def load(self) -> tuple:
+        return self.spill_file.read(self.offset, self.length)
+
+
+class EpisodeStore:
+    """
+    A list-like, append-mostly container of episodes, organized in fixed-size segments. Full segments are sealed
+    (made immutable), which makes prefix deletion and forking cheap, and allows segments that are not currently
+    needed to be spilled to disk, keeping the resident size of long simulations flat.
+
+    Indexing and slicing follow the semantics of a regular list, and slices return regular lists.
+    """
+
+    SEGMENT_SIZE = 64
+
+    def __init__(self, episodes: list = None) -> None:
+        self._segments = []     # sealed segments, each a tuple of SEGMENT_SIZE episodes or a _SpilledSegment
+        self._tail = []         # the open segment, receiving new episodes
+        self._head_offset = 0   # episodes already deleted from the first sealed segment
+        self._spill_file = None
+
+        for episode in episodes or []:
+            self.append(episode)
+
+    def __len__(self) -> int:
+        return len(self._segments) * self.SEGMENT_SIZE - self._head_offset + len(self._tail)
+
+    def __iter__(self):
+        for i in range(len(self._segments)):
+            yield from self._segment_at(i)[self._head_offset if i == 0 else 0:]
+        yield from self._tail
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return self._slice(start, stop)
+
+        length = len(self)
+        if key < 0:
+            key += length
+        if not 0 <= key < length:
+            raise IndexError("episode index out of range")
+
+        segment_index, position = divmod(key + self._head_offset, self.SEGMENT_SIZE)
+        if segment_index == len(self._segments):
+            return self._tail[position]
+        return self._segment_at(segment_index)[position]
+
+    def __delitem__(self, key) -> None:
+        if not isinstance(key, slice):
+            index = key + len(self) if key < 0 else key
+            key = slice(index, index + 1)
+        start, stop, step = key.indices(len(self))
+        if stop <= start:
+            return
+
+        if step == 1 and start == 0:
+            self._delete_prefix(stop)
+        else:
+            # arbitrary deletions are rare, so we simply rebuild the segments
+            episodes = list(self)
+            del episodes[key]
+            spill_file = self._spill_file
+            self.__init__(episodes)
+            self._spill_file = spill_file
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (EpisodeStore, list)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __deepcopy__(self, memo) -> "EpisodeStore":
+        return EpisodeStore(copy.deepcopy(list(self), memo))
+
+    def __repr__(self) -> str:
+        return f"EpisodeStore({len(self)} episodes, {self.spilled_segments_count()} spilled segments)"
+
+    def append(self, episode: Any) -> bool:
+        """
+        Appends an episode, returning whether this sealed a new segment.
+        """
+        self._tail.append(episode)
+        if len(self._tail) < self.SEGMENT_SIZE:
+            return False
+
+        self._segments.append(tuple(self._tail))
+        self._tail = []
+        return True
+
+    def open_segment_start(self) -> int:
+        """
+        Returns the index of the first episode of the open (not yet sealed) segment.
+        """
+        return len(self) - len(self._tail)
+
+    def supersede(self, index: int, episode: Any) -> bool:
+        """
+        Removes the episode at `index`, which must be in the open segment, and appends `episode` in its place at
+        the end. Returns whether this sealed a new segment.
+        """
+        position = index - self.open_segment_start()
+        if not 0 <= position < len(self._tail):
+            raise IndexError("only episodes of the open segment can be superseded")
+
+        del self._tail[position]
+        return self.append(episode)
+
+    def fork(self) -> "EpisodeStore":
+        """
+        Returns an independent store sharing the sealed segments (and the episodes themselves) with this one.
+        """
+        forked = EpisodeStore()
+        forked._segments = list(self._segments)
+        forked._tail = list(self._tail)
+        forked._head_offset = self._head_offset
+        return forked
+
+    def spill(self, directory: str, hot_prefix: int, hot_suffix: int) -> None:
+        """
+        Spills to disk every sealed segment that lies entirely outside the first `hot_prefix` and the last
+        `hot_suffix` episodes, and brings back into RAM spilled segments that are inside those windows again.
+        """
+        length = len(self)
+        for i, segment in enumerate(self._segments):
+            first = max(i * self.SEGMENT_SIZE - self._head_offset, 0)
+            last = (i + 1) * self.SEGMENT_SIZE - self._head_offset - 1
+            hot = first < hot_prefix or last >= length - hot_suffix
+
+            if hot and isinstance(segment, _SpilledSegment):
+                self._segments[i] = segment.load()
+            elif not hot and isinstance(segment, tuple):
+                if self._spill_file is None:
+                    self._spill_file = _SpillFile(directory)
+                self._segments[i] = _SpilledSegment(self._spill_file, *self._spill_file.write(segment))
+
+    def spilled_segments_count(self) -> int:
+        return sum(1 for segment in self._segments if isinstance(segment, _SpilledSegment))
+
+    def _segment_at(self, index: int) -> tuple:
+        segment = self._segments[index]
+        if isinstance(segment, _SpilledSegment):
+            # the episodes read back are new objects on every read
+            return tuple(TransientEpisode(episode) if isinstance(episode, dict) else episode for episode in segment.load())
+        return segment
+
+    def _slice(self, start: int, stop: int) -> list:
+        result = []
+        position = start + self._head_offset
+        stop += self._head_offset
+        while position < stop:
+            segment_index, offset = divmod(position, self.SEGMENT_SIZE)
+            segment = self._tail if segment_index == len(self._segments) else self._segment_at(segment_index)
+            chunk = segment[offset:offset + (stop - position)]
+            result.extend(chunk)
+            position += len(chunk)
+        return result
+
+    def _delete_prefix(self, n: int) -> None:
+        sealed = len(self._segments) * self.SEGMENT_SIZE - self._head_offset
+        if n >= sealed:
+            del self._tail[:n - sealed]
+            self._segments = []
+            self._head_offset = 0
+            return
+
+        dropped_segments, self._head_offset = divmod(self._head_offset + n, self.SEGMENT_SIZE)
+        del self._segments[:dropped_segments]
+
+
+def _episode_text(episode: dict) -> str:
+    # the text near-duplicates are detected on
+    content = episode.get("content", "")
+    if isinstance(content, dict) and "stimuli" in content:
+        return "\n".join(f"{stimulus.get('type', '')} {stimulus.get('source', '')}: {stimulus.get('content', '')}"
+                         for stimulus in content["stimuli"])
+    elif isinstance(content, str):
+        return content
+    else:
+        return json.dumps(content, sort_keys=True, default=str)
+
+
+def _render_episode(episode: Any) -> Any:
+    # collapsed episodes are rendered once, with their repeat count
+    if not isinstance(episode, dict) or episode.get("repeat_count") is None:
+        return episode
+
+    rendered = TransientEpisode(episode)
+    content = episode.get("content")
+    if isinstance(content, dict):
+        rendered["content"] = dict(content, repeat_count=episode["repeat_count"])
+    else:
+        rendered["content"] = f"{content} [repeated {episode['repeat_count']} times]"
+    return rendered
+
 
 #######################################################################################################################
 # Memory mechanisms 
@@ -86,8 +368,25 @@ class EpisodicMemory(TinyMemory):
 
     MEMORY_BLOCK_OMISSION_INFO = {'role': 'assistant', 'content': "Info: there were other messages here, but they were omitted for brevity.", 'simulation_timestamp': None}
 
+    serializable_attributes = ["fixed_prefix_length", "lookback_length", "spill_dir", "pinned_length",
+                               "dedup_threshold", "dedup_window", "memory"]
+
+    # near-duplicate stimuli (estimated Jaccard similarity at or above the threshold) are collapsed into a single
+    # episode with a repeat count; None disables collapsing
+    dedup_threshold = None
+    dedup_window = 16
+
+    _hasher = None
+
+    # where episodes outside the fixed prefix and lookback windows are spilled to; None keeps everything in RAM
+    spill_dir = None
+
+    # how many of the first episodes are pinned, i.e., must never be evicted when the context window is compacted
+    pinned_length = 0
+
     def __init__(
-        self, fixed_prefix_length: int = 100, lookback_length: int = 100
+        self, fixed_prefix_length: int = 100, lookback_length: int = 100, spill_dir: str = None,
+        dedup_threshold: float = None, dedup_window: int = 16
     ) -> None:
         """
         Initializes the memory.
@@ -95,17 +394,114 @@ class EpisodicMemory(TinyMemory):
         Args:
             fixed_prefix_length (int): The fixed prefix length. Defaults to 20.
             lookback_length (int): The lookback length. Defaults to 20.
+            spill_dir (str, optional): A directory where older episodes are spilled to, in memory-mapped files, so that
+              only the fixed prefix and the lookback are kept in RAM. Defaults to None, which keeps everything in RAM.
+            dedup_threshold (float, optional): The similarity (0 to 1) above which a new stimulus is considered a
+              near-duplicate of a recent one, and collapsed with it. Defaults to None, which disables collapsing.
+            dedup_window (int): How many of the most recent episodes are checked for near-duplicates.
         """
         self.fixed_prefix_length = fixed_prefix_length
         self.lookback_length = lookback_length
+        self.spill_dir = spill_dir
+        self.dedup_threshold = dedup_threshold
+        self.dedup_window = dedup_window
 
         self.memory = []
 
+    @property
+    def memory(self) -> EpisodeStore:
+        """
+        The stored episodes. Supports indexing and slicing like a list.
+        """
+        return self._episodes
+
+    @memory.setter
+    def memory(self, episodes) -> None:
+        if isinstance(episodes, EpisodeStore):
+            self._episodes = episodes
+        else:
+            # episodes loaded from a snapshot may hold references to shared segments
+            pool = shared_segments()
+            self._episodes = EpisodeStore([pool.share(episode) for episode in episodes])
+
+    def _post_deserialization_init(self) -> None:
+        self._spill_cold_segments()
+
     def _store(self, value: Any) -> None:
         """
         Stores a value in memory.
         """
-        self.memory.append(value)
+        # large texts (e.g., grounding injected into every agent) are kept once, in the shared pool
+        value = shared_segments().share(value)
+
+        if self.dedup_threshold is not None:
+            sealed = self._collapse_near_duplicate(value)
+            if sealed is not None:
+                if sealed:
+                    self._spill_cold_segments()
+                return
+
+        if self._episodes.append(value):
+            self._spill_cold_segments()
+
+    def _collapse_near_duplicate(self, value: Any) -> bool:
+        """
+        If `value` is a near-duplicate of a recent stimulus, replaces that stimulus with `value`, annotated with the
+        number of repetitions and the timestamps of the earlier ones. Returns None if nothing was collapsed, and
+        otherwise whether a new segment was sealed.
+        """
+        if not isinstance(value, dict) or value.get("type") != "stimulus":
+            return None
+
+        if EpisodicMemory._hasher is None:
+            EpisodicMemory._hasher = MinHasher()
+        hasher = EpisodicMemory._hasher
+
+        # only unpinned episodes of the open segment are candidates, since sealed segments are immutable
+        first = max(self.pinned_length, len(self._episodes) - self.dedup_window, self._episodes.open_segment_start())
+        signature = None
+        for index in range(len(self._episodes) - 1, first - 1, -1):
+            episode = self._episodes[index]
+            if episode.get("type") != "stimulus" or episode.get("role") != value.get("role"):
+                continue
+
+            if signature is None:
+                signature = hasher.signature(_episode_text(value))
+            if hasher.similarity(signature, hasher.signature(_episode_text(episode))) >= self.dedup_threshold:
+                collapsed = dict(value,
+                                 repeat_count=episode.get("repeat_count", 1) + 1,
+                                 repeated_at=episode.get("repeated_at", []) + [episode.get("simulation_timestamp")])
+                return self._episodes.supersede(index, collapsed)
+
+        return None
+
+    def _spill_cold_segments(self) -> None:
+        if self.spill_dir is not None:
+            self._episodes.spill(self.spill_dir, self.fixed_prefix_length, self.lookback_length)
+
+    def to_json(self, include: list = None, suppress: list = None, file_path: str = None,
+                serialization_type_field_name = "json_serializable_class_name", share_segments: bool = False) -> dict:
+        """
+        Returns a JSON representation of the memory, with the episodes stored as a plain list. If `share_segments`
+        is True, shared segments are replaced by references (which are resolved when the memory is loaded back in
+        a process that knows them), as done for simulation state snapshots.
+        """
+        result = super().to_json(include=include, suppress=(suppress or []) + ["memory"],
+                                 serialization_type_field_name=serialization_type_field_name)
+        if "memory" not in (suppress or []) and (include is None or "memory" in include):
+            if share_segments:
+                pool = shared_segments()
+                result["memory"] = [pool.reference(episode) for episode in self._episodes]
+            else:
+                result["memory"] = [copy.deepcopy(episode) for episode in self._episodes]
+
+        if file_path:
+            if os.path.dirname(file_path):
+                os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            with open(file_path, 'w', encoding='utf-8') as f:
+                json.dump(result, f, indent=4, ensure_ascii=False)
+
+        return result
 
     def count(self) -> int:
         """
@@ -113,12 +509,32 @@ class EpisodicMemory(TinyMemory):
         """
         return len(self.memory)
 
+    def fork(self) -> "EpisodicMemory":
+        """
+        Returns an independent copy of this memory. Stored episodes are never modified in place, so they are
+        shared with the original (copy-on-write) and only the container is copied.
+        """
+        forked = copy.copy(self)
+        forked._episodes = self._episodes.fork()
+        return forked
+
+    def pin(self, count: int = None) -> None:
+        """
+        Pins the first `count` episodes, so that context window management never evicts them.
+        If `count` is None, all current episodes are pinned.
+        """
+        self.pinned_length = self.count() if count is None else min(count, self.count())
+
     def delete_episodes(self, start: int, end: int) -> None:
         """
         Deletes a range of episodes from memory.
         """
         if 0 <= start < end <= len(self.memory):
             del self.memory[start:end]
+            self._spill_cold_segments()
+
+            # deleted pinned episodes are no longer pinned
+            self.pinned_length -= max(0, min(end, self.pinned_length) - start)
 
     def retrieve(self, first_n: int, last_n: int, include_omission_info:bool=True) -> list:
         """
@@ -153,7 +569,7 @@ class EpisodicMemory(TinyMemory):
         omisssion_info = [EpisodicMemory.MEMORY_BLOCK_OMISSION_INFO] if include_omission_info else []
 
         # compute fixed prefix
-        fixed_prefix = self.memory[: self.fixed_prefix_length] + omisssion_info
+        fixed_prefix = self._rendered(self.memory[: self.fixed_prefix_length]) + omisssion_info
 
         # how many lookback values remain?
         remaining_lookback = min(
@@ -164,13 +580,13 @@ class EpisodicMemory(TinyMemory):
         if remaining_lookback <= 0:
             return fixed_prefix
         else:
-            return fixed_prefix + self.memory[-remaining_lookback:]
+            return fixed_prefix + self._rendered(self.memory[-remaining_lookback:])
 
     def retrieve_all(self) -> list:
         """
         Retrieves all values from memory.
         """
-        return copy.copy(self.memory)
+        return list(self.memory)
 
     def retrieve_relevant(self, relevance_target: str, top_k:int) -> list:
         """
@@ -184,7 +600,7 @@ class EpisodicMemory(TinyMemory):
         """
         omisssion_info = [EpisodicMemory.MEMORY_BLOCK_OMISSION_INFO] if include_omission_info else []
         
-        return self.memory[:n] + omisssion_info
+        return self._rendered(self.memory[:n]) + omisssion_info
     
     def retrieve_last(self, n: int, include_omission_info:bool=True) -> list:
         """
@@ -192,7 +608,10 @@ class EpisodicMemory(TinyMemory):
         """
         omisssion_info = [EpisodicMemory.MEMORY_BLOCK_OMISSION_INFO] if include_omission_info else []
 
-        return omisssion_info + self.memory[-n:]
+        return omisssion_info + self._rendered(self.memory[-n:])
+
+    def _rendered(self, episodes: list) -> list:
+        return [_render_episode(episode) for episode in episodes]
 
 
 @utils.post_init
@@ -201,12 +620,28 @@ class SemanticMemory(TinyMemory):
     In Cognitive Psychology, semantic memory is the memory of meanings, understandings, and other concept-based knowledge unrelated to specific 
     experiences. It is not ordered temporally, and it is not about remembering specific events or episodes. This class provides a simple implementation
     of semantic memory, where the agent can store and retrieve semantic information.
+
+    Memories are indexed offline (see `BaseSemanticGroundingConnector`), so retrieval works without any external service. Only the
+    memories themselves are serialized; the index is rebuilt from them when needed.
     """
 
-    serializable_attrs = ["memories"]
+    serializable_attributes = ["memories", "documents_paths", "namespace"]
 
-    def __init__(self, memories: list=None) -> None:
+    def __init__(self, memories: list=None, documents_paths: list=None, namespace: str=None) -> None:
+        """
+        Initializes the memory.
+
+        Args:
+            memories (list, optional): Initial memories.
+            documents_paths (list, optional): Paths of documents to ingest into the memory.
+            namespace (str, optional): If given, the memory is indexed in this namespace of the population-wide shared
+              index (see `default_shared_index`), instead of in an index of its own. This is much cheaper for large
+              populations: in particular, ingested documents are stored there once, however many memories read them.
+              If a live memory already holds the namespace, a new one is derived from it.
+        """
         self.memories = memories
+        self.documents_paths = documents_paths
+        self.namespace = namespace
 
         # @post_init ensures that _post_init is called after the __init__ method
 
@@ -219,9 +654,23 @@ class SemanticMemory(TinyMemory):
         if not hasattr(self, 'memories') or self.memories is None:
             self.memories = []
 
+        if not hasattr(self, 'documents_paths') or self.documents_paths is None:
+            self.documents_paths = []
+
+        if not hasattr(self, 'namespace'):
+            self.namespace = None
+
         self.semantic_grounding_connector = BaseSemanticGroundingConnector("Semantic Memory Storage")
+        if self.namespace is not None:
+            self.semantic_grounding_connector.index = default_shared_index().handle(self.namespace, exclusive=True)
         self.semantic_grounding_connector.add_documents(self._build_documents_from(self.memories))
-    
+
+        # documents are re-ingested rather than serialized, and only once the memory is actually used, so that states
+        # which are decoded only to be replaced (e.g., while replaying a simulation) never ingest them
+        self._pending_documents_paths = list(self.documents_paths)
+
+    def _post_deserialization_init(self):
+        self._post_init()
         
     def _preprocess_value_for_storage(self, value: dict) -> Any:
         engram = None 
@@ -241,24 +690,93 @@ class SemanticMemory(TinyMemory):
         return engram
 
     def _store(self, value: Any) -> None:
-        engram_doc = self._build_document_from(self._preprocess_value_for_storage(value))
-        self.semantic_grounding_connector.add_document(engram_doc)
+        if value is None:
+            return
+
+        self.memories.append(value)
+        self.semantic_grounding_connector.add_document(self._build_document_from(value))
     
+    def count(self) -> int:
+        """
+        Returns the number of values in memory.
+        """
+        self._load_pending_documents()
+        count = len(self.semantic_grounding_connector.documents)
+        if self.namespace is not None:
+            count += self.semantic_grounding_connector.index.shared_size()
+        return count
+
+    def add_documents_path(self, documents_path:str) -> None:
+        """
+        Ingests all supported documents in a folder, recursively, into the memory.
+        """
+        self.add_documents_paths(list_documents(documents_path))
+
+    def add_document_path(self, file_path:str) -> None:
+        """
+        Ingests a document into the memory.
+        """
+        self.add_documents_paths([file_path])
+
+    def add_documents_paths(self, files_paths:list) -> None:
+        """
+        Ingests the given documents into the memory, parsing them in parallel.
+        """
+        new_paths = [path for path in files_paths if path not in self.documents_paths]
+        if self.namespace is not None:
+            self._add_shared_documents(new_paths)
+        else:
+            self._add_ingested_documents(DocumentIngestor().ingest(new_paths))
+
+    def _load_pending_documents(self) -> None:
+        if len(self._pending_documents_paths) == 0:
+            return
+
+        files_paths, self._pending_documents_paths = self._pending_documents_paths, []
+        if self.namespace is not None:
+            self._add_shared_documents(files_paths)
+        else:
+            self._add_ingested_documents(DocumentIngestor().ingest(files_paths))
+
+    def _add_ingested_documents(self, chunks_by_path:dict) -> None:
+        for path, chunks in chunks_by_path.items():
+            if path not in self.documents_paths:
+                self.documents_paths.append(path)
+            name = os.path.basename(path)
+            self.semantic_grounding_connector.add_documents(chunks, lambda chunk: name)
+
+    def _add_shared_documents(self, files_paths:list) -> None:
+        # documents are keyed by their contents in the shared index, and only those not there yet are ingested and embedded
+        handle = self.semantic_grounding_connector.index
+        keys = {path: DocumentIngestor._content_hash(path) for path in files_paths}
+        missing = [path for path in files_paths if not handle.index.has_shared_document(keys[path])]
+
+        for path, chunks in DocumentIngestor().ingest(missing).items():
+            chunks = [utils.sanitize_raw_string(chunk) for chunk in chunks]
+            vectors = self.semantic_grounding_connector.embedding_service.embed(chunks)
+            name = os.path.basename(path)
+            handle.index.add_shared_document(keys[path], vectors, [(name, chunk) for chunk in chunks])
+
+        for path in files_paths:
+            if handle.index.has_shared_document(keys[path]):
+                handle.attach_shared_document(keys[path])
+                if path not in self.documents_paths:
+                    self.documents_paths.append(path)
+
     def retrieve_relevant(self, relevance_target:str, top_k=20) -> list:
         """
         Retrieves all values from memory that are relevant to a given target.
         """
+        self._load_pending_documents()
         return self.semantic_grounding_connector.retrieve_relevant(relevance_target, top_k)
 
     #####################################
     # Auxiliary compatibility methods
     #####################################
 
-    def _build_document_from(memory):
+    def _build_document_from(self, memory) -> str:
         # TODO: add any metadata as well?
-        return str(memory) # Document(text=str(memory))
+        return str(memory)
     
     def _build_documents_from(self, memories: list) -> list:
         return [self._build_document_from(memory) for memory in memories]
-    
-   
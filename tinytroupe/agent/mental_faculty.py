@@ -237,10 +237,11 @@ class FilesAndWebGroundingFaculty(TinyMentalFaculty):
     """
 
 
-    def __init__(self, folders_paths: list=None, web_urls: list=None):
+    def __init__(self, folders_paths: list=None, web_urls: list=None, index_path: str=None, search_top_k: int=5):
         super().__init__("Local Files and Web Grounding")
 
-        self.local_files_grounding_connector = LocalFilesGroundingConnector(folders_paths=folders_paths)
+        self.search_top_k = search_top_k
+        self.local_files_grounding_connector = LocalFilesGroundingConnector(folders_paths=folders_paths, index_path=index_path)
         self.web_grounding_connector = WebPagesGroundingConnector(web_urls=web_urls)
 
     def process_action(self, agent, action: dict) -> bool:
@@ -258,6 +259,17 @@ class FilesAndWebGroundingFaculty(TinyMentalFaculty):
             
             return True
         
+        elif action['type'] == "SEARCH_DOCUMENTS" and action['content'] is not None:
+            query = action['content']
+            passages = self.local_files_grounding_connector.retrieve_relevant(query, top_k=self.search_top_k)
+
+            if len(passages) > 0:
+                agent.think(f"I have found the following passages in my documents about '{query}': \n" + "\n\n".join(passages))
+            else:
+                agent.think(f"I can't find anything about '{query}' in my documents.")
+
+            return True
+
         elif action['type'] == "LIST_DOCUMENTS" and action['content'] is not None:
             available_names = []
             available_names += self.local_files_grounding_connector.list_sources()
@@ -281,6 +293,7 @@ class FilesAndWebGroundingFaculty(TinyMentalFaculty):
                 kind of "packaged" information you can access, such as emails, files, chat messages, calendar events, etc. It also includes, in particular, web pages.
                 The order of in which the documents are listed is not relevant.
             - CONSULT: you can retrieve and consult a specific document, so that you can access its content and accomplish your goals. To do so, you specify the name of the document you want to consult.
+            - SEARCH_DOCUMENTS: you can search all your documents at once for the passages most relevant to a keyword-based query, without having to CONSULT each whole document.
             """
 
         return textwrap.dedent(prompt)
@@ -0,0 +1,60 @@
+"""
+MinHash signatures over word shingles, used to detect near-duplicate texts cheaply: the fraction of equal positions
+in two signatures estimates the Jaccard similarity of the texts' shingle sets.
+"""
+
+import re
+import zlib
+from functools import lru_cache
+
+import numpy as np
+
+
+# a prime larger than any 32-bit shingle hash, so that (a * x + b) mod p is a proper permutation
+_MERSENNE_PRIME = np.uint64(4294967311)
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+class MinHasher:
+    """
+    Computes MinHash signatures of texts, and estimates their similarity.
+    """
+
+    def __init__(self, num_permutations: int = 64, shingle_size: int = 3, seed: int = 1) -> None:
+        """
+        Initializes the hasher.
+
+        Args:
+            num_permutations (int): The length of the signatures. Longer signatures give more precise estimates.
+            shingle_size (int): The number of consecutive words in each shingle.
+            seed (int): The seed of the hash permutations. Signatures are only comparable for the same seed.
+        """
+        self.num_permutations = num_permutations
+        self.shingle_size = shingle_size
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 2**32, size=num_permutations, dtype=np.uint64)
+        self._b = rng.integers(0, 2**32, size=num_permutations, dtype=np.uint64)
+
+        # signatures are memoized per instance, since the same texts are compared again and again
+        self.signature = lru_cache(maxsize=4096)(self._signature)
+
+    def _signature(self, text: str) -> np.ndarray:
+        tokens = _TOKEN_PATTERN.findall(text.lower())
+        n = min(self.shingle_size, len(tokens)) or 1
+        shingles = {" ".join(tokens[i:i + n]) for i in range(max(len(tokens) - n + 1, 1))}
+
+        hashes = np.fromiter((zlib.crc32(shingle.encode("utf-8")) for shingle in shingles),
+                             dtype=np.uint64, count=len(shingles))
+
+        # (a * x + b) never exceeds 2**64 for 32-bit a, x and b, so there is no overflow before the modulo
+        permuted = (hashes[:, None] * self._a + self._b) % _MERSENNE_PRIME
+        return permuted.min(axis=0)
+
+    @staticmethod
+    def similarity(signature: np.ndarray, other: np.ndarray) -> float:
+        """
+        Estimates the Jaccard similarity of the texts with the given signatures.
+        """
+        return float(np.mean(signature == other))
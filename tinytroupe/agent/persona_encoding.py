@@ -0,0 +1,83 @@
+"""
+Encodings of an agent's persona for its system prompt. The persona files are rich (personality, communication,
+redlines, vocabulary priorities, ...), so the way they are serialized matters: indented JSON spends a large share of
+the prompt on whitespace, quotes and braces, which the compact encodings avoid.
+"""
+
+import json
+from typing import Any
+
+
+# "json" is the original, indented encoding; "compact_json" is the same JSON minified; "outline" is a terse
+# YAML-like outline of `key: value` lines
+PERSONA_ENCODINGS = ("json", "compact_json", "outline")
+
+# persona fields that the system prompt template already renders in sections of their own
+TEMPLATE_RENDERED_FIELDS = ("redlines", "vocabulary_priority", "syntax_constraints")
+
+
+def encode_persona(persona: dict, encoding: str = "outline", exclude: tuple = TEMPLATE_RENDERED_FIELDS) -> str:
+    """
+    Encodes a persona for the system prompt.
+
+    Args:
+        persona (dict): The persona to encode.
+        encoding (str): One of PERSONA_ENCODINGS.
+        exclude (tuple): Top-level fields to leave out, e.g. because the prompt renders them elsewhere. The
+          original "json" encoding keeps every field.
+
+    Returns:
+        str: The encoded persona.
+    """
+    if encoding == "json":
+        return json.dumps(persona, indent=4)
+
+    # empty fields carry no information
+    lean = {key: value for key, value in persona.items() if key not in exclude and not _is_empty(value)}
+
+    if encoding == "compact_json":
+        return json.dumps(lean, separators=(",", ":"), ensure_ascii=False)
+    elif encoding == "outline":
+        return "\n".join(_outline(lean, 0))
+    else:
+        raise ValueError(f"Unknown persona encoding '{encoding}'. Valid encodings are: {', '.join(PERSONA_ENCODINGS)}.")
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or (isinstance(value, (str, list, dict)) and len(value) == 0)
+
+
+def _outline(value: Any, depth: int) -> list:
+    indent = "  " * depth
+    lines = []
+
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if _is_empty(item):
+                continue
+            if isinstance(item, (dict, list)):
+                lines.append(f"{indent}{key}:")
+                lines.extend(_outline(item, depth + 1))
+            else:
+                lines.append(f"{indent}{key}: {_scalar(item, indent + '  ')}")
+
+    elif isinstance(value, list):
+        for item in value:
+            if isinstance(item, (dict, list)):
+                # the first line of a nested structure goes on the bullet itself
+                nested = _outline(item, depth + 1)
+                if nested:
+                    lines.append(f"{indent}- {nested[0].lstrip()}")
+                    lines.extend(nested[1:])
+            elif not _is_empty(item):
+                lines.append(f"{indent}- {_scalar(item, indent + '  ')}")
+
+    else:
+        lines.append(f"{indent}{_scalar(value, indent)}")
+
+    return lines
+
+
+def _scalar(value: Any, continuation_indent: str) -> str:
+    # multi-line texts keep their lines, aligned under the field they belong to
+    return str(value).replace("\n", "\n" + continuation_indent)
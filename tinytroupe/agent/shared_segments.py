@@ -0,0 +1,120 @@
+"""
+Shared, interned text segments. Large texts that are injected into many agents (e.g., the global grounding) are kept
+once in RAM, keyed by the hash of their contents, and every episode that contains them points at that single copy.
+State snapshots can then replace the texts by references, which are resolved again when the snapshots are loaded.
+"""
+
+import hashlib
+import threading
+from typing import Any
+
+
+# texts shorter than this are not worth interning
+SHARED_SEGMENT_MIN_LENGTH = 4096
+
+REFERENCE_KEY = "shared_segment"
+
+
+class SharedSegmentPool:
+    """
+    A pool of interned texts, keyed by content hash.
+    """
+
+    def __init__(self, min_length: int = SHARED_SEGMENT_MIN_LENGTH) -> None:
+        self.min_length = min_length
+        self._segments = {} # digest -> text
+        self._digests = {}  # text -> digest, for the pooled texts themselves
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._segments)
+
+    def intern(self, text: str) -> str:
+        """
+        Returns the pooled copy of a text, adding it to the pool if needed. Short texts are returned as they are.
+        """
+        if len(text) < self.min_length:
+            return text
+
+        digest = self._digests.get(text)
+        if digest is not None:
+            return self._segments[digest]
+
+        digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+        with self._lock:
+            pooled = self._segments.setdefault(digest, text)
+            self._digests.setdefault(pooled, digest)
+        return pooled
+
+    def share(self, value: Any) -> Any:
+        """
+        Returns `value` with every large text replaced by its pooled copy, and every reference resolved to it.
+        Nested dicts and lists are copied only where something is replaced.
+        """
+        return self._map(value, intern=True)
+
+    def resolve(self, value: Any) -> Any:
+        """
+        Returns `value` with every reference resolved to the pooled text. Nothing is added to the pool.
+        """
+        return self._map(value, intern=False)
+
+    def _map(self, value: Any, intern: bool) -> Any:
+        if isinstance(value, str):
+            return self.intern(value) if intern else value
+
+        elif isinstance(value, dict):
+            if len(value) == 1 and REFERENCE_KEY in value:
+                return self._segments[value[REFERENCE_KEY]]
+            mapped = {key: self._map(item, intern) for key, item in value.items()}
+            return value if all(mapped[key] is value[key] for key in value) else mapped
+
+        elif isinstance(value, list):
+            mapped = [self._map(item, intern) for item in value]
+            return value if all(a is b for a, b in zip(mapped, value)) else mapped
+
+        else:
+            return value
+
+    def reference(self, value: Any) -> Any:
+        """
+        Returns a copy of `value` with every pooled text replaced by a reference to it.
+        """
+        if isinstance(value, str):
+            digest = self._digests.get(value) if len(value) >= self.min_length else None
+            return {REFERENCE_KEY: digest} if digest is not None else value
+
+        elif isinstance(value, dict):
+            return {key: self.reference(item) for key, item in value.items()}
+
+        elif isinstance(value, list):
+            return [self.reference(item) for item in value]
+
+        else:
+            return value
+
+    def export(self) -> dict:
+        """
+        Returns the pooled texts, keyed by digest, e.g. to be saved alongside snapshots that reference them.
+        """
+        with self._lock:
+            return dict(self._segments)
+
+    def register(self, segments: dict) -> None:
+        """
+        Adds previously exported texts to the pool.
+        """
+        with self._lock:
+            for digest, text in segments.items():
+                pooled = self._segments.setdefault(digest, text)
+                self._digests.setdefault(pooled, digest)
+
+
+_default_pool = SharedSegmentPool()
+
+
+def shared_segments() -> SharedSegmentPool:
+    """
+    Returns the process-wide pool of shared segments.
+    """
+    return _default_pool
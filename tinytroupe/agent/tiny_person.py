@@ -1,15 +1,24 @@
 from tinytroupe.agent import logger, default, Self, AgentOrWorld, CognitiveActionModel
 from tinytroupe.agent.memory import EpisodicMemory, SemanticMemory
+from tinytroupe.agent.context_window import messages_tokens
+from tinytroupe.agent.shared_segments import shared_segments
+from tinytroupe.agent.emotional_trajectory import EmotionalTrajectory
+from tinytroupe.agent.persona_encoding import encode_persona
+from tinytroupe.agent.action_repair import repair_cognitive_action
+from tinytroupe.agent.transcript import transcript_cache
+from tinytroupe.cost_manager import cost_manager
 import tinytroupe.openai_utils as openai_utils
-from tinytroupe.utils import JsonSerializableRegistry, repeat_on_error, name_or_empty
+from tinytroupe.utils import JsonSerializableRegistry, name_or_empty
 import tinytroupe.utils as utils
-from tinytroupe.control import transactional, current_simulation
+from tinytroupe.control import transactional, current_simulation, DETACHED
 from tinytroupe.asset_manager import AssetManager
 
 
 import os
 import json
 import copy
+import hashlib
+import threading
 import textwrap  # to dedent strings
 from rich.markup import escape
 import chevron  # to parse Mustache templates
@@ -20,6 +29,8 @@ from rich.console import Console
 # Create a global console for simulation output with auto-highlighting disabled
 console = Console(highlight=False)
 
+# guards the agents' memoized system prompts, which are also filled by turns prepared in the background
+_system_prompts_lock = threading.Lock()
 
 
 #######################################################################################################################
@@ -33,6 +44,12 @@ class TinyPerson(JsonSerializableRegistry):
     # This prevents the agent from acting without ever stopping.
     MAX_ACTIONS_BEFORE_DONE = 10
 
+    # How many times the model is asked again for an action message that cannot be repaired locally.
+    MAX_UNRECOVERABLE_RESPONSE_RETRIES = 2
+
+    # How many rendered system prompts each agent memoizes (e.g., the current one and one prepared ahead of time).
+    MAX_MEMOIZED_SYSTEM_PROMPTS = 4
+
     PP_TEXT_WIDTH = 100
 
     serializable_attributes = ["_persona", "_mental_state", "_mental_faculties", "episodic_memory", "semantic_memory"]
@@ -48,6 +65,10 @@ class TinyPerson(JsonSerializableRegistry):
     # Whether to display the communication or not. True is for interactive applications, when we want to see simulation
     # outputs as they are produced.
     communication_display:bool=True
+
+    # How the persona is written in the system prompt: "json", "compact_json" or "outline". The compact encodings
+    # also leave out the fields that the prompt template renders in sections of their own.
+    persona_encoding:str=default["persona_encoding"]
     
 
     def __init__(self, name:str=None, 
@@ -165,8 +186,14 @@ class TinyPerson(JsonSerializableRegistry):
                 "memory_context": None,
                 "accessible_agents": [],  # [{"agent": agent_1, "relation": "My friend"}, {"agent": agent_2, "relation": "My colleague"}, ...]
                 "emotional_intensity": 0.5, # Default starting intensity
-                "emotional_trajectory": []
             }
+
+        # the (bounded) history of emotions and intensities, one point per act. States saved before it existed
+        # kept the whole history as a list in the mental state instead, which is migrated here.
+        if not hasattr(self, '_emotional_trajectory'):
+            self._emotional_trajectory = EmotionalTrajectory()
+            for point in self._mental_state.pop("emotional_trajectory", []):
+                self._emotional_trajectory.record(point.get("emotion"), point.get("intensity", 0.5))
         
         if not hasattr(self, '_episodic_anchors'):
             self._episodic_anchors = []
@@ -174,6 +201,18 @@ class TinyPerson(JsonSerializableRegistry):
         if not hasattr(self, '_extended_agent_summary'):
             self._extended_agent_summary = None
 
+        # standing directives: key -> {"content": ..., "remaining_acts": ...}, rendered in the system prompt
+        if not hasattr(self, '_standing_directives'):
+            self._standing_directives = {}
+
+        # the size, in tokens, of the last prompt sent to the LLM
+        if not hasattr(self, '_last_prompt_tokens'):
+            self._last_prompt_tokens = None
+
+        # rendered system prompts, memoized by what they render (not part of the simulation state)
+        if not hasattr(self, '_system_prompts'):
+            self._system_prompts = {}
+
         self.eco_mode = False
 
         self._prompt_template_path = os.path.join(
@@ -223,14 +262,17 @@ class TinyPerson(JsonSerializableRegistry):
         self._persona["name"] = self.name
 
 
-    def generate_agent_system_prompt(self):
+    def generate_agent_system_prompt(self, standing_directives: dict = None):
+        """
+        Renders the system prompt. If `standing_directives` are given, they are rendered instead of the current ones.
+        """
         with open(self._prompt_template_path, "r") as f:
             agent_prompt_template = f.read()
 
         # let's operate on top of a copy of the configuration, because we'll need to add more variables, etc.
         template_variables = self._persona.copy()    
             
-        template_variables["persona"] = json.dumps(self._persona.copy(), indent=4)    
+        template_variables["persona"] = encode_persona(self._persona, self.persona_encoding)
 
         # Prepare additional action definitions and constraints
         actions_definitions_prompt = ""
@@ -249,7 +291,9 @@ class TinyPerson(JsonSerializableRegistry):
 
         # [TINYTRUCE] Inject mental state and episodic anchors into template
         template_variables.update(self._mental_state)
+        template_variables['emotional_trajectory'] = self._emotional_trajectory.describe()
         template_variables['episodic_anchors'] = self._episodic_anchors
+        template_variables['standing_directives'] = self._render_standing_directives(standing_directives)
         template_variables['eco_mode'] = self.eco_mode
 
         return chevron.render(agent_prompt_template, template_variables)
@@ -257,26 +301,70 @@ class TinyPerson(JsonSerializableRegistry):
     def reset_prompt(self):
 
         # render the template with the current configuration
-        self._init_system_message = self.generate_agent_system_prompt()
+        self._init_system_message = self._system_prompt()
 
         # TODO actually, figure out another way to update agent state without "changing history"
+        self.current_messages = self._prompt_messages(self._init_system_message)
 
-        # reset system message
-        self.current_messages = [
-            {"role": "system", "content": self._init_system_message}
-        ]
+    def prepare_prompt(self, directives: dict = None) -> int:
+        """
+        Renders, ahead of time, the system prompt the agent will have once the given standing directives are set
+        (see `set_directives`), and counts the tokens of the prompt it would then send. The agent is not changed:
+        the rendering and the token counts are memoized, so that setting the directives, managing the context
+        window and acting later do not compute them again, unless something else changed meanwhile. This makes
+        it suitable for a background thread, e.g. while another agent's call is in flight.
 
-        # sets up the actual interaction messages to use for prompting
-        self.current_messages += self.retrieve_recent_memories()
+        Args:
+            directives (dict): The standing directives (key -> content) that will be set.
 
-        # add a final user message, which is neither stimuli or action, to instigate the agent to act properly
-        self.current_messages.append({"role": "user", 
+        Returns:
+            int: The number of tokens of the prompt.
+        """
+        standing_directives = dict(self._standing_directives)
+        for key, content in (directives or {}).items():
+            standing_directives[key] = {"content": content, "remaining_acts": None}
+
+        return messages_tokens(self._prompt_messages(self._system_prompt(standing_directives)))
+
+    def _system_prompt(self, standing_directives: dict = None) -> str:
+        # rendered prompts are memoized by everything they render, so that the prompt is only rendered again when
+        # something in it changed (and not, e.g., before every call, nor when it was prepared ahead of time)
+        if standing_directives is None:
+            standing_directives = self._standing_directives
+
+        inputs = json.dumps([self._prompt_template_path, self._persona, self.persona_encoding,
+                             [(faculty.actions_definitions_prompt(), faculty.actions_constraints_prompt())
+                              for faculty in self._mental_faculties],
+                             self._mental_state, self._emotional_trajectory.describe(), self._episodic_anchors,
+                             self._render_standing_directives(standing_directives), self.eco_mode],
+                            sort_keys=True, ensure_ascii=False, default=str)
+        key = hashlib.blake2b(inputs.encode("utf-8"), digest_size=16).hexdigest()
+
+        with _system_prompts_lock:
+            system_prompt = self._system_prompts.get(key)
+        if system_prompt is not None:
+            return system_prompt
+
+        system_prompt = self.generate_agent_system_prompt(standing_directives)
+        with _system_prompts_lock:
+            self._system_prompts[key] = system_prompt
+            while len(self._system_prompts) > TinyPerson.MAX_MEMOIZED_SYSTEM_PROMPTS:
+                # the oldest one
+                del self._system_prompts[next(iter(self._system_prompts))]
+
+        return system_prompt
+
+    def _prompt_messages(self, system_prompt: str) -> list:
+        # the system message, the recent memories, and a final user message, which is neither stimuli or action,
+        # to instigate the agent to act properly
+        return [{"role": "system", "content": system_prompt}] + self.retrieve_recent_memories() + [
+                                     {"role": "user", 
                                       "content": "Now you **must** generate a sequence of actions following your interaction directives, " +\
                                                  "and complying with **all** instructions and contraints related to the action you use." +\
                                                  "DO NOT repeat the exact same action more than once in a row!" +\
                                                  "DO NOT keep saying or doing very similar things, but instead try to adapt and make the interactions look natural." +\
                                                  "These actions **MUST** be rendered following the JSON specification perfectly, including all required keys (even if their value is empty), **ALWAYS**."
-                                     })
+                                     }]
 
     def get(self, key):
         """
@@ -461,6 +549,8 @@ class TinyPerson(JsonSerializableRegistry):
         if n is not None:
             assert n < TinyPerson.MAX_ACTIONS_BEFORE_DONE
 
+        self._expire_directives()
+
         contents = []
 
         # A separate function to run before each action, which is not meant to be repeated in case of errors.
@@ -471,10 +561,8 @@ class TinyPerson(JsonSerializableRegistry):
             # it interleaves user with assistant messages.
             pass # self.think("I will now think, reflect and act a bit, and then issue DONE.")        
 
-        # Aux function to perform exactly one action.
-        # Occasionally, the model will return JSON missing important keys, so we just ask it to try again
-        # Sometimes `content` contains EpisodicMemory's MEMORY_BLOCK_OMISSION_INFO message, which raises a TypeError on line 443
-        @repeat_on_error(retries=5, exceptions=[KeyError, TypeError])
+        # Aux function to perform exactly one action. Messages missing important keys are repaired, or asked
+        # for again (a bounded number of times), by `_produce_message`, so they always have an action.
         def aux_act_once():
             role, content = self._produce_message()
 
@@ -496,29 +584,20 @@ class TinyPerson(JsonSerializableRegistry):
                     current_intensity = 0.5 # Reset to neutral on error
 
             # Update trajectory
-            self._mental_state["emotional_trajectory"].append({
-                "turn": len(self._mental_state["emotional_trajectory"]) + 1,
-                "emotion": current_emotion,
-                "intensity": current_intensity,
-                "timestamp": self.iso_datetime()
-            })
+            self._emotional_trajectory.record(current_emotion, current_intensity)
 
 
             action = content['action']
             logger.debug(f"{self.name}'s action: {action}")
 
-            goals = cognitive_state['goals']
-            attention = cognitive_state['attention']
-            emotions = cognitive_state['emotions']
-
             self.store_in_memory({'role': role, 'content': content, 
                                   'type': 'action', 
                                   'simulation_timestamp': self.iso_datetime()})
 
             self._actions_buffer.append(action)
-            self._update_cognitive_state(goals=cognitive_state['goals'],
-                                        attention=cognitive_state['attention'],
-                                        emotions=cognitive_state['emotions'],
+            self._update_cognitive_state(goals=cognitive_state.get('goals'),
+                                        attention=cognitive_state.get('attention'),
+                                        emotions=cognitive_state.get('emotions'),
                                         emotional_intensity=current_intensity)
             
             contents.append(content)          
@@ -539,48 +618,7 @@ class TinyPerson(JsonSerializableRegistry):
         ##### Option 0: Eco-Mode (Batch Actions) ######
         if self.eco_mode:
             role, content = self._produce_message()
-            
-            # Extract actions array or fallback to single action
-            batch_actions = content.get("actions", [])
-            if not batch_actions and "action" in content:
-                batch_actions = [content["action"]]
-            
-            cognitive_state = content.get("cognitive_state", {})
-            current_emotion = cognitive_state.get("emotions", "Neutral")
-            current_intensity = cognitive_state.get("emotional_intensity", self._mental_state.get("emotional_intensity", 0.5))
-            
-            # Update trajectory and state once for the whole batch
-            self._mental_state["emotional_trajectory"].append({
-                "turn": len(self._mental_state["emotional_trajectory"]) + 1,
-                "emotion": current_emotion,
-                "intensity": current_intensity,
-                "timestamp": self.iso_datetime()
-            })
-            
-            self._update_cognitive_state(
-                goals=cognitive_state.get('goals'),
-                attention=cognitive_state.get('attention'),
-                emotions=current_emotion,
-                emotional_intensity=current_intensity
-            )
-
-            for action in batch_actions:
-                logger.debug(f"[{self.name}] Eco-Mode action: {action}")
-                
-                # Mock a content structure for memory and display compatibility
-                mock_content = {"action": action, "cognitive_state": cognitive_state}
-                self.store_in_memory({'role': role, 'content': mock_content, 
-                                      'type': 'action', 
-                                      'simulation_timestamp': self.iso_datetime()})
-                
-                self._actions_buffer.append(action)
-                contents.append(mock_content)
-                
-                if TinyPerson.communication_display:
-                    self._display_communication(role=role, content=mock_content, kind='action', simplified=True, max_content_length=max_content_length)
-                
-                for faculty in self._mental_faculties:
-                    faculty.process_action(self, action)
+            contents = self.apply_message(role, content, max_content_length=max_content_length)
             
             return contents if return_actions else None
 
@@ -617,6 +655,63 @@ class TinyPerson(JsonSerializableRegistry):
         if return_actions:
             return contents
 
+    @transactional
+    def apply_message(self, role: str, content: dict, max_content_length=default["max_content_display_length"]) -> list:
+        """
+        Applies a message already produced for this agent, containing either a batch of actions or a single one,
+        plus the cognitive state: the actions are stored in memory, buffered for the environment and processed by
+        the mental faculties, just like the actions the agent produces by itself. This is used by eco-mode, as
+        well as by environments that generate the turns of several agents at once.
+
+        Args:
+            role (str): The role of the message, normally "assistant".
+            content (dict): The message content, with an "actions" list or an "action", and a "cognitive_state".
+            max_content_length (int, optional): The maximum length of the displayed content.
+
+        Returns:
+            list: The applied actions, each as an {"action": ..., "cognitive_state": ...} content.
+        """
+        contents = []
+
+        # Extract actions array or fallback to single action
+        batch_actions = content.get("actions", [])
+        if not batch_actions and "action" in content:
+            batch_actions = [content["action"]]
+        
+        cognitive_state = content.get("cognitive_state", {})
+        current_emotion = cognitive_state.get("emotions", "Neutral")
+        current_intensity = cognitive_state.get("emotional_intensity", self._mental_state.get("emotional_intensity", 0.5))
+        
+        # Update trajectory and state once for the whole batch
+        self._emotional_trajectory.record(current_emotion, current_intensity)
+        
+        self._update_cognitive_state(
+            goals=cognitive_state.get('goals'),
+            attention=cognitive_state.get('attention'),
+            emotions=current_emotion,
+            emotional_intensity=current_intensity
+        )
+
+        for action in batch_actions:
+            logger.debug(f"[{self.name}] Batched action: {action}")
+            
+            # Mock a content structure for memory and display compatibility
+            mock_content = {"action": action, "cognitive_state": cognitive_state}
+            self.store_in_memory({'role': role, 'content': mock_content, 
+                                  'type': 'action', 
+                                  'simulation_timestamp': self.iso_datetime()})
+            
+            self._actions_buffer.append(action)
+            contents.append(mock_content)
+            
+            if TinyPerson.communication_display:
+                self._display_communication(role=role, content=mock_content, kind='action', simplified=True, max_content_length=max_content_length)
+            
+            for faculty in self._mental_faculties:
+                faculty.process_action(self, action)
+        
+        return contents
+
     @transactional
     def listen(
         self,
@@ -714,6 +809,82 @@ class TinyPerson(JsonSerializableRegistry):
             max_content_length=max_content_length,
         )
 
+    @transactional
+    def set_directive(self, key:str, content:str, expires_after_acts:int=None):
+        """
+        Sets a standing directive: an instruction that holds until it is replaced, removed or expires. Directives
+        are rendered once, in a dedicated slot of the system prompt, instead of being stored in episodic memory
+        every time they are repeated (as `think()` would do).
+
+        Args:
+            key (str): The directive's key. Setting a directive with an existing key replaces it.
+            content (str): The directive's text.
+            expires_after_acts (int, optional): The number of calls to `act()` after which the directive is
+              dropped. If None, the directive holds until it is removed.
+        """
+        self._standing_directives[key] = {"content": content, "remaining_acts": expires_after_acts}
+        self.reset_prompt()
+
+    @transactional
+    def set_directives(self, directives:dict, expires_after_acts:int=None):
+        """
+        Sets several standing directives at once (see `set_directive`), rendering the prompt only once.
+
+        Args:
+            directives (dict): The directives to set, as a key -> content dictionary.
+            expires_after_acts (int, optional): The number of calls to `act()` after which the directives are
+              dropped. If None, they hold until they are removed.
+        """
+        for key, content in directives.items():
+            self._standing_directives[key] = {"content": content, "remaining_acts": expires_after_acts}
+        self.reset_prompt()
+
+    @transactional
+    def remove_directive(self, key:str):
+        """
+        Removes a standing directive, if it exists.
+        """
+        if self._standing_directives.pop(key, None) is not None:
+            self.reset_prompt()
+
+    @transactional
+    def clear_directives(self):
+        """
+        Removes all standing directives.
+        """
+        self._standing_directives = {}
+        self.reset_prompt()
+
+    def directives(self) -> dict:
+        """
+        Returns the current standing directives, as a key -> content dictionary.
+        """
+        return {key: directive["content"] for key, directive in self._standing_directives.items()}
+
+    def emotional_trajectory(self) -> EmotionalTrajectory:
+        """
+        Returns the agent's emotional trajectory, whose summary statistics (mean, trend, volatility) cost the
+        same regardless of how many turns were recorded.
+        """
+        return self._emotional_trajectory
+
+    def _expire_directives(self):
+        # a directive set to expire after n acts is rendered in n acts, and dropped at the start of the next one
+        for key in list(self._standing_directives):
+            directive = self._standing_directives[key]
+            if directive["remaining_acts"] is None:
+                continue
+            elif directive["remaining_acts"] <= 0:
+                del self._standing_directives[key]
+            else:
+                directive["remaining_acts"] -= 1
+
+    def _render_standing_directives(self, standing_directives: dict = None) -> str:
+        if standing_directives is None:
+            standing_directives = self._standing_directives
+
+        return "\n".join(f"- **{key}**: {directive['content']}" for key, directive in standing_directives.items())
+
     @transactional
     def _observe(self, stimulus, max_content_length=default["max_content_display_length"]):
         stimuli = [stimulus]
@@ -889,35 +1060,56 @@ class TinyPerson(JsonSerializableRegistry):
             {"role": msg["role"], "content": msg["content"] if isinstance(msg["content"], str) else str(msg["content"])}
             for msg in self.current_messages
         ]
+        self._last_prompt_tokens = messages_tokens(messages)
 
-        logger.debug(f"[{self.name}] Sending messages to OpenAI API")
+        logger.debug(f"[{self.name}] Sending messages to OpenAI API ({self._last_prompt_tokens} prompt tokens)")
         if messages:
              logger.debug(f"[{self.name}] Last interaction: {messages[-1]}")
 
-        next_message = openai_utils.client().send_message(
-            messages, 
-            response_format=CognitiveActionModel,
-            agent_name=self.name
-        )
+        for attempt in range(TinyPerson.MAX_UNRECOVERABLE_RESPONSE_RETRIES + 1):
+            if attempt > 0:
+                cost_manager.record_response_repair("retries")
 
-        logger.debug(f"[{self.name}] Received message: {next_message}")
+            next_message = openai_utils.client().send_message(
+                messages, 
+                response_format=CognitiveActionModel,
+                agent_name=self.name
+            )
 
-        if next_message is None:
-            # Check for persona-specific diplomatic pivot
-            pivot_response = self.get("filter_proxy_response")
-            if not pivot_response:
-                pivot_response = f"[{self.name} remains silent, deep in thought...]"
-            
-            logger.warning(f"[{self.name}] LLM returned None (possibly filtered). Providing diplomatic pivot: {pivot_response}")
-            
-            # Fallback to a tactical action to prevent crash and maintain resolve
-            fallback_content = {
-                "action": {"type": "TALK", "content": pivot_response, "target": "everyone"},
-                "cognitive_state": {"goals": "Maintain situational awareness.", "attention": "The current tension.", "emotions": "Firm"}
-            }
-            return "assistant", fallback_content
+            logger.debug(f"[{self.name}] Received message: {next_message}")
 
-        return next_message["role"], utils.extract_json(next_message["content"])
+            if next_message is None:
+                break
+
+            # almost-valid messages are repaired locally, rather than asking the model again
+            # a batch of actions is only expected in eco-mode
+            content, repairs = repair_cognitive_action(utils.extract_json(next_message["content"]), self._mental_state,
+                                                       batch=self.eco_mode)
+            if content is not None:
+                cost_manager.record_response_repair("repaired" if repairs else "valid")
+                if repairs:
+                    logger.debug(f"[{self.name}] Repaired the action message locally: {', '.join(repairs)}.")
+                return next_message["role"], content
+
+            logger.warning(f"[{self.name}] Could not repair the action message, asking the model again: {next_message['content'][:200]}")
+        
+        else:
+            # every attempt was unrecoverable
+            cost_manager.record_response_repair("failed")
+
+        # Check for persona-specific diplomatic pivot
+        pivot_response = self.get("filter_proxy_response")
+        if not pivot_response:
+            pivot_response = f"[{self.name} remains silent, deep in thought...]"
+        
+        logger.warning(f"[{self.name}] LLM returned no usable message (possibly filtered). Providing diplomatic pivot: {pivot_response}")
+        
+        # Fallback to a tactical action to prevent crash and maintain resolve
+        fallback_content = {
+            "action": {"type": "TALK", "content": pivot_response, "target": "everyone"},
+            "cognitive_state": {"goals": "Maintain situational awareness.", "attention": "The current tension.", "emotions": "Firm"}
+        }
+        return "assistant", fallback_content
 
     ###########################################################
     # Internal cognitive state changes
@@ -996,6 +1188,10 @@ class TinyPerson(JsonSerializableRegistry):
         return relevant
 
     def retrieve_relevant_memories_for_current_context(self, top_k=7) -> list:
+        # nothing to search for, so we don't even build the search target
+        if self.semantic_memory.count() == 0:
+            return []
+
         # current context is composed of th recent memories, plus context, goals, attention, and emotions
         context = self._mental_state["context"]
         goals = self._mental_state["goals"]
@@ -1200,55 +1396,64 @@ class TinyPerson(JsonSerializableRegistry):
             )
         )
 
-    def pretty_current_interactions(self, simplified=True, skip_system=True, max_content_length=default["max_content_display_length"], first_n=None, last_n=None, include_omission_info:bool=True):
+    def pretty_current_interactions(self, simplified=True, skip_system=True, max_content_length=default["max_content_display_length"], first_n=None, last_n=None, include_omission_info:bool=True, plain:bool=False):
       """
-      Returns a pretty, readable, string with the current messages.
+      Returns a pretty, readable, string with the current messages. Each episode is only rendered once, and its
+      rendering reused by later calls. If `plain` is True, the text has no Rich markup and is not wrapped, which
+      is better suited to LLM prompts.
       """
       lines = []
       for message in self.episodic_memory.retrieve(first_n=first_n, last_n=last_n, include_omission_info=include_omission_info):
-        try:
-            if not (skip_system and message['role'] == 'system'):
-                msg_simplified_type = ""
-                msg_simplified_content = ""
-                msg_simplified_actor = ""
+        if not (skip_system and isinstance(message, dict) and message.get('role') == 'system'):
+            lines.extend(transcript_cache().lines(self, message, simplified=simplified, plain=plain))
+
+      return "\n".join(lines)
 
-                lines.append(self._pretty_timestamp(message['role'], message['simulation_timestamp']))
+    def _pretty_episode(self, message, simplified=True, plain=False) -> list:
+        """
+        Renders a single episode as transcript lines.
+        """
+        lines = []
+        try:
+            lines.append(self._pretty_timestamp(message['role'], message['simulation_timestamp']))
 
-                if message["role"] == "system":
-                    msg_simplified_actor = "SYSTEM"
-                    msg_simplified_type = message["role"]
-                    msg_simplified_content = message["content"]
+            if message["role"] == "system":
+                msg_simplified_type = message["role"]
+                msg_simplified_content = message["content"]
 
+                if plain:
+                    lines.append(f"{msg_simplified_type}: {msg_simplified_content}")
+                else:
                     lines.append(
                         f"[dim] {msg_simplified_type}: {msg_simplified_content}[/]"
                     )
 
-                elif message["role"] == "user":
-                    lines.append(
-                        self._pretty_stimuli(
-                            role=message["role"],
-                            content=message["content"],
-                            simplified=simplified,
-                            max_content_length=max_content_length,
-                        )
+            elif message["role"] == "user":
+                lines.append(
+                    self._pretty_stimuli(
+                        role=message["role"],
+                        content=message["content"],
+                        simplified=simplified,
+                        plain=plain,
                     )
+                )
 
-                elif message["role"] == "assistant":
-                    lines.append(
-                        self._pretty_action(
-                            role=message["role"],
-                            content=message["content"],
-                            simplified=simplified,
-                            max_content_length=max_content_length,
-                        )
+            elif message["role"] == "assistant":
+                lines.append(
+                    self._pretty_action(
+                        role=message["role"],
+                        content=message["content"],
+                        simplified=simplified,
+                        plain=plain,
                     )
-                else:
-                    lines.append(f"{message['role']}: {message['content']}")
+                )
+            else:
+                lines.append(f"{message['role']}: {message['content']}")
         except:
-            # print(f"ERROR: {message}")
-            continue
+            # malformed episodes (e.g., the omission marker) only show what could be rendered
+            pass
 
-      return "\n".join(lines)
+        return lines
 
     def _pretty_stimuli(
         self,
@@ -1256,6 +1461,7 @@ class TinyPerson(JsonSerializableRegistry):
         content,
         simplified=True,
         max_content_length=default["max_content_display_length"],
+        plain=False,
     ) -> list:
         """
         Pretty prints stimuli.
@@ -1274,6 +1480,10 @@ class TinyPerson(JsonSerializableRegistry):
                 msg_simplified_type = stimus["type"]
                 msg_simplified_content = stimus["content"]
 
+                if plain:
+                    lines.append(f"{msg_simplified_actor} -> {self.name} ({msg_simplified_type}): {msg_simplified_content}")
+                    continue
+
                 rich_style = utils.RichTextStyle.get_style_for("stimulus", msg_simplified_type)
                 
                 # Get dynamic agent colors
@@ -1304,6 +1514,7 @@ class TinyPerson(JsonSerializableRegistry):
         content,
         simplified=True,
         max_content_length=default["max_content_display_length"],
+        plain=False,
     ) -> str:
         """
         Pretty prints an action.
@@ -1325,6 +1536,9 @@ class TinyPerson(JsonSerializableRegistry):
                 if msg_simplified_content.startswith("###"):
                     return ""
 
+            if plain:
+                return f"{msg_simplified_actor} ({msg_simplified_type}): {msg_simplified_content}"
+
             rich_style = utils.RichTextStyle.get_style_for("action", msg_simplified_type)
             
             # Get dynamic agent colors
@@ -1442,13 +1656,16 @@ class TinyPerson(JsonSerializableRegistry):
         # delete the logger and other attributes that cannot be serialized
         del to_copy["environment"]
         del to_copy["_mental_faculties"]
+        to_copy.pop("_system_prompts", None)
 
         to_copy["_accessible_agents"] = [agent.name for agent in self._accessible_agents]
-        to_copy['episodic_memory'] = self.episodic_memory.to_json()
+        to_copy['episodic_memory'] = self.episodic_memory.to_json(share_segments=True)
         to_copy['semantic_memory'] = self.semantic_memory.to_json()
+        to_copy['_emotional_trajectory'] = self._emotional_trajectory.to_json()
         to_copy["_mental_faculties"] = [faculty.to_json() for faculty in self._mental_faculties]
 
-        state = copy.deepcopy(to_copy)
+        # large texts shared with other agents are only referenced (e.g., in current messages)
+        state = copy.deepcopy(shared_segments().reference(to_copy))
 
         return state
 
@@ -1457,11 +1674,13 @@ class TinyPerson(JsonSerializableRegistry):
         Loads the complete state of the TinyPerson, including the current messages,
         and produces a new TinyPerson instance.
         """
-        state = copy.deepcopy(state)
+        state = copy.deepcopy(shared_segments().resolve(state))
         
         self._accessible_agents = [TinyPerson.get_agent_by_name(name) for name in state["_accessible_agents"]]
         self.episodic_memory = EpisodicMemory.from_json(state['episodic_memory'])
         self.semantic_memory = SemanticMemory.from_json(state['semantic_memory'])
+        if '_emotional_trajectory' in state:
+            self._emotional_trajectory = EmotionalTrajectory.from_json(state.pop('_emotional_trajectory'))
         
         for i, faculty in enumerate(self._mental_faculties):
             faculty = faculty.from_json(state['_mental_faculties'][i])
@@ -1494,18 +1713,57 @@ class TinyPerson(JsonSerializableRegistry):
         new_agent._persona = new_persona
 
         return new_agent
+
+    def fork(self, namespace:str) -> Self:
+        """
+        Creates an independent copy of this agent, in its current state, for exploring an alternative branch of the
+        simulation. The copy keeps the same name (so that prompts are unaffected), but is registered under the given 
+        namespace. Episodes already stored in episodic memory are shared with the original, copy-on-write, while the 
+        rest of the mutable state is copied. The copy is not part of any environment and its accessible agents still 
+        refer to the original ones, so callers are expected to remap them (as `TinyWorld.fork()` does).
+
+        Args:
+            namespace (str): The namespace under which to register the copy. Must be unique per agent name.
+        
+        Returns:
+            TinyPerson: The forked agent.
+        """
+        forked = copy.copy(self)
+
+        # elements that must not be deep copied
+        shared = {"environment", "_accessible_agents", "episodic_memory"}
+        for attribute, value in self.__dict__.items():
+            if attribute not in shared:
+                setattr(forked, attribute, copy.deepcopy(value))
+
+        forked.environment = None
+        forked._accessible_agents = list(self._accessible_agents)
+        forked.episodic_memory = self.episodic_memory.fork()
+
+        # forks live outside of the simulation cache of the original agent
+        forked.simulation_id = DETACHED
+
+        TinyPerson.add_agent(forked, namespace=namespace)
+
+        return forked
         
 
     @staticmethod
-    def add_agent(agent):
+    def add_agent(agent, namespace:str=None):
         """
-        Adds an agent to the global list of agents. Agent names must be unique,
-        so this method will raise an exception if the name is already in use.
+        Adds an agent to the global list of agents. Agent names must be unique (within a namespace, if one
+        is given), so this method will raise an exception if the name is already in use.
+
+        Args:
+            agent (TinyPerson): The agent to register.
+            namespace (str, optional): A namespace for the registration, used to keep forked copies of agents apart 
+              from the originals. The agent is then registered as `<namespace>/<name>`. Defaults to None.
         """
-        if agent.name in TinyPerson.all_agents:
-            raise ValueError(f"Agent name {agent.name} is already in use.")
+        registry_name = agent.name if namespace is None else f"{namespace}/{agent.name}"
+        if registry_name in TinyPerson.all_agents:
+            raise ValueError(f"Agent name {registry_name} is already in use.")
         else:
-            TinyPerson.all_agents[agent.name] = agent
+            TinyPerson.all_agents[registry_name] = agent
 
     @staticmethod
     def has_agent(agent_name: str):
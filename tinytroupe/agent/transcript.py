@@ -0,0 +1,85 @@
+"""
+Incrementally built interaction transcripts. Rendering an episode for display (escaping Rich markup, wrapping the
+text) is much more expensive than looking it up, and the same episodes are rendered again and again: every
+intervention check and every extraction asks for the agents' transcripts. Renderings are therefore memoized per
+episode, so each episode is rendered once, a transcript only renders the episodes stored since the last one, and
+a first_n/last_n window only touches the episodes it shows.
+"""
+
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+from tinytroupe.agent.memory import TransientEpisode
+
+
+class TranscriptCache:
+    """
+    A bounded (LRU) cache of episode renderings. Entries are keyed by the episode object itself, together with what
+    the rendering depends on (the agent, whether it is simplified or plain, and whether thoughts are shown).
+    Episodes are not modified in place once stored (a replaced episode is a new object), so a cached rendering
+    never goes stale. Transient episodes (e.g., read back from a spill file), which are new objects on every read,
+    are keyed by a digest of their contents instead, and are not kept alive by the cache.
+    """
+
+    def __init__(self, max_entries: int = 8192) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict() # key -> (episode, or None if transient, lines)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lines(self, agent, episode, simplified: bool = True, plain: bool = False) -> list:
+        """
+        Returns the transcript lines of an episode of the given agent, rendering it only if needed.
+        """
+        if isinstance(episode, TransientEpisode):
+            pinned = None
+            episode_key = hashlib.blake2b(json.dumps(episode, sort_keys=True, default=str).encode("utf-8"),
+                                          digest_size=16).digest()
+        else:
+            # the entry keeps the episode alive, so its id cannot be reused by another object while cached
+            pinned = episode
+            episode_key = id(episode)
+
+        key = (agent.name, episode_key, simplified, plain, agent.show_thoughts)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is pinned:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+        lines = agent._pretty_episode(episode, simplified=simplified, plain=plain)
+
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = (pinned, lines)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return lines
+
+    def clear(self) -> None:
+        """
+        Removes all cached renderings.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+_default_cache = TranscriptCache()
+
+
+def transcript_cache() -> TranscriptCache:
+    """
+    Returns the process-wide cache of episode renderings.
+    """
+    return _default_cache
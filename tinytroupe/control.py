@@ -1,9 +1,12 @@
 """
 Simulation controlling mechanisms.
 """
+import functools
+import hashlib
 import json
 import os
 import tempfile
+import threading
 
 import tinytroupe
 import tinytroupe.utils as utils
@@ -11,6 +14,55 @@ import tinytroupe.utils as utils
 import logging
 logger = logging.getLogger("tinytroupe")
 
+# String arguments at least this long have their digests memoized, since the same large
+# payloads (e.g., grounding documents passed to `think()`) tend to be passed over and over.
+LARGE_ARGUMENT_LENGTH = 1024
+MAX_MEMOIZED_ARGUMENT_DIGESTS = 256
+_large_argument_digests = {} # {large_string: digest_bytes, ...}
+_large_argument_digests_lock = threading.Lock()
+
+# Version 2 cache files store a tree of nodes; version 1 ones (a plain list) store a single linear trace, whose
+# events were hashed as `str((function_name, args, kwargs))`. Those hashes can no longer be matched, so version 1
+# files are rejected rather than silently missing on every event.
+CACHE_FILE_VERSION = 2
+
+# The simulation id of objects kept out of every simulation (e.g., forks explored alongside a running one). Their
+# transactions run directly, without caching, even while a simulation is active, and no simulation captures them.
+DETACHED = "detached"
+
+_simulated_types = None
+
+def _simulated_entity_types():
+    """
+    Returns the (TinyPerson, TinyWorld, TinyFactory) classes. They are imported on first use only,
+    to avoid circular dependencies, and then kept around so that transactions don't pay for the imports.
+    """
+    global _simulated_types
+    if _simulated_types is None:
+        from tinytroupe.agent import TinyPerson
+        from tinytroupe.environment import TinyWorld
+        from tinytroupe.factory.tiny_factory import TinyFactory
+        _simulated_types = (TinyPerson, TinyWorld, TinyFactory)
+
+    return _simulated_types
+
+def _argument_digest(value) -> bytes:
+    """
+    Computes a digest of a single function call argument, memoizing it for large strings.
+    """
+    if isinstance(value, str) and len(value) >= LARGE_ARGUMENT_LENGTH:
+        digest = _large_argument_digests.get(value)
+        if digest is None:
+            digest = hashlib.blake2b(value.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+            with _large_argument_digests_lock:
+                if len(_large_argument_digests) >= MAX_MEMOIZED_ARGUMENT_DIGESTS:
+                    # evict the oldest entry (dicts preserve insertion order)
+                    del _large_argument_digests[next(iter(_large_argument_digests))]
+                _large_argument_digests[value] = digest
+        return digest
+
+    return repr(value).encode("utf-8", "surrogatepass")
+
 class Simulation:
 
     STATUS_STOPPED = "stopped"
@@ -35,6 +87,13 @@ class Simulation:
         # should we always automatically checkpoint at the every transaction?
         self.auto_checkpoint = False
 
+        # should consecutive cache hits be fast-forwarded, decoding only the last state of the run?
+        self.fast_forward = False
+
+        # cache node of the last state skipped during fast-forward replay, if any,
+        # which must still be decoded before agents and environments can be used again
+        self._pending_replay_node = None
+
         # whether there are changes not yet saved to the cache file
         self.has_unsaved_cache_changes = False
 
@@ -42,28 +101,27 @@ class Simulation:
         # simulation caching later
         self._under_transaction = False
 
-        # Cache chain mechanism.
+        # Cache tree mechanism.
         # 
-        # stores a list of simulation states.
-        # Each state is a tuple (prev_node_hash, event_hash, event_output, state), where prev_node_hash is a hash of the previous node in this chain,
-        # if any, event_hash is a hash of the event that triggered the transition to this state, if any, event_output is the output of the event,
-        # if any, and state is the actual complete state that resulted.
-        if cached_trace is None:
-            self.cached_trace = []
-        else:
-            self.cached_trace = cached_trace
+        # stores simulation states as a tree, so that several branches (e.g., what-if variants of a scenario) can
+        # share their common prefix. Each node is a tuple (parent_node_id, event_hash, event_output, state), where 
+        # parent_node_id is the id of the previous node in the branch, if any, event_hash is a hash of the event that 
+        # triggered the transition to this state, event_output is the output of the event, if any, and state is the 
+        # actual complete state that resulted. Node ids are digests of (parent_node_id, event_hash), so the same 
+        # sequence of events always leads to the same node.
+        self.cache_tree = {} # {node_id: (parent_node_id, event_hash, event_output, state), ...}
+        if cached_trace is not None:
+            self._load_linear_trace(cached_trace)
         
         self.cache_misses = 0
         self.cache_hits = 0
 
         # Execution chain mechanism.
         #
-        # The actual, current, execution trace. Each state is a tuple (prev_node_hash, event_hash, state), where prev_node_hash is a hash 
-        # of the previous node in this chain, if any, event_hash is a hash of the event that triggered the transition to this state, if any, 
-        # event_output is the output of the event, if any, and state is the actual complete state that resulted.
+        # The actual, current, execution trace, as the list of the cache tree node ids visited so far.
         self.execution_trace = []
 
-    def begin(self, cache_path:str=None, auto_checkpoint:bool=False):
+    def begin(self, cache_path:str=None, auto_checkpoint:bool=False, fast_forward:bool=False):
         """
         Marks the start of the simulation being controlled.
 
@@ -71,9 +129,12 @@ class Simulation:
             cache_path (str): The path to the cache file. If not specified, 
                     defaults to the default cache path defined in the class.
             auto_checkpoint (bool, optional): Whether to automatically checkpoint at the end of each transaction. Defaults to False.
+            fast_forward (bool, optional): Whether to replay runs of consecutive cache hits without decoding the intermediate
+                    states. Only the last state of each run is decoded, either at the next cache miss or when `materialize()` 
+                    is called. Defaults to False.
         """
 
-        logger.debug(f"Starting simulation, cache_path={cache_path}, auto_checkpoint={auto_checkpoint}.")
+        logger.debug(f"Starting simulation, cache_path={cache_path}, auto_checkpoint={auto_checkpoint}, fast_forward={fast_forward}.")
 
         # local import to avoid circular dependencies
         from tinytroupe.agent import TinyPerson
@@ -91,6 +152,10 @@ class Simulation:
         # should we automatically checkpoint?
         self.auto_checkpoint = auto_checkpoint
 
+        # should we fast-forward through cached states?
+        self.fast_forward = fast_forward
+        self._pending_replay_node = None
+
         # clear the agents, environments and other simulated entities, we'll track them from now on
         TinyPerson.clear_agents()
         TinyWorld.clear_environments()
@@ -109,6 +174,7 @@ class Simulation:
         """
         logger.debug("Ending simulation.")
         if self.status == Simulation.STATUS_STARTED:
+            self.materialize()
             self.status = Simulation.STATUS_STOPPED
             self.checkpoint()
         else:
@@ -125,6 +191,19 @@ class Simulation:
         else:
             logger.debug("No unsaved cache changes to save to file.")
 
+    def materialize(self):
+        """
+        Decodes the last cached state skipped during fast-forward replay, if any, so that agents, 
+        environments and factories reflect it. This is called automatically before the next cache miss
+        and when the simulation ends, but callers that inspect live objects in between must call it explicitly.
+        """
+        if self._pending_replay_node is not None:
+            node_id = self._pending_replay_node
+            self._pending_replay_node = None
+
+            logger.debug(f"Materializing fast-forwarded state at cache node {node_id}.")
+            self._decode_simulation_state(self.cache_tree[node_id][3])
+
     def add_agent(self, agent):
         """
         Adds an agent to the simulation.
@@ -165,94 +244,219 @@ class Simulation:
         """
         return len(self.execution_trace) - 1
     
-    def _function_call_hash(self, function_name, *args, **kwargs) -> int:
+    def _current_node_id(self):
+        """
+        Returns the id of the cache node the execution is currently at, or None if nothing was executed yet.
+        """
+        return self.execution_trace[-1] if self.execution_trace else None
+
+    @staticmethod
+    def _node_id(parent_node_id, event_hash) -> str:
+        """
+        Computes the id of the cache node reached from the given parent node through the given event.
+        """
+        hasher = hashlib.blake2b(digest_size=16)
+        hasher.update(str(parent_node_id).encode("utf-8"))
+        hasher.update(b"\x00")
+        hasher.update(str(event_hash).encode("utf-8"))
+        return hasher.hexdigest()
+
+    def _function_call_hash(self, function_name, *args, **kwargs) -> str:
         """
-        Computes the hash of the given function call.
+        Computes the hash of the given function call. Arguments are fed incrementally to a
+        digest, so large arguments are never formatted into one big string.
         """
-        event = str((function_name, args, kwargs))
-        return event
+        hasher = hashlib.blake2b(digest_size=16)
+        hasher.update(function_name.encode("utf-8"))
+        for arg in args:
+            hasher.update(b"\x00")
+            hasher.update(_argument_digest(arg))
+        for key in sorted(kwargs):
+            hasher.update(b"\x01")
+            hasher.update(key.encode("utf-8"))
+            hasher.update(b"=")
+            hasher.update(_argument_digest(kwargs[key]))
+
+        return f"{function_name}:{hasher.hexdigest()}"
 
-    def _skip_execution_with_cache(self):
+    def _skip_execution_with_cache(self, event_hash):
         """
-        Skips the current execution, assuming there's a cached state at the same position.
+        Skips the current execution, assuming there's a cached node for the given event right after the current one.
         """
-        assert len(self.cached_trace) > self._execution_trace_position() + 1, "There's no cached state at the current execution position."
+        node_id = self._node_id(self._current_node_id(), event_hash)
+        assert node_id in self.cache_tree, "There's no cached state at the current execution position."
         
-        self.execution_trace.append(self.cached_trace[self._execution_trace_position() + 1])
+        self.execution_trace.append(node_id)
+        return node_id
     
     def _is_transaction_event_cached(self, event_hash) -> bool:
         """
-        Checks whether the given event hash matches the corresponding cached one, if any.
-        If there's no corresponding cached state, returns True.
-        """
-        # there's cache that could be used
-        if len(self.cached_trace) > self._execution_trace_position() + 1:
-            if self._execution_trace_position() >= -1:
-                # here's a graphical depiction of the logic:
-                #
-                # Cache:         c0:(c_prev_node_hash_0, c_event_hash_0, _,  c_state_0) ------------------> c1:(c_prev_node_hash_1, c_event_hash_1,  _,  c_state_1) -> ...
-                # Execution:     e0:(e_prev_node_hash_0, e_event_hash_0, _,  e_state_0) -<being computed>-> e1:(e_prev_node_hash_1, <being computed>, <being computed>, <being computed>)
-                #   position = 0 ^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
-                #
-                #   Must satisfy: 
-                #     - event_hash == c_event_hash_1
-                #     - hash(e0) == c_prev_node_hash_1
-                event_hash_match = event_hash == self.cached_trace[self._execution_trace_position() + 1][1]
-                prev_node_match = True 
-
-                return event_hash_match and prev_node_match
-            
-            else: 
-                raise ValueError("Execution trace position is invalid, must be >= -1, but is ", self._execution_trace_position())
-        
-        else: # no cache to use
-            return False
+        Checks whether the given event, happening at the current execution position, was already cached
+        in some branch of the cache tree.
+        """
+        # here's a graphical depiction of the logic:
+        #
+        # Cache:      root -> c0 -> c1 -> c2          (branch A)
+        #                        \-> c1' -> c2'       (branch B)
+        # Execution:  root -> e0 -<being computed>->
+        #
+        #   e0 == c0, so the event is cached if it leads from c0 to either c1 or c1'.
+        return self._node_id(self._current_node_id(), event_hash) in self.cache_tree
     
-    def _drop_cached_trace_suffix(self):
+    def _add_to_execution_trace(self, node_id):
         """
-        Drops the cached trace suffix starting at the current execution trace position. This effectively
-        refreshes the cache to the current execution state and starts building a new cache from there.
+        Moves the execution to the given cache node.
         """
-        self.cached_trace = self.cached_trace[:self._execution_trace_position()+1]
-        
-    def _add_to_execution_trace(self, state: dict, event_hash: int, event_output):
+        self.execution_trace.append(node_id)
+
+    def _add_to_cache_trace(self, state: dict, event_hash: str, event_output) -> str:
         """
-        Adds a state to the execution_trace list and computes the appropriate hash.
-        The computed hash is compared to the hash of the cached trace at the same position,
-        and if they don't match, the execution is aborted. Similarly, the event_hash is compared
-        to the hash of the event in the cached trace at the same position, and if they don't match, the execution
-        is aborted.
+        Adds a state to the cache tree, as a child of the current execution node, and returns the new node id.
+        Other children of the same parent, if any, are preserved as alternative branches.
         """
-        
-        # Compute the hash of the previous execution pair, if any
-        previous_hash = None
+        parent_node_id = self._current_node_id()
+        node_id = self._node_id(parent_node_id, event_hash)
+        self.cache_tree[node_id] = (parent_node_id, event_hash, event_output, state)
 
-        # Create a tuple of (hash, state) and append it to the execution_trace list
-        self.execution_trace.append((previous_hash, event_hash, event_output, state))
+        self.has_unsaved_cache_changes = True
+        return node_id
+    
+    def _load_linear_trace(self, cached_trace:list):
+        """
+        Loads a linear cache trace as a single branch of the cache tree. Its event hashes must be computed by
+        `_function_call_hash`.
+        """
+        parent_node_id = None
+        for _, event_hash, event_output, state in cached_trace:
+            node_id = self._node_id(parent_node_id, event_hash)
+            self.cache_tree[node_id] = (parent_node_id, event_hash, event_output, state)
+            parent_node_id = node_id
 
-    def _add_to_cache_trace(self, state: dict, event_hash: int, event_output):
+    @property
+    def cached_trace(self) -> list:
         """
-        Adds a state to the cached_trace list and computes the appropriate hash.
+        The cached nodes along the current execution path, from the root onwards.
         """
-        # Compute the hash of the previous cached pair, if any
-        previous_hash = None
-        if self.cached_trace:
-            previous_hash = utils.custom_hash(self.cached_trace[-1])
-        
-        # Create a tuple of (hash, state) and append it to the cached_trace list
-        self.cached_trace.append((previous_hash, event_hash, event_output, state))
+        return [self.cache_tree[node_id] for node_id in self.execution_trace if node_id in self.cache_tree]
 
-        self.has_unsaved_cache_changes = True
+    ###################################################################################################
+    # Branch management
+    ###################################################################################################
+
+    def _children(self) -> dict:
+        """
+        Returns a mapping from each node id (None for the root) to the ids of its children.
+        """
+        children = {None: []}
+        for node_id, (parent_node_id, _, _, _) in self.cache_tree.items():
+            children.setdefault(node_id, [])
+            children.setdefault(parent_node_id, []).append(node_id)
+        return children
+
+    def _branch_path(self, leaf_node_id) -> list:
+        """
+        Returns the node ids from the root down to the given node.
+        """
+        path = []
+        node_id = leaf_node_id
+        while node_id is not None:
+            path.append(node_id)
+            node_id = self.cache_tree[node_id][0]
+        path.reverse()
+        return path
+
+    def list_branches(self) -> list:
+        """
+        Lists the branches of the cache tree, i.e., the paths from the root to each leaf.
+
+        Returns:
+            list: One dict per branch, with the `leaf` node id, its `length` (number of cached events), 
+              the `fork_point` (the last node shared with another branch, or None), the `events` (names of the
+              functions called along the branch) and whether the `current` execution position lies on it.
+        """
+        children = self._children()
+        current_node_id = self._current_node_id()
+
+        branches = []
+        for node_id, node_children in children.items():
+            if node_id is None or len(node_children) > 0:
+                continue
+
+            path = self._branch_path(node_id)
+
+            fork_point = None
+            for ancestor_id in reversed(path[:-1]):
+                if len(children[ancestor_id]) > 1:
+                    fork_point = ancestor_id
+                    break
+
+            branches.append({
+                "leaf": node_id,
+                "length": len(path),
+                "fork_point": fork_point,
+                "events": [self.cache_tree[n][1].split(":", 1)[0] for n in path],
+                "current": current_node_id is not None and current_node_id in path
+            })
+
+        return branches
+
+    def prune_branch(self, leaf_node_id) -> int:
+        """
+        Removes the given branch from the cache tree. Nodes shared with other branches are kept.
+
+        Args:
+            leaf_node_id (str): The id of the leaf node of the branch to remove.
+
+        Returns:
+            int: The number of cache nodes removed.
+        """
+        if leaf_node_id not in self.cache_tree:
+            raise ValueError(f"There's no cached node with id {leaf_node_id}.")
+        
+        if leaf_node_id in self.execution_trace:
+            raise ValueError(f"Cannot prune the branch currently being executed (node {leaf_node_id}).")
+
+        children = self._children()
+        if len(children[leaf_node_id]) > 0:
+            raise ValueError(f"Node {leaf_node_id} is not a leaf, so it does not identify a single branch.")
+
+        removed = 0
+        node_id = leaf_node_id
+        while node_id is not None and len(children[node_id]) == 0 and node_id not in self.execution_trace:
+            parent_node_id = self.cache_tree[node_id][0]
+            del self.cache_tree[node_id]
+            children[parent_node_id].remove(node_id)
+            removed += 1
+            node_id = parent_node_id
+
+        if removed > 0:
+            self.has_unsaved_cache_changes = True
+
+        return removed
     
     def _load_cache_file(self, cache_path:str):
         """
         Loads the cache file from the given path.
         """
+        self.cache_tree = {}
         try:
-            self.cached_trace = json.load(open(cache_path, "r"))
+            with open(cache_path, "r") as f:
+                content = json.load(f)
         except FileNotFoundError:
             logger.info(f"Cache file not found on path: {cache_path}.")
-            self.cached_trace = []
+            return
+
+        if isinstance(content, list):
+            raise ValueError(f"The cache format changed: {cache_path} is a version 1 cache file, whose event hashes "
+                             f"are no longer computed. Delete it (or use another cache path) and re-run the simulation "
+                             f"to rebuild the cache.")
+        else:
+            for node_id, (parent_node_id, event_hash, event_output, state) in content["nodes"].items():
+                self.cache_tree[node_id] = (parent_node_id, event_hash, event_output, state)
+
+            # large texts shared by many agents are stored once, and referenced from the states
+            from tinytroupe.agent.shared_segments import shared_segments # avoids circular imports
+            shared_segments().register(content.get("shared_segments", {}))
         
     def _save_cache_file(self, cache_path:str):
         """
@@ -261,7 +465,9 @@ class Simulation:
         try:
             # Create a temporary file
             with tempfile.NamedTemporaryFile('w', delete=False) as temp:
-                json.dump(self.cached_trace, temp, indent=4)
+                from tinytroupe.agent.shared_segments import shared_segments # avoids circular imports
+                json.dump({"version": CACHE_FILE_VERSION, "nodes": self.cache_tree,
+                           "shared_segments": shared_segments().export()}, temp, indent=4)
 
             # Replace the original file with the temporary file
             os.replace(temp.name, cache_path)
@@ -384,10 +590,7 @@ class Simulation:
 class Transaction:
 
     def __init__(self, obj_under_transaction, simulation, function, *args, **kwargs):
-        # local import to avoid circular dependencies
-        from tinytroupe.agent import TinyPerson
-        from tinytroupe.environment import TinyWorld
-        from tinytroupe.factory.tiny_factory import TinyFactory
+        TinyPerson, TinyWorld, TinyFactory = _simulated_entity_types()
 
         self.obj_under_transaction = obj_under_transaction
         self.simulation = simulation
@@ -405,7 +608,7 @@ class Transaction:
                     raise ValueError(f"Object {obj_under_transaction} is already captured by a different simulation (id={obj_under_transaction.simulation_id}), \
                                     and cannot be captured by simulation id={simulation.id}.")
                 
-                logger.debug(f">>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>> Object {obj_under_transaction} is already captured by simulation {simulation.id}.")
+                logger.debug(">>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>> Object %s is already captured by simulation %s.", obj_under_transaction, simulation.id)
             else:
                 # if is a TinyPerson, add the agent to the simulation
                 if isinstance(obj_under_transaction, TinyPerson):
@@ -443,28 +646,37 @@ class Transaction:
                 self.simulation.cache_hits += 1
 
                 # Restore the full state and return the cached output
-                logger.info(f"Skipping execution of {self.function_name} with args {self.args} and kwargs {self.kwargs} because it is already cached.")
+                logger.info("Skipping execution of %s with args %s and kwargs %s because it is already cached.", self.function_name, self.args, self.kwargs)
+
+                node_id = self.simulation._skip_execution_with_cache(event_hash)
 
-                self.simulation._skip_execution_with_cache()
-                state = self.simulation.cached_trace[self.simulation._execution_trace_position()][3] # state
-                self.simulation._decode_simulation_state(state)
+                if self.simulation.fast_forward:
+                    # defer decoding, since the next transaction might be a cache hit too, in which case
+                    # this intermediate state would be immediately overwritten
+                    self.simulation._pending_replay_node = node_id
+                else:
+                    state = self.simulation.cache_tree[node_id][3] # state
+                    self.simulation._decode_simulation_state(state)
                 
                 # Output encoding/decoding is used to preserve references to TinyPerson and TinyWorld instances
                 # mainly. Scalar values (int, float, str, bool) and composite values (list, dict) are 
                 # encoded/decoded as is.
-                encoded_output = self.simulation.cached_trace[self.simulation._execution_trace_position()][2] # output
+                encoded_output = self.simulation.cache_tree[node_id][2] # output
                 output = self._decode_function_output(encoded_output)
 
             else: # not cached
                 self.simulation.cache_misses += 1
+
+                # the fresh execution must start from the last replayed state, if it was fast-forwarded
+                self.simulation.materialize()
                 
                 # reentrant transactions are not cached, since what matters is the final result of
                 # the top-level transaction
                 if not self.simulation.is_under_transaction():
                     self.simulation.begin_transaction()
 
-                    # immediately drop the cached trace suffix, since we are starting a new execution from this point on
-                    self.simulation._drop_cached_trace_suffix()
+                    # no need to drop anything from the cache: the new execution simply starts a new branch
+                    # from the current node, and the other branches remain available for replay
                     
                     # Compute the function, cache the result and return it
                     output = self.function(*self.args, **self.kwargs)
@@ -472,8 +684,8 @@ class Transaction:
                     encoded_output = self._encode_function_output(output)
                     state = self.simulation._encode_simulation_state()
                                   
-                    self.simulation._add_to_cache_trace(state, event_hash, encoded_output)
-                    self.simulation._add_to_execution_trace(state, event_hash, encoded_output)
+                    node_id = self.simulation._add_to_cache_trace(state, event_hash, encoded_output)
+                    self.simulation._add_to_execution_trace(node_id)
 
                     self.simulation.end_transaction()
                 
@@ -492,11 +704,7 @@ class Transaction:
         """
         Encodes the given function output.
         """
-        # local import to avoid circular dependencies
-        from tinytroupe.agent import TinyPerson
-        from tinytroupe.environment import TinyWorld
-        from tinytroupe.factory.tiny_factory import TinyFactory
-
+        TinyPerson, TinyWorld, TinyFactory = _simulated_entity_types()
 
         # if the output is a TinyPerson, encode it
         if output is None:
@@ -520,10 +728,7 @@ class Transaction:
         """
         Decodes the given encoded function output.
         """
-        # local import to avoid circular dependencies
-        from tinytroupe.agent import TinyPerson
-        from tinytroupe.environment import TinyWorld
-        from tinytroupe.factory.tiny_factory import TinyFactory
+        TinyPerson, TinyWorld, TinyFactory = _simulated_entity_types()
 
         if encoded_output is None:
             return None
@@ -540,14 +745,21 @@ class Transaction:
 
 def transactional(func):
     """
-    A helper decorator that makes a function simulation-transactional.
+    A helper decorator that makes a function simulation-transactional. When no simulation
+    is active, the function is called directly, without any transaction bookkeeping.
     """
+    @functools.wraps(func)
     def wrapper(*args, **kwargs):
+        # fast path: without an active simulation, or for detached objects, there's nothing to cache or track
+        if _current_simulation_id is None or getattr(args[0], "simulation_id", None) == DETACHED:
+            return func(*args, **kwargs)
+
         obj_under_transaction = args[0]
         simulation = current_simulation()
-        obj_sim_id = obj_under_transaction.simulation_id if hasattr(obj_under_transaction, 'simulation_id') else None
 
-        logger.debug(f"-----------------------------------------> Transaction: {func.__name__} with args {args[1:]} and kwargs {kwargs} under simulation {obj_sim_id}.")
+        if logger.isEnabledFor(logging.DEBUG):
+            obj_sim_id = getattr(obj_under_transaction, 'simulation_id', None)
+            logger.debug(f"-----------------------------------------> Transaction: {func.__name__} with args {args[1:]} and kwargs {kwargs} under simulation {obj_sim_id}.")
         
         transaction = Transaction(obj_under_transaction, simulation, func, *args, **kwargs)
         result = transaction.execute()
@@ -594,13 +806,13 @@ def _simulation(id="default"):
     
     return _current_simulations[id]
 
-def begin(cache_path=None, id="default", auto_checkpoint=False):
+def begin(cache_path=None, id="default", auto_checkpoint=False, fast_forward=False):
     """
     Marks the start of the simulation being controlled.
     """
     global _current_simulation_id
     if _current_simulation_id is None:
-        _simulation(id).begin(cache_path, auto_checkpoint)
+        _simulation(id).begin(cache_path, auto_checkpoint, fast_forward)
         _current_simulation_id = id
     else:
         raise ValueError(f"Simulation is already started under id {_current_simulation_id}. Currently only one simulation can be started at a time.")   
@@ -619,6 +831,24 @@ def checkpoint(id="default"):
     """
     _simulation(id).checkpoint()
 
+def materialize(id="default"):
+    """
+    Decodes any state skipped during fast-forward replay, so that live objects reflect it.
+    """
+    _simulation(id).materialize()
+
+def list_branches(id="default"):
+    """
+    Lists the branches of the simulation cache tree.
+    """
+    return _simulation(id).list_branches()
+
+def prune_branch(leaf_node_id, id="default"):
+    """
+    Removes a branch from the simulation cache tree, keeping the nodes it shares with other branches.
+    """
+    return _simulation(id).prune_branch(leaf_node_id)
+
 def current_simulation():
     """
     Returns the current simulation.
@@ -31,6 +31,7 @@ class CostManager:
         self.total_cached_tokens = 0
         self.total_cost = 0.0
         self.usage_history = [] 
+        self.response_repairs = self._empty_response_repairs()
 
     def load_pricing_json(self, path):
         """Loads pricing from a JSON file if available."""
@@ -141,6 +142,18 @@ class CostManager:
         
         return call_cost
 
+    @staticmethod
+    def _empty_response_repairs():
+        # outcomes of the agents' action messages: valid as received, repaired locally, re-asked to the model
+        # (each extra round trip counts as a retry), or given up on
+        return {"valid": 0, "repaired": 0, "retries": 0, "failed": 0}
+
+    def record_response_repair(self, outcome):
+        """
+        Records the outcome of checking an agent's action message: "valid", "repaired", "retries" or "failed".
+        """
+        self.response_repairs[outcome] += 1
+
     def get_summary(self):
         """
         Returns a summary dictionary of the usage.
@@ -150,6 +163,7 @@ class CostManager:
             "total_output_tokens": self.total_output_tokens,
             "total_cached_tokens": self.total_cached_tokens,
             "total_cost": round(self.total_cost, 6),
+            "response_repairs": dict(self.response_repairs),
             "usage_history": self.usage_history
         }
 
@@ -159,6 +173,7 @@ class CostManager:
         self.total_cached_tokens = 0
         self.total_cost = 0.0
         self.usage_history = []
+        self.response_repairs = self._empty_response_repairs()
 
 # Global instance for easy access across the project
 cost_manager = CostManager()
@@ -0,0 +1,164 @@
+"""
+Generation of the next turn of several agents in a single LLM call. The agents of a crowded scene mostly see and hear
+the same things, so instead of sending one full prompt per agent, the scene is described once and each agent only
+adds a compact slot of its own (persona, state, directives and what only it knows).
+"""
+
+import os
+import time
+
+import chevron
+
+from tinytroupe.environment import logger
+from tinytroupe.agent import MultiAgentTurnModel
+from tinytroupe.agent.context_window import messages_tokens
+from tinytroupe.agent.persona_encoding import encode_persona
+import tinytroupe.openai_utils as openai_utils
+from tinytroupe import utils
+
+
+BATCHED_TURN_TEMPLATE_PATH = os.path.join(os.path.dirname(__file__), "prompts/batched_turn.mustache")
+
+
+def build_batched_turn_messages(world, agents: list, recent_episodes: int = 8, max_actions: int = 3,
+                                max_content_length: int = 600) -> list:
+    """
+    Builds the messages asking for the next actions of several agents.
+
+    Args:
+        world (TinyWorld): The environment the agents share.
+        agents (list): The agents whose turn is to be generated.
+        recent_episodes (int): How many of each agent's latest episodes describe the scene.
+        max_actions (int): The maximum number of actions per agent.
+        max_content_length (int): The maximum length of each recalled episode.
+
+    Returns:
+        list: The messages to send to the LLM.
+    """
+    with open(BATCHED_TURN_TEMPLATE_PATH, "r", encoding="utf-8") as f:
+        template = f.read()
+
+    # what several agents recalled is shared scene context, written only once; the rest is private to each agent
+    recollections = {agent.name: _recollections(agent, recent_episodes, max_content_length) for agent in agents}
+    counts = {}
+    for lines in recollections.values():
+        for line in dict.fromkeys(lines):
+            counts[line] = counts.get(line, 0) + 1
+    shared = [line for line in counts if counts[line] > 1]
+
+    agent_slots = []
+    for agent in agents:
+        persona = agent._persona
+        agent_slots.append({
+            "name": agent.name,
+            "persona": encode_persona(persona, "outline"),
+            "emotions": agent._mental_state.get("emotions"),
+            "emotional_intensity": agent._mental_state.get("emotional_intensity"),
+            "goals": agent._mental_state.get("goals"),
+            "redlines": "; ".join(persona.get("redlines", []) or []),
+            "standing_directives": agent._render_standing_directives(),
+            "vocabulary_priority": ", ".join(persona.get("vocabulary_priority", []) or []),
+            "syntax_constraints": persona.get("syntax_constraints", ""),
+            "private_context": "\n".join(line for line in recollections[agent.name] if counts[line] == 1),
+        })
+
+    prompt = chevron.render(template, {
+        "world_name": world.name,
+        "datetime": utils.pretty_datetime(world.current_datetime) if world.current_datetime is not None else None,
+        "participants": [agent.name for agent in agents],
+        "shared_context": "\n".join(shared),
+        "agents": agent_slots,
+        "max_actions": max_actions,
+    })
+
+    return [{"role": "system", "content": prompt},
+            {"role": "user", "content": "Now you **must** generate the next actions of every person listed, following the output format."}]
+
+
+def generate_batched_turns(world, agents: list, **kwargs) -> tuple:
+    """
+    Generates the next turn of several agents with a single LLM call.
+
+    Args:
+        world (TinyWorld): The environment the agents share.
+        agents (list): The agents whose turn is to be generated.
+        **kwargs: Options passed to `build_batched_turn_messages`.
+
+    Returns:
+        tuple: A dictionary from agent name to its message content ({"actions": [...], "cognitive_state": {...}}),
+          containing only the agents for which the LLM produced actions, and a report of the call's size and
+          latency. To compare it with per-agent calls, see `per_agent_prompt_tokens`.
+    """
+    messages = build_batched_turn_messages(world, agents, **kwargs)
+
+    start = time.monotonic()
+    next_message = openai_utils.client().send_message(messages, response_format=MultiAgentTurnModel)
+    latency = time.monotonic() - start
+
+    contents = {}
+    if next_message is None:
+        logger.warning(f"[{world.name}] The batched turn of {len(agents)} agents could not be generated.")
+    else:
+        names = {agent.name for agent in agents}
+        response = utils.extract_json(next_message["content"])
+        for turn in response.get("turns", []) if isinstance(response, dict) else []:
+            if isinstance(turn, dict) and turn.get("agent") in names and turn.get("actions"):
+                contents[turn["agent"]] = {"actions": turn["actions"], "cognitive_state": turn.get("cognitive_state") or {}}
+
+    report = {
+        "agents": len(agents),
+        "generated": len(contents),
+        "batched_prompt_tokens": messages_tokens(messages),
+        "latency_seconds": latency,
+    }
+    logger.info(f"[{world.name}] Batched turn of {report['generated']}/{report['agents']} agents: "
+                f"{report['batched_prompt_tokens']} prompt tokens in one call ({latency:.1f}s).")
+
+    return contents, report
+
+
+def per_agent_prompt_tokens(agents: list) -> int:
+    """
+    Counts the prompt tokens the agents' next turn would take with one call per agent, to compare with a batched
+    call. Rendering full prompts is expensive, so this is only meant to be called on demand (e.g., on a sample of
+    steps). The agents' current messages are left untouched.
+    """
+    total = 0
+    for agent in agents:
+        messages = [{"role": "system", "content": agent.generate_agent_system_prompt()}] + agent.retrieve_recent_memories()
+        total += messages_tokens(messages)
+    return total
+
+
+def _recollections(agent, recent_episodes: int, max_content_length: int) -> list:
+    # the latest episodes, phrased from a neutral perspective, so that what agents saw or heard together
+    # reads the same for all of them
+    lines = []
+    for episode in agent.episodic_memory.retrieve_last(recent_episodes, include_omission_info=False):
+        content = episode.get("content")
+        if not isinstance(content, dict):
+            continue
+
+        for stimulus in content.get("stimuli", []):
+            text = _truncate(stimulus.get("content"), max_content_length)
+            if stimulus.get("type") == "CONVERSATION" and stimulus.get("source"):
+                lines.append(f"- {stimulus['source']}: {text}")
+            elif stimulus.get("type") == "CONVERSATION":
+                lines.append(f"- {text}")
+            else:
+                lines.append(f"- [{stimulus.get('type')}] {text}")
+
+        action = content.get("action")
+        if isinstance(action, dict) and action.get("content"):
+            text = _truncate(action["content"], max_content_length)
+            if action.get("type") == "TALK":
+                lines.append(f"- {agent.name}: {text}")
+            elif action.get("type") == "THINK":
+                lines.append(f"- ({agent.name} thought) {text}")
+
+    return lines
+
+
+def _truncate(text, max_length: int) -> str:
+    text = str(text)
+    return text if len(text) <= max_length else text[:max_length] + "(...)"
@@ -99,6 +99,13 @@ class TinySocialNetwork(TinyWorld):
         source_agent.socialize(f"{target} is not in the same relation as you, so you cannot reach out to them.", source=self)
 
 
+    def _remap_forked_agents(self, agents_mapping: dict):
+        """
+        Makes the relations of a forked social network refer to the forked agents.
+        """
+        self.relations = {name: [(agents_mapping.get(agent_1, agent_1), agents_mapping.get(agent_2, agent_2)) for agent_1, agent_2 in relation]
+                          for name, relation in self.relations.items()}
+
     # TODO implement _handle_talk using broadcast_if_no_target too
 
     #######################################################################
@@ -1,10 +1,15 @@
 from tinytroupe.environment import logger, default
 
+import os
+import re
+import json
 import copy
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import textwrap
 
 from tinytroupe.agent import *
+from tinytroupe.environment.batched_turns import generate_batched_turns
 from tinytroupe.utils import name_or_empty, pretty_datetime
 import tinytroupe.control as control
 from tinytroupe.control import transactional
@@ -30,7 +35,9 @@ class TinyWorld:
                  initial_datetime=datetime.now(),
                  interventions=[],
                  broadcast_if_no_target=True,
-                 max_additional_targets_to_display=3):
+                 max_additional_targets_to_display=3,
+                 batch_turns=False,
+                 max_agents_per_batch=6):
         """
         Initializes an environment.
 
@@ -43,11 +50,17 @@ class TinyWorld:
             broadcast_if_no_target (bool): If True, broadcast actions if the target of an action is not found.
             max_additional_targets_to_display (int): The maximum number of additional targets to display in a communication. If None, 
                 all additional targets are displayed.
+            batch_turns (bool): If True, the agents' turns are generated together, with one LLM call per group of agents 
+                instead of one call per agent. Agents then act simultaneously on what they knew at the start of the step.
+            max_agents_per_batch (int): The maximum number of agents whose turns are generated in the same call.
         """
 
         self.name = name
         self.current_datetime = initial_datetime
         self.broadcast_if_no_target = broadcast_if_no_target
+        self.batch_turns = batch_turns
+        self.max_agents_per_batch = max_agents_per_batch
+        self._last_batch_reports = [] # cost and latency of the batched calls of the last step
         self.simulation_id = None # will be reset later if the agent is used within a specific simulation scope
         
         self.agents = []
@@ -99,6 +112,9 @@ class TinyWorld:
                 logger.debug(f"[{self.name}] Intervention '{intervention.name}' was applied.")
 
         # agents can act
+        if self.batch_turns and len(self.agents) > 1:
+            return self._act_batched()
+
         agents_actions = {}
         for agent in self.agents:
             logger.debug(f"[{self.name}] Agent {name_or_empty(agent)} is acting.")
@@ -108,6 +124,37 @@ class TinyWorld:
             self._handle_actions(agent, agent.pop_latest_actions())
         
         return agents_actions
+
+    def _act_batched(self):
+        """
+        Makes all agents act, generating the turns of each group of agents with a single LLM call. The generated
+        actions go through each agent's usual path (memory, cognitive state, mental faculties), and are then 
+        handled by the environment as usual. Agents missing from the batched response act on their own.
+        """
+        agents_actions = {}
+        self._last_batch_reports = []
+
+        for start in range(0, len(self.agents), self.max_agents_per_batch):
+            group = self.agents[start:start + self.max_agents_per_batch]
+
+            contents = {}
+            if len(group) > 1:
+                contents, report = generate_batched_turns(self, group)
+                self._last_batch_reports.append(report)
+
+            # all agents in the group act before any of their actions takes effect, since they act simultaneously
+            for agent in group:
+                if agent.name in contents:
+                    logger.debug(f"[{self.name}] Agent {name_or_empty(agent)} acts from the batched turn.")
+                    agents_actions[agent.name] = agent.apply_message("assistant", contents[agent.name])
+                else:
+                    logger.debug(f"[{self.name}] Agent {name_or_empty(agent)} is acting.")
+                    agents_actions[agent.name] = agent.act(return_actions=True)
+
+            for agent in group:
+                self._handle_actions(agent, agent.pop_latest_actions())
+
+        return agents_actions
         
 
     def _advance_datetime(self, timedelta):
@@ -351,6 +398,113 @@ class TinyWorld:
         else:
             return None
     
+    #######################################################################
+    # Branching methods
+    #######################################################################
+
+    def fork(self, n: int = 1) -> list:
+        """
+        Creates independent copies of this environment and of its agents, in their current state, so that
+        alternative continuations (e.g., under different injects or interventions) can be explored from a
+        common point. Each fork gets a unique name and its agents are registered under that name as namespace,
+        while keeping their original names. Episodic memories are shared copy-on-write with the originals.
+        Interventions are not carried over: add the ones specific to each branch to the corresponding fork.
+
+        Forks are detached from simulation caching: their transactions are never cached, and no simulation captures
+        them. They can be created mid-run, while a simulation is active (e.g., to explore alternatives from one of
+        its turns), in which case the state skipped by fast-forward replay is materialized first, so that forks
+        start from the actual current state.
+
+        Args:
+            n (int): The number of forks to create.
+
+        Returns:
+            list: The forked environments.
+        """
+        if control.current_simulation() is not None:
+            control.current_simulation().materialize()
+
+        forks = []
+        for i in range(n):
+            fork_name = f"{self.name} [fork {i+1}]"
+            while fork_name in TinyWorld.all_environments:
+                fork_name = f"{self.name} [fork {i+1}.{utils.fresh_id()}]"
+
+            forked = copy.copy(self)
+            forked.name = fork_name
+            forked.simulation_id = control.DETACHED
+            forked.agents = []
+            forked.name_to_agent = {}
+            forked._interventions = []
+            forked._displayed_communications_buffer = []
+            forked._target_display_communications_buffer = []
+            forked.console = Console()
+            TinyWorld.add_environment(forked)
+
+            agents_mapping = {agent: agent.fork(namespace=fork_name) for agent in self.agents}
+            for forked_agent in agents_mapping.values():
+                forked_agent._accessible_agents = [agents_mapping.get(agent, agent) for agent in forked_agent._accessible_agents]
+            
+            forked._remap_forked_agents(agents_mapping)
+            forked.add_agents(list(agents_mapping.values()))
+
+            logger.debug(f"[{self.name}] Forked into {fork_name}.")
+            forks.append(forked)
+
+        return forks
+
+    def _remap_forked_agents(self, agents_mapping: dict):
+        """
+        Replaces references to original agents by their forked copies, in any environment-specific structure. 
+        This default implementation has nothing to remap, but subclasses with their own agent references must 
+        override it.
+
+        Args:
+            agents_mapping (dict): A mapping from each original agent to its forked copy.
+        """
+        pass
+
+    @staticmethod
+    def run_forks(forks: list, steps: int, timedelta_per_step=None, output_folder: str = None, max_workers: int = None) -> dict:
+        """
+        Runs several forked environments concurrently, each in its own thread (simulation steps are dominated 
+        by LLM calls, so threads are enough to overlap them).
+
+        Args:
+            forks (list): The environments to run, typically produced by `fork()`.
+            steps (int): The number of steps to run each environment for.
+            timedelta_per_step (timedelta, optional): The time interval between steps. Defaults to None.
+            output_folder (str, optional): If given, the results of each fork are saved in a subfolder of it,
+              as `actions.json` and `interactions.txt`. Defaults to None.
+            max_workers (int, optional): The maximum number of forks running at the same time. Defaults to all of them.
+
+        Returns:
+            dict: The actions taken over time in each fork, indexed by fork name.
+        """
+        def run_one(world):
+            actions = world.run(steps, timedelta_per_step=timedelta_per_step, return_actions=True)
+            if output_folder is not None:
+                world._save_fork_results(output_folder, actions)
+            return actions
+
+        with ThreadPoolExecutor(max_workers=max_workers or max(1, len(forks))) as executor:
+            results = list(executor.map(run_one, forks))
+
+        return {world.name: actions for world, actions in zip(forks, results)}
+
+    def _save_fork_results(self, output_folder: str, actions: list):
+        """
+        Saves the results of running this environment as a branch of a larger simulation.
+        """
+        branch_folder = os.path.join(output_folder, re.sub(r"[^\w.-]+", "_", self.name).strip("_"))
+        os.makedirs(branch_folder, exist_ok=True)
+
+        with open(os.path.join(branch_folder, "actions.json"), "w", encoding="utf-8") as f:
+            json.dump(actions, f, indent=4, default=str)
+
+        with open(os.path.join(branch_folder, "interactions.txt"), "w", encoding="utf-8") as f:
+            f.write(self.pretty_current_interactions(max_content_length=None))
+
     #######################################################################
     # Intervention management methods
     #######################################################################
@@ -678,16 +832,17 @@ class TinyWorld:
         """
         print(self.pretty_current_interactions(simplified=simplified, skip_system=skip_system))
 
-    def pretty_current_interactions(self, simplified=True, skip_system=True, max_content_length=default["max_content_display_length"], first_n=None, last_n=None, include_omission_info:bool=True):
+    def pretty_current_interactions(self, simplified=True, skip_system=True, max_content_length=default["max_content_display_length"], first_n=None, last_n=None, include_omission_info:bool=True, plain:bool=False):
       """
-      Returns a pretty, readable, string with the current messages of agents in this environment.
+      Returns a pretty, readable, string with the current messages of agents in this environment. If `plain` is True,
+      the text has no Rich markup and is not wrapped.
       """
       agent_contents = []
 
       for agent in self.agents:
           agent_content = f"#### Interactions from the point of view of {agent.name} agent:\n"
           agent_content += f"**BEGIN AGENT {agent.name} HISTORY.**\n "
-          agent_content += agent.pretty_current_interactions(simplified=simplified, skip_system=skip_system, max_content_length=max_content_length, first_n=first_n, last_n=last_n, include_omission_info=include_omission_info) + "\n"
+          agent_content += agent.pretty_current_interactions(simplified=simplified, skip_system=skip_system, max_content_length=max_content_length, first_n=first_n, last_n=last_n, include_omission_info=include_omission_info, plain=plain) + "\n"
           agent_content += f"**FINISHED AGENT {agent.name} HISTORY.**\n\n"
           agent_contents.append(agent_content)      
           
@@ -6,6 +6,6 @@ logger = logging.getLogger("tinytroupe")
 # Exposed API
 ###########################################################################
 from .randomization import ABRandomizer
-from .proposition import Proposition, check_proposition
+from .proposition import Proposition, PropositionSet, check_proposition
 
-__all__ = ["ABRandomizer", "Proposition"]
+__all__ = ["ABRandomizer", "Proposition", "PropositionSet"]
@@ -1,6 +1,14 @@
+import re
+import json
+import textwrap
+
+from tinytroupe.experimentation import logger
 from tinytroupe.agent import TinyPerson
+from tinytroupe.agent.context_window import count_tokens, messages_tokens
 from tinytroupe.environment import TinyWorld
-from tinytroupe.openai_utils import LLMRequest
+from tinytroupe.openai_utils import LLMRequest, LLMScalarWithJustificationListResponse
+import tinytroupe.openai_utils as openai_utils
+from tinytroupe import utils
 
 class Proposition:
 
@@ -31,22 +39,13 @@ class Proposition:
         self.value = None
         self.justification = None
         self.confidence = None
+        self.raw_llm_response = None
     
     def __call__(self, additional_context=None):
         return self.check(additional_context=additional_context)
 
     def check(self, additional_context="No additional context available.", **model_params):
-        context = ""
-
-        for target in self.targets:
-            target_trajectory = target.pretty_current_interactions(max_content_length=None, first_n=self.first_n, last_n=self.last_n)
-
-            if isinstance(target, TinyPerson):
-                context += f"## Agent '{target.name}' Simulation Trajectory\n\n"
-            elif isinstance(target, TinyWorld):
-                context += f"## Environment '{target.name}' Simulation Trajectory\n\n"
-
-            context += target_trajectory + "\n\n"
+        context = self._context()
 
         llm_request = LLMRequest(system_prompt="""
                                     You are a system that evaluates whether a proposition is true or false with respect to a given context. This context
@@ -94,8 +93,174 @@ class Proposition:
         self.raw_llm_response = llm_request.response_raw
 
         return self.value
+
+    def _context(self) -> str:
+        # the trajectories of the targets the claim is about
+        context = ""
+
+        for target in self.targets:
+            target_trajectory = target.pretty_current_interactions(max_content_length=None, first_n=self.first_n, last_n=self.last_n, plain=True)
+
+            if isinstance(target, TinyPerson):
+                context += f"## Agent '{target.name}' Simulation Trajectory\n\n"
+            elif isinstance(target, TinyWorld):
+                context += f"## Environment '{target.name}' Simulation Trajectory\n\n"
+
+            context += target_trajectory + "\n\n"
+
+        return context
+
+    def _context_key(self) -> tuple:
+        # propositions with the same key are evaluated against the same context
+        return (tuple(id(target) for target in self.targets), self.first_n, self.last_n)
         
 
+class PropositionSet:
+    """
+    Several propositions, checked together. Propositions about the same targets (and the same interactions window)
+    share their context, so it is sent once for all of them, and the model evaluates all their claims in a single
+    call. Claims whose result cannot be parsed from that response are checked on their own.
+    """
+
+    SYSTEM_PROMPT = textwrap.dedent("""
+        You are a system that evaluates whether propositions are true or false with respect to a given context. This context
+        always refers to a multi-agent simulation. Each proposition is a claim about the behavior of the agents or the state of
+        their environment in the simulation.
+
+        The context you receive can contain one or more of the following:
+        - the trajectory of a simulation of one or more agents. This means what agents said, did, thought, or perceived at different times.
+        - the state of the environment at a given time.
+
+        You will receive a numbered list of propositions, and you **must** evaluate each of them independently.
+        Your output **must** be a JSON object of the form {"results": [...]}, with exactly one result per proposition, in the same
+        order, each of the form {"value": true or false, "justification": "<REASON HERE>", "confidence": <0.0 to 1.0>}.
+        """).strip()
+
+    def __init__(self, propositions: list):
+        """
+        Define a set of propositions.
+
+        Args:
+            propositions (list): the propositions
+        """
+        self.propositions = propositions
+        self.last_report = None
+
+    def __call__(self, additional_context=None):
+        return self.check_all(additional_context=additional_context)
+
+    def check_all(self, additional_context="No additional context available.", **model_params) -> list:
+        """
+        Check all the propositions, with one model call per distinct context. The value, justification and
+        confidence of each proposition are updated, as with `Proposition.check`.
+
+        Returns:
+            list: the values of the propositions, in order
+        """
+        groups = {}
+        for proposition in self.propositions:
+            groups.setdefault(proposition._context_key(), []).append(proposition)
+
+        report = {"claims": len(self.propositions), "calls": 0, "fallback_calls": 0,
+                  "prompt_tokens": 0, "per_claim_prompt_tokens": 0}
+
+        for propositions in groups.values():
+            context = propositions[0]._context()
+            messages = self._messages([proposition.claim for proposition in propositions], context, additional_context)
+
+            response = openai_utils.client().send_message(messages, response_format=LLMScalarWithJustificationListResponse, **model_params)
+            report["calls"] += 1
+            report["prompt_tokens"] += messages_tokens(messages)
+
+            # what the same claims would have cost with one call each
+            single_claim_tokens = messages_tokens(self._messages([""], context, additional_context))
+            report["per_claim_prompt_tokens"] += sum(single_claim_tokens + count_tokens(proposition.claim) for proposition in propositions)
+
+            results = self._parse(response, len(propositions))
+            for proposition, result in zip(propositions, results):
+                if result is None:
+                    # only the claims that could not be parsed cost a call of their own
+                    proposition.check(additional_context=additional_context, **model_params)
+                    report["fallback_calls"] += 1
+                    report["prompt_tokens"] += single_claim_tokens + count_tokens(proposition.claim)
+                else:
+                    proposition.value, proposition.justification, proposition.confidence = result
+                    proposition.raw_llm_response = response["content"]
+
+        report["calls_per_claim"] = (report["calls"] + report["fallback_calls"]) / report["claims"] if report["claims"] else 0.0
+        report["prompt_tokens_per_claim"] = report["prompt_tokens"] / report["claims"] if report["claims"] else 0.0
+        self.last_report = report
+
+        logger.info(f"Checked {report['claims']} propositions with {report['calls']} batched and {report['fallback_calls']} "
+                    f"single calls ({report['calls_per_claim']:.2f} calls per claim), {report['prompt_tokens']} prompt tokens "
+                    f"({report['prompt_tokens_per_claim']:.0f} per claim, instead of {report['per_claim_prompt_tokens']} with one call per claim).")
+
+        return [proposition.value for proposition in self.propositions]
+
+    def _messages(self, claims: list, context: str, additional_context: str) -> list:
+        numbered_claims = "\n".join(f"{i + 1}. {claim}" for i, claim in enumerate(claims))
+        user_prompt = f"""Evaluate each of the following propositions with respect to the context provided. Is it True or False?
+
+# Propositions
+
+{numbered_claims}
+
+# Context
+
+The context you must consider is the following.
+
+{context}
+
+# Additional Context (if any)
+
+{additional_context}
+"""
+        return [{"role": "system", "content": self.SYSTEM_PROMPT},
+                {"role": "user", "content": user_prompt}]
+
+    @staticmethod
+    def _parse(response, n: int) -> list:
+        # one (value, justification, confidence) per claim, or None where the result is missing or malformed
+        results = [None] * n
+        if response is None or "content" not in response:
+            return results
+
+        try:
+            # a bare JSON array is also accepted
+            parsed = json.loads(response["content"])
+        except (TypeError, ValueError):
+            parsed = utils.extract_json(response["content"])
+        items = parsed.get("results") if isinstance(parsed, dict) else parsed
+        if not isinstance(items, list):
+            logger.warning("The batched proposition check could not be parsed. Checking the propositions one by one.")
+            return results
+
+        for i, item in enumerate(items[:n]):
+            if not isinstance(item, dict):
+                continue
+            value = _as_bool(item.get("value"))
+            if value is None:
+                continue
+            try:
+                confidence = float(item.get("confidence", 0.0))
+            except (TypeError, ValueError):
+                confidence = 0.0
+            results[i] = (value, item.get("justification", "No justification provided (response issues)."), confidence)
+
+        return results
+
+
+def _as_bool(value):
+    # the same readings of a boolean as LLMRequest, or None if there is none
+    if isinstance(value, bool):
+        return value
+
+    match = re.search(r'\b(?:True|False|Yes|No|Positive|Negative)\b', str(value), re.IGNORECASE)
+    if match is None:
+        return None
+    return match.group(0).lower() in ["true", "yes", "positive"]
+
+
 def check_proposition(target, claim:str, additional_context="No additional context available.",
                       first_n:int=None, last_n:int=None):
     """
@@ -4,6 +4,7 @@ from typing import Union, List
 from tinytroupe.extraction import logger
 
 from tinytroupe import openai_utils
+from tinytroupe.llm_dispatcher import request_context, RequestPriority
 import tinytroupe.utils as utils
 class Normalizer:
     """
@@ -37,7 +38,8 @@ class Normalizer:
                                                                      base_module_folder="extraction",
                                                                      rendering_configs=rendering_configs)
         
-        next_message = openai_utils.client().send_message(messages, temperature=0.1)
+        with request_context(priority=RequestPriority.ANALYTICS):
+            next_message = openai_utils.client().send_message(messages, temperature=0.1)
         
         debug_msg = f"Normalization result message: {next_message}"
         logger.debug(debug_msg)
@@ -93,7 +95,8 @@ class Normalizer:
                                                                      base_module_folder="extraction",
                                                                      rendering_configs=rendering_configs)
             
-            next_message = openai_utils.client().send_message(messages, temperature=0.1)
+            with request_context(priority=RequestPriority.ANALYTICS):
+                next_message = openai_utils.client().send_message(messages, temperature=0.1)
             
             debug_msg = f"Normalization result message: {next_message}"
             logger.debug(debug_msg)
@@ -9,6 +9,7 @@ from tinytroupe.agent import TinyPerson
 from tinytroupe.environment import TinyWorld
 
 from tinytroupe import openai_utils
+from tinytroupe.llm_dispatcher import request_context, RequestPriority
 import tinytroupe.utils as utils
 
 
@@ -112,7 +113,7 @@ class ResultsExtractor:
                              rendering_configs)})
 
 
-        interaction_history = tinyperson.pretty_current_interactions(max_content_length=None)
+        interaction_history = tinyperson.pretty_current_interactions(max_content_length=None, plain=True)
 
         extraction_request_prompt = \
 f"""
@@ -133,7 +134,9 @@ performed.
 """
         messages.append({"role": "user", "content": extraction_request_prompt})
 
-        next_message = openai_utils.client().send_message(messages, temperature=0.0, frequency_penalty=0.0, presence_penalty=0.0)
+        # extraction is post-run analytics, so it never holds up the agents
+        with request_context(priority=RequestPriority.ANALYTICS):
+            next_message = openai_utils.client().send_message(messages, temperature=0.0, frequency_penalty=0.0, presence_penalty=0.0)
         
         debug_msg = f"Extraction raw result message: {next_message}"
         logger.debug(debug_msg)
@@ -189,7 +192,7 @@ performed.
                              rendering_configs)})
 
         # TODO: either summarize first or break up into multiple tasks
-        interaction_history = tinyworld.pretty_current_interactions(max_content_length=None)
+        interaction_history = tinyworld.pretty_current_interactions(max_content_length=None, plain=True)
 
         extraction_request_prompt = \
 f"""
@@ -210,7 +213,8 @@ Each interaction history includes stimuli the corresponding agent received as we
 """
         messages.append({"role": "user", "content": extraction_request_prompt})
 
-        next_message = openai_utils.client().send_message(messages, temperature=0.0)
+        with request_context(priority=RequestPriority.ANALYTICS):
+            next_message = openai_utils.client().send_message(messages, temperature=0.0)
         
         debug_msg = f"Extraction raw result message: {next_message}"
         logger.debug(debug_msg)
@@ -5,21 +5,24 @@ import chevron
 from .tiny_factory import TinyFactory
 from tinytroupe.factory import logger
 from tinytroupe import openai_utils
-from tinytroupe.agent import TinyPerson
+from tinytroupe.agent import TinyPerson, SemanticMemory
 import tinytroupe.utils as utils
 from tinytroupe.control import transactional
 
 class TinyPersonFactory(TinyFactory):
 
-    def __init__(self, context_text, simulation_id:str=None):
+    def __init__(self, context_text, simulation_id:str=None, shared_semantic_memory:bool=False):
         """
         Initialize a TinyPersonFactory instance.
 
         Args:
             context_text (str): The context text used to generate the TinyPerson instances.
             simulation_id (str, optional): The ID of the simulation. Defaults to None.
+            shared_semantic_memory (bool, optional): Whether generated agents index their semantic memories in the
+              population-wide shared index, one namespace per agent, instead of each having an index of its own. Defaults to False.
         """
         super().__init__(simulation_id)
+        self.shared_semantic_memory = shared_semantic_memory
         self.person_prompt_template_path = os.path.join(os.path.dirname(__file__), 'prompts/generate_person.mustache')
         self.context_text = context_text
         self.generated_minibios = [] # keep track of the generated persons. We keep the minibio to avoid generating the same person twice.
@@ -151,7 +154,8 @@ class TinyPersonFactory(TinyFactory):
         if agent_spec is not None:
             # the agent is created here. This is why the present method cannot be cached. Instead, an auxiliary method is used
             # for the actual model call, so that it gets cached properly without skipping the agent creation.
-            person = TinyPerson(agent_spec["name"])
+            semantic_memory = SemanticMemory(namespace=agent_spec["name"]) if self.shared_semantic_memory else None
+            person = TinyPerson(agent_spec["name"], semantic_memory=semantic_memory)
             self._setup_agent(person, agent_spec)
             self.generated_minibios.append(person.minibio())
             self.generated_names.append(person.get("name").lower())
@@ -0,0 +1,243 @@
+"""
+Priority-aware dispatch of LLM requests. The agents' turns, the interventions' monitors, the summarization of old
+memories and the post-run analytics all draw on the same rate-limited quota. Every request to a model goes through
+the dispatcher, which hands out the available slots by priority class first, then by deadline, and then fairly
+among sessions, keeping some capacity reserved for the agents' turns, so that they never wait behind background work.
+
+What a request is for is declared by its callers, with `request_context`, rather than passed through every call:
+
+    with request_context(priority=RequestPriority.BACKGROUND):
+        openai_utils.client().send_message(...)
+"""
+
+import time
+import logging
+import itertools
+import threading
+import contextvars
+from contextlib import contextmanager
+from enum import IntEnum
+
+from tinytroupe import utils
+
+logger = logging.getLogger("tinytroupe")
+
+config = utils.read_config_file()
+
+default = {}
+default["max_concurrent_requests"] = int(config["OpenAI"].get("MAX_CONCURRENT_REQUESTS", "2"))
+default["reserved_interactive_requests"] = int(config["OpenAI"].get("RESERVED_INTERACTIVE_REQUESTS", "1"))
+
+
+class RequestPriority(IntEnum):
+    """
+    The priority classes of LLM requests, from the most to the least urgent.
+    """
+    INTERACTIVE = 0 # the agents' turns
+    MONITOR = 1     # the interventions' precondition checks
+    BACKGROUND = 2  # memory summarization and other maintenance
+    ANALYTICS = 3   # post-run extraction, briefings and recaps
+
+
+class DeadlineExceeded(Exception):
+    """
+    Raised when a request cannot be dispatched before its deadline.
+    """
+    pass
+
+
+DEFAULT_SESSION = "default"
+
+_request_context = contextvars.ContextVar("llm_request_context", default={})
+
+
+@contextmanager
+def request_context(priority: RequestPriority = None, session: str = None, deadline: float = None):
+    """
+    Declares what the LLM requests made within the block are for. Only the given values are changed, the others
+    are inherited from the enclosing context. Background threads start from an empty context, so work submitted to
+    them should run in a copy of the submitter's (`contextvars.copy_context().run`).
+
+    Args:
+        priority (RequestPriority): The priority class of the requests.
+        session (str): The session the requests belong to. Sessions of the same priority are served in turn.
+        deadline (float): How long, in seconds from now, the requests may wait for a slot. Requests that do not get
+          one in time fail with `DeadlineExceeded`.
+    """
+    context = dict(_request_context.get())
+    if priority is not None:
+        context["priority"] = RequestPriority(priority)
+    if session is not None:
+        context["session"] = session
+    if deadline is not None:
+        context["deadline"] = time.monotonic() + deadline
+
+    token = _request_context.set(context)
+    try:
+        yield
+    finally:
+        _request_context.reset(token)
+
+
+def current_request_context() -> dict:
+    """
+    Returns the priority, session and (absolute, monotonic) deadline of the requests made now.
+    """
+    context = _request_context.get()
+    return {"priority": context.get("priority", RequestPriority.INTERACTIVE),
+            "session": context.get("session", DEFAULT_SESSION),
+            "deadline": context.get("deadline")}
+
+
+class _Ticket:
+    """
+    A request waiting for a slot.
+    """
+
+    def __init__(self, priority: RequestPriority, session: str, deadline: float, sequence: int) -> None:
+        self.priority = priority
+        self.session = session
+        self.deadline = deadline
+        self.sequence = sequence
+
+
+class LLMDispatcher:
+    """
+    Grants slots to LLM requests. At most `max_concurrent` requests are in flight at once, and all but
+    `reserved_interactive` of them can be taken by non-interactive requests. Requests waiting for a slot are served
+    by priority class, then earliest deadline first, then the session that was served the least, then in order of
+    arrival. Requests in flight are never preempted.
+    """
+
+    def __init__(self, max_concurrent: int = default["max_concurrent_requests"],
+                 reserved_interactive: int = default["reserved_interactive_requests"]) -> None:
+        """
+        Initializes the dispatcher.
+
+        Args:
+            max_concurrent (int): The maximum number of requests in flight at once.
+            reserved_interactive (int): How many of those slots only interactive requests can take.
+        """
+        if max_concurrent < 1:
+            raise ValueError(f"At least one concurrent request is needed, not {max_concurrent}.")
+        if not 0 <= reserved_interactive < max_concurrent:
+            raise ValueError(f"The reserved interactive requests ({reserved_interactive}) must leave at least one "
+                             f"of the {max_concurrent} concurrent requests to the other priorities.")
+
+        self.max_concurrent = max_concurrent
+        self.reserved_interactive = reserved_interactive
+
+        self._condition = threading.Condition()
+        self._waiting = []
+        self._in_flight = 0
+        self._served = {} # session -> number of requests dispatched
+        self._sequence = itertools.count()
+        self._stats = self._empty_stats()
+
+    @contextmanager
+    def slot(self, priority: RequestPriority = None, session: str = None, deadline: float = None):
+        """
+        Holds a slot for the duration of the block. Values not given come from the current `request_context`.
+
+        Args:
+            priority (RequestPriority): The priority class of the request.
+            session (str): The session the request belongs to.
+            deadline (float): The absolute (monotonic) time by which the request must be dispatched.
+        """
+        context = current_request_context()
+        self.acquire(context["priority"] if priority is None else priority,
+                     context["session"] if session is None else session,
+                     context["deadline"] if deadline is None else deadline)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def acquire(self, priority: RequestPriority, session: str = DEFAULT_SESSION, deadline: float = None) -> float:
+        """
+        Waits for a slot.
+
+        Returns:
+            float: How long, in seconds, the request waited.
+
+        Raises:
+            DeadlineExceeded: If the deadline passed before a slot was granted.
+        """
+        priority = RequestPriority(priority)
+        start = time.monotonic()
+
+        with self._condition:
+            # a session joining late starts level with the others, rather than being owed all their past requests
+            self._served.setdefault(session, min(self._served.values(), default=0))
+            ticket = _Ticket(priority, session, deadline, next(self._sequence))
+            self._waiting.append(ticket)
+
+            try:
+                while not self._can_start(ticket):
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        self._stats[priority.name]["expired"] += 1
+                        raise DeadlineExceeded(f"No slot for a {priority.name} request of session '{session}' "
+                                               f"within its deadline ({time.monotonic() - start:.2f}s waited).")
+                    self._condition.wait(remaining)
+            finally:
+                self._waiting.remove(ticket)
+                # whoever is next in line may be able to start now
+                self._condition.notify_all()
+
+            self._in_flight += 1
+            self._served[session] += 1
+
+            waited = time.monotonic() - start
+            stats = self._stats[priority.name]
+            stats["requests"] += 1
+            stats["wait_seconds"] += waited
+            stats["max_wait_seconds"] = max(stats["max_wait_seconds"], waited)
+
+        if waited > 0.5:
+            logger.debug(f"{priority.name} request of session '{session}' waited {waited:.2f}s for a slot.")
+        return waited
+
+    def release(self) -> None:
+        """
+        Frees a slot.
+        """
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    def report(self) -> dict:
+        """
+        Returns, for each priority class, how many requests were dispatched or expired, and how long they waited.
+        """
+        with self._condition:
+            return {name: dict(stats) for name, stats in self._stats.items()}
+
+    def reset(self) -> None:
+        """
+        Resets the statistics and the fair-share accounting.
+        """
+        with self._condition:
+            self._served = {session: 0 for session in self._served}
+            self._stats = self._empty_stats()
+
+    def _can_start(self, ticket: _Ticket) -> bool:
+        limit = self.max_concurrent
+        if ticket.priority != RequestPriority.INTERACTIVE:
+            limit -= self.reserved_interactive
+
+        # a higher priority never waits behind a lower one, so only the first in line is considered
+        return self._in_flight < limit and min(self._waiting, key=self._rank) is ticket
+
+    def _rank(self, ticket: _Ticket) -> tuple:
+        deadline = float("inf") if ticket.deadline is None else ticket.deadline
+        return (ticket.priority, deadline, self._served[ticket.session], ticket.sequence)
+
+    @staticmethod
+    def _empty_stats() -> dict:
+        return {priority.name: {"requests": 0, "expired": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0}
+                for priority in RequestPriority}
+
+
+# Global instance, shared by all the model clients
+dispatcher = LLMDispatcher()
@@ -280,6 +280,7 @@ class NativeGeminiEngine(LLMEngine):
                 except Exception as inner_e:
                     logger.error(f"Failed to extract native JSON via Regex: {inner_e}")
                 
-                return None
+                # the raw text is returned as is, so that the caller can still repair it locally
+                return raw_text or None
                 
         return raw_text
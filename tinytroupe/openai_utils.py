@@ -11,12 +11,13 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from pydantic import BaseModel
-from typing import Union
+from typing import Union, List
 import textwrap  # to dedent strings
 
 import tiktoken
 from tinytroupe import utils
 from tinytroupe.control import transactional
+from tinytroupe.llm_dispatcher import dispatcher, DeadlineExceeded
 
 logger = logging.getLogger("tinytroupe")
 
@@ -40,6 +41,8 @@ default["waiting_time"] = float(config["OpenAI"].get("WAITING_TIME", "1"))
 default["exponential_backoff_factor"] = float(config["OpenAI"].get("EXPONENTIAL_BACKOFF_FACTOR", "5"))
 
 default["embedding_model"] = config["OpenAI"].get("EMBEDDING_MODEL", "text-embedding-3-small")
+default["embedding_batch_size"] = int(config["OpenAI"].get("EMBEDDING_BATCH_SIZE", "64"))
+default["embedding_cache_dir"] = config["OpenAI"].get("EMBEDDING_CACHE_DIR", None)
 
 default["cache_api_calls"] = config["OpenAI"].getboolean("CACHE_API_CALLS", False)
 default["cache_file_name"] = config["OpenAI"].get("CACHE_FILE_NAME", "openai_api_cache.pickle")
@@ -334,6 +337,15 @@ class LLMScalarWithJustificationResponse(BaseModel):
     confidence: float
 
 
+class LLMScalarWithJustificationListResponse(BaseModel):
+    """
+    Several typed responses, in the order they were requested (e.g., the evaluations of several propositions).
+    Attributes:
+        results (list): The responses.
+    """
+    results: List[LLMScalarWithJustificationResponse]
+
+
 ###########################################################################
 # Client class
 ###########################################################################
@@ -483,20 +495,24 @@ class OpenAIClient:
                     # We pass a copy of current_messages so the identity lock injection doesn't mutate the caller's list permanently
                     msgs_copy = [m.copy() for m in current_messages]
                     
-                    response_content = engine.generate_response(
-                        messages=msgs_copy,
-                        temperature=temperature,
-                        response_format=response_format,
-                        agent_name=agent_name
-                    )
+                    # agents' turns, monitors and background work share the quota, by priority
+                    with dispatcher.slot():
+                        response_content = engine.generate_response(
+                            messages=msgs_copy,
+                            temperature=temperature,
+                            response_format=response_format,
+                            agent_name=agent_name
+                        )
                     
-                    if response_format and response_content is not None and not isinstance(response_content, str):
+                    if response_content is None:
+                        # nothing came back (e.g., the output was filtered). Callers handle the missing response,
+                        # since a canned one would be taken for the model's.
+                        logger.warning(f"The model returned no content for {agent_name or 'the request'}.")
+                        return None
+                    elif response_format and not isinstance(response_content, str):
                         response_content_str = response_content.model_dump_json()
-                    elif response_content is None:
-                        # Fallback for structured failure to allow safe loop exit. 
-                        # MUST perfectly match CognitiveActionModel to prevent tiny_person crash.
-                        response_content_str = '{"action": {"type": "DONE", "content": "System fallback due to parse error.", "target": "everyone"}, "cognitive_state": {"goals": "End turn to recover stability.", "attention": "Yielding turn.", "emotions": "Calm", "emotional_intensity": 0.5}}'
                     else:
+                        # structured output that failed validation also ends up here, as raw text to be repaired
                         response_content_str = str(response_content)
                         
                     response_dict = {"role": "assistant", "content": response_content_str}
@@ -513,6 +529,11 @@ class OpenAIClient:
 
                 return utils.sanitize_dict(response_dict)
 
+            except DeadlineExceeded as e:
+                # waiting longer would make the response useless to whoever asked for it
+                logger.warning(f"[{i}] Request dropped, won't retry: {e}")
+                return None
+
             except InvalidRequestError as e:
                 logger.error(f"[{i}] Invalid request error, won't retry: {e}")
 
@@ -636,25 +657,41 @@ class OpenAIClient:
         Returns:
         The embedding of the text.
         """
-        response = self._raw_embedding_model_call(text, model)
+        return self.get_embeddings([text], model=model)[0]
+
+    def get_embeddings(self, texts:list, model=default["embedding_model"]) -> list:
+        """
+        Gets the embeddings of the given texts using the specified model, in a single request.
+
+        Args:
+        texts (list): The texts to embed.
+        model (str): The name of the model to use for embedding the texts.
+
+        Returns:
+        The embeddings of the texts, in the same order.
+        """
+        if not hasattr(self, "client"):
+            self._setup_from_config()
+
+        response = self._raw_embedding_model_call(texts, model)
         return self._raw_embedding_model_response_extractor(response)
     
-    def _raw_embedding_model_call(self, text, model):
+    def _raw_embedding_model_call(self, texts, model):
         """
-        Calls the OpenAI API to get the embedding of the given text. Subclasses should
+        Calls the OpenAI API to get the embeddings of the given texts. Subclasses should
         override this method to implement their own API calls.
         """
         return self.client.embeddings.create(
-            input=[text],
+            input=list(texts),
             model=model
         )
     
     def _raw_embedding_model_response_extractor(self, response):
         """
-        Extracts the embedding from the API response. Subclasses should
+        Extracts the embeddings from the API response. Subclasses should
         override this method to implement their own response extraction.
         """
-        return response.data[0].embedding
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
 
 class AzureClient(OpenAIClient):
 
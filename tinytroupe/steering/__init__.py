@@ -6,5 +6,7 @@ logger = logging.getLogger("tinytroupe")
 ###########################################################################
 from tinytroupe.steering.tiny_story import TinyStory
 from tinytroupe.steering.intervention import Intervention
+from tinytroupe.steering.turn_pipeline import TurnPipeline
+from tinytroupe.steering.precondition_gate import PreconditionGate, RepetitionGate
 
-__all__ = ["TinyStory", "Intervention"]
+__all__ = ["TinyStory", "Intervention", "TurnPipeline", "PreconditionGate", "RepetitionGate"]
@@ -4,6 +4,7 @@ from tinytroupe.utils import JsonSerializableRegistry
 from tinytroupe.experimentation import Proposition
 from tinytroupe.environment import TinyWorld
 from tinytroupe.agent import TinyPerson
+from tinytroupe.llm_dispatcher import request_context, RequestPriority
 import tinytroupe.utils as utils
 
 
@@ -41,6 +42,8 @@ class Intervention:
         self.turns_since_last_check = 0
         self.confidence_threshold = 0.0 # 0.0 means any confidence is fine
         self.monitor_model = None # if None, use default model
+        self.monitor_deadline = None # if None, the check waits as long as needed for the model
+        self.precondition_gate = None # if None, the textual precondition is always checked by the LLM
 
         # name
         if name is None:
@@ -51,6 +54,7 @@ class Intervention:
         # the most recent precondition proposition used to check the precondition
         self._last_text_precondition_proposition = None
         self._last_functional_precondition_check = None
+        self._last_gate_skip_score = None # the gate's score, if it skipped the last check
 
     ################################################################################################
     # Intervention flow
@@ -95,6 +99,15 @@ class Intervention:
         # if we reached here, we are checking. Reset the counter.
         self.turns_since_last_check = 0
 
+        # a cheap local check may rule the textual precondition out without asking the LLM
+        self._last_gate_skip_score = None
+        if self.precondition_gate is not None and self.text_precondition is not None:
+            if not self.precondition_gate.admit(self.targets):
+                self._last_text_precondition_proposition = None
+                self._last_functional_precondition_check = None
+                self._last_gate_skip_score = self.precondition_gate.last_score
+                return False
+
         self._last_text_precondition_proposition = Proposition(self.targets, self.text_precondition, first_n=self.first_n, last_n=self.last_n)
         
         if self.precondition_func is not None:
@@ -107,7 +120,13 @@ class Intervention:
         if self.monitor_model is not None:
             model_params["model"] = self.monitor_model
 
-        llm_precondition_check = self._last_text_precondition_proposition.check(**model_params)
+        # monitoring gives way to the agents' turns, and a check that cannot run in time is skipped (i.e., not met)
+        with request_context(priority=RequestPriority.MONITOR, deadline=self.monitor_deadline):
+            llm_precondition_check = self._last_text_precondition_proposition.check(**model_params)
+
+        # a dropped check (past its deadline, or with an empty response) has no verdict to measure the gate against
+        if self.precondition_gate is not None and self._last_text_precondition_proposition.raw_llm_response:
+            self.precondition_gate.record_verdict(llm_precondition_check)
 
         # check confidence threshold
         confidence_high_enough = True
@@ -190,6 +209,26 @@ class Intervention:
         """
         self.monitor_model = monitor_model
         return self # for chaining
+
+    def set_precondition_gate(self, precondition_gate):
+        """
+        Set a local gate that decides whether the textual precondition is worth checking with the LLM.
+
+        Args:
+            precondition_gate (PreconditionGate): the gate, or None to always check with the LLM
+        """
+        self.precondition_gate = precondition_gate
+        return self # for chaining
+
+    def set_monitor_deadline(self, monitor_deadline):
+        """
+        Set how long the precondition check may wait for the model before it is skipped.
+
+        Args:
+            monitor_deadline (float): the maximum wait, in seconds, or None to wait as long as needed
+        """
+        self.monitor_deadline = monitor_deadline
+        return self # for chaining
     
     ################################################################################################
     # Inspection
@@ -205,6 +244,10 @@ class Intervention:
         if self._last_text_precondition_proposition is not None:
             justification += f"{self._last_text_precondition_proposition.justification} (confidence = {self._last_text_precondition_proposition.confidence})\n\n"
         
+        # the local gate ruled the precondition out
+        elif self._last_gate_skip_score is not None:
+            justification += f"The local precondition gate ruled the precondition out (score = {self._last_gate_skip_score:.3f}), so it was not checked by the LLM.\n\n"
+
         # functional precondition justification
         elif self._last_functional_precondition_check == True:
             justification += f"Functional precondition was met.\n\n"
@@ -0,0 +1,160 @@
+"""
+Cheap local gates in front of the LLM checks of interventions' textual preconditions. A gate scores the targets'
+recent behavior locally, and the LLM is only asked when the score does not clearly rule the precondition out. To
+keep an eye on what the gate costs in accuracy, some of the skipped checks can still be sent to the LLM (audits),
+and the gate keeps track of its skip rate and of how often it agrees with the LLM's verdicts.
+"""
+
+from tinytroupe.steering import logger
+from tinytroupe.agent.minhash import MinHasher
+
+
+class PreconditionGate:
+    """
+    Decides whether an intervention's LLM precondition check is worth making. Subclasses implement `score`, which
+    rates how likely the precondition is to hold, and the check is skipped when the score is below `threshold`.
+    """
+
+    def __init__(self, threshold: float, audit_every: int = 0) -> None:
+        """
+        Initializes the gate.
+
+        Args:
+            threshold (float): The score below which the LLM check is skipped.
+            audit_every (int): Every how many skips the LLM is asked anyway, to measure the gate's agreement with
+              it. 0 means no audits.
+        """
+        self.threshold = threshold
+        self.audit_every = audit_every
+
+        self.last_score = None
+        self._auditing = False
+        self._stats = self._empty_stats()
+
+    def score(self, targets) -> float:
+        """
+        Scores the targets' recent behavior. Returns None if there is not enough to go on, in which case the LLM
+        check is made.
+        """
+        raise NotImplementedError("Subclasses must implement this method.")
+
+    def admit(self, targets) -> bool:
+        """
+        Returns whether the LLM check should be made.
+        """
+        self.last_score = self.score(targets)
+        self._stats["checks"] += 1
+        self._auditing = False
+
+        if self.last_score is None or self.last_score >= self.threshold:
+            return True
+
+        self._stats["skipped"] += 1
+        if self.audit_every > 0 and self._stats["skipped"] % self.audit_every == 0:
+            # the LLM still decides, so the skip is only counted to measure the gate
+            self._auditing = True
+            self._stats["audited"] += 1
+            return True
+
+        logger.info(f"{self.__class__.__name__}: score {self.last_score:.3f} below {self.threshold}, LLM check skipped "
+                    f"({self._summary()}).")
+        return False
+
+    def record_verdict(self, verdict: bool) -> None:
+        """
+        Records the LLM's verdict on the last check the gate admitted, to measure their agreement.
+        """
+        if self.last_score is None:
+            return
+
+        predicted = self.last_score >= self.threshold
+        self._stats["judged"] += 1
+        if predicted == bool(verdict):
+            self._stats["agreements"] += 1
+        elif self._auditing:
+            self._stats["false_skips"] += 1
+
+        logger.info(f"{self.__class__.__name__}: score {self.last_score:.3f}, LLM verdict {bool(verdict)}"
+                    f"{' (audit)' if self._auditing else ''} ({self._summary()}).")
+
+    def report(self) -> dict:
+        """
+        Returns the numbers of checks, skips, audits and LLM verdicts, with the skip rate and the agreement rate.
+        """
+        report = dict(self._stats)
+        report["skip_rate"] = report["skipped"] / report["checks"] if report["checks"] else 0.0
+        report["agreement_rate"] = report["agreements"] / report["judged"] if report["judged"] else None
+        return report
+
+    def _summary(self) -> str:
+        report = self.report()
+        agreement = "n/a" if report["agreement_rate"] is None else f"{report['agreement_rate']:.0%}"
+        return f"skip rate {report['skip_rate']:.0%} of {report['checks']} checks, agreement with the LLM {agreement} of {report['judged']}"
+
+    @staticmethod
+    def _empty_stats() -> dict:
+        return {"checks": 0, "skipped": 0, "audited": 0, "judged": 0, "agreements": 0, "false_skips": 0}
+
+
+class RepetitionGate(PreconditionGate):
+    """
+    Gates stalemate-like preconditions on how much the agents repeat themselves and each other. Each of the latest
+    TALK actions of each agent is compared with the other TALK actions in a recent window (MinHash estimates of
+    the Jaccard similarity of word shingles), and the score is the mean of the best matches. Fresh arguments score
+    near 0, restated positions much higher.
+    """
+
+    def __init__(self, threshold: float = 0.1, recent_actions: int = 2, window: int = 8, audit_every: int = 0,
+                 hasher: MinHasher = None) -> None:
+        """
+        Initializes the gate.
+
+        Args:
+            threshold (float): The repetition score below which the LLM check is skipped.
+            recent_actions (int): How many of each agent's latest TALK actions are scored.
+            window (int): How many of each agent's latest TALK actions they are compared with.
+            audit_every (int): Every how many skips the LLM is asked anyway.
+            hasher (MinHasher): The hasher to use. A new one by default.
+        """
+        super().__init__(threshold, audit_every)
+        self.recent_actions = recent_actions
+        self.window = window
+        self.hasher = hasher if hasher is not None else MinHasher()
+
+    def score(self, targets) -> float:
+        talks = {agent.name: _recent_talks(agent, self.window) for agent in _agents_of(targets)}
+        pool = [(name, i, self.hasher.signature(text)) for name, texts in talks.items() for i, text in enumerate(texts)]
+
+        best_matches = []
+        for name, texts in talks.items():
+            for i in range(max(len(texts) - self.recent_actions, 0), len(texts)):
+                signature = self.hasher.signature(texts[i])
+                others = [other for other_name, j, other in pool if (other_name, j) != (name, i)]
+                if others:
+                    best_matches.append(max(self.hasher.similarity(signature, other) for other in others))
+
+        return sum(best_matches) / len(best_matches) if best_matches else None
+
+
+def _agents_of(targets) -> list:
+    # interventions target agents, environments, or lists of either
+    agents = []
+    for target in targets if isinstance(targets, list) else [targets]:
+        agents.extend(target.agents if hasattr(target, "agents") else [target])
+    return agents
+
+
+def _recent_talks(agent, n: int) -> list:
+    # the contents of the agent's last n TALK actions, oldest first
+    talks = []
+    memory = agent.episodic_memory.memory
+    for index in range(len(memory) - 1, -1, -1):
+        episode = memory[index]
+        content = episode.get("content")
+        action = content.get("action") if isinstance(content, dict) else None
+        if episode.get("type") == "action" and isinstance(action, dict) and action.get("type") == "TALK" and action.get("content"):
+            talks.append(str(action["content"]))
+            if len(talks) >= n:
+                break
+
+    return list(reversed(talks))
@@ -0,0 +1,133 @@
+"""
+Pipelined execution of the agents' turns. When agents act one after the other, whatever has to be computed before
+an agent's LLM call (e.g., rendering its prompt for the turn) does not depend on the agent that is currently acting,
+so it can run in the background while that agent's call is in flight. Preparations only compute: changing an agent, or
+anything else that goes through a simulation transaction, is left to the action, in the caller's thread, so that the
+simulation's cache and execution trace are only ever touched by one thread, in the same order on every run.
+"""
+
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from tinytroupe.steering import logger
+
+
+class TurnPipeline:
+    """
+    Runs the agents' turns sequentially, while preparing the next agent's turn in the background.
+    """
+
+    def __init__(self, min_interval: float = 0.0) -> None:
+        """
+        Initializes the pipeline.
+
+        Args:
+            min_interval (float): The minimum time, in seconds, between the starts of two consecutive actions, to
+              pace the requests to the model.
+        """
+        self.min_interval = min_interval
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="turn_pipeline")
+        self._prepared = {} # agent name -> future of the preparation
+        self._last_start = None
+        self.timings = []
+
+    def run(self, agents: list, prepare: Callable, action: Callable) -> list:
+        """
+        Makes the agents act in order. Each agent's turn is prepared as `prepare(agent)` in a background thread,
+        while the previous agent acts, and then run as `action(agent, prepared)` with the result of the preparation.
+        Preparations must not change any agent nor call transactional methods; whatever they compute is applied
+        by the action.
+
+        Returns:
+            list: The results of the actions.
+        """
+        self.timings = []
+        results = []
+
+        try:
+            if agents:
+                self.submit(agents[0], prepare)
+
+            for i, agent in enumerate(agents):
+                if i + 1 < len(agents):
+                    self.submit(agents[i + 1], prepare)
+                results.append(self.act(agent, prepare, action))
+        finally:
+            # a failed run must not leave stale preparations behind for the next one
+            for future in self._prepared.values():
+                future.cancel()
+            self._prepared = {}
+
+        return results
+
+    def submit(self, agent, prepare: Callable) -> None:
+        """
+        Starts preparing the turn of an agent in the background.
+        """
+        if agent.name not in self._prepared:
+            # the preparation runs in the caller's context (e.g., the priority and session of its LLM requests)
+            self._prepared[agent.name] = self._executor.submit(contextvars.copy_context().run,
+                                                               self._timed_prepare, agent, prepare)
+
+    def act(self, agent, prepare: Callable, action: Callable) -> Any:
+        """
+        Waits for the preparation of the agent's turn (preparing it now if it was not submitted), paces the
+        request, and runs the agent's action.
+        """
+        self.submit(agent, prepare)
+        future = self._prepared.pop(agent.name)
+
+        start = time.monotonic()
+        prepared, prepare_seconds = future.result()
+        waited = time.monotonic() - start
+
+        paced = 0.0
+        if self._last_start is not None and self.min_interval > 0:
+            paced = max(0.0, self._last_start + self.min_interval - time.monotonic())
+            time.sleep(paced)
+
+        self._last_start = time.monotonic()
+        result = action(agent, prepared)
+
+        self.timings.append({"agent": agent.name,
+                             "prepare_seconds": prepare_seconds,
+                             "wait_seconds": waited,
+                             "pacing_seconds": paced,
+                             "act_seconds": time.monotonic() - self._last_start})
+        return result
+
+    def report(self) -> dict:
+        """
+        Returns the timings of the last run: the critical path (what the agents' turns actually took), what the
+        same turns would have taken in a sequential loop (each turn prepared right before its action, with the
+        pacing overlapping the preparation), and how much of the preparation was hidden behind the previous
+        agent's action.
+        """
+        critical = sum(t["wait_seconds"] + t["pacing_seconds"] + t["act_seconds"] for t in self.timings)
+        # whatever the pacing required after the previous action, the preparation could have taken up first
+        sequential = sum(max(t["prepare_seconds"], t["wait_seconds"] + t["pacing_seconds"]) + t["act_seconds"]
+                         for t in self.timings)
+        prepared = sum(t["prepare_seconds"] for t in self.timings)
+        waited = sum(t["wait_seconds"] for t in self.timings)
+        return {"agents": len(self.timings),
+                "critical_path_seconds": critical,
+                "sequential_seconds": sequential,
+                "saved_seconds": max(0.0, sequential - critical),
+                "prepare_seconds": prepared,
+                "overlapped_seconds": max(0.0, prepared - waited)}
+
+    def close(self) -> None:
+        """
+        Stops the background preparation.
+        """
+        self._executor.shutdown(wait=True)
+
+    def _timed_prepare(self, agent, prepare: Callable) -> tuple:
+        # failures are raised in the main thread, when the agent is about to act
+        start = time.monotonic()
+        prepared = prepare(agent)
+        logger.debug(f"Prepared the turn of {agent.name} in the background.")
+        return prepared, time.monotonic() - start
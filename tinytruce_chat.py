@@ -18,7 +18,7 @@ from rich.prompt import Prompt
 
 # Reuse core logic from tinytruce_sim
 import tinytruce_sim as sim
-from tinytroupe.agent import TinyPerson, SituationRoomFaculty
+from tinytroupe.agent import TinyPerson, SituationRoomFaculty, FilesAndWebGroundingFaculty
 from tinytroupe.environment import TinyWorld
 
 # Configure logs
@@ -38,6 +38,8 @@ class TinyTruceInterrogator:
         self.scenario_data = None
         self.session_dir = Path(f"DOCUMENTS/runs/{self.session_id}")
         self.session_dir.mkdir(parents=True, exist_ok=True)
+        self.context_manager = sim.ContextWindowManager(
+            background=True, summarizer=sim.MemorySummarizer(cache_path=str(self.session_dir / sim.MEMORY_SUMMARIES_FILE)))
         
         # UI Tuning
         TinyPerson.MAX_ACTIONS_BEFORE_DONE = 2
@@ -48,6 +50,7 @@ class TinyTruceInterrogator:
         
         # 0. Load Scenario if provided
         scenario_grounding = ""
+        grounding_files = []
         context_stimulus = ""
         if self.scenario_file:
             if not self.scenario_file.endswith(".json"):
@@ -64,6 +67,7 @@ class TinyTruceInterrogator:
                     if os.path.exists(p):
                         with open(p, "r", encoding="utf-8") as gf:
                             scenario_grounding += f"\n### SCENARIO DATA: {Path(p).name} ###\n{gf.read()}\n"
+                        grounding_files.append(p)
                 
                 # Context
                 context_stimulus = (
@@ -81,14 +85,18 @@ class TinyTruceInterrogator:
         daily_intel_path = "data/facts/daily-intelligence.2026.txt"
         
         global_grounding = ""
+        core_grounding_files = []
         if os.path.exists(world_facts_path):
             with open(world_facts_path, "r", encoding="utf-8") as f:
                 global_grounding = f.read()
+            core_grounding_files.append(world_facts_path)
         
         if os.path.exists(daily_intel_path):
             with open(daily_intel_path, "r", encoding="utf-8") as f:
                 daily_intel = f.read()
                 global_grounding = f"### [CORE SHARED WORLD STATE (2026)] ###\n{global_grounding}\n\n{daily_intel}"
+            core_grounding_files.append(daily_intel_path)
+        grounding_files = core_grounding_files + grounding_files
         
         global_grounding += scenario_grounding
         
@@ -108,6 +116,8 @@ class TinyTruceInterrogator:
         actual_name = agent_data["persona"].get("full_name", agent_data["persona"]["name"])
         
         self.agent = TinyPerson.load_specification(agent_path, new_agent_name=actual_name)
+        self.agent.episodic_memory.dedup_threshold = sim.NEAR_DUPLICATE_THRESHOLD
+        self.agent.episodic_memory.spill_dir = str(self.session_dir / sim.SPILL_DIR)
         self.agent._fragment_redlines = []
         
         # Load Fragments
@@ -116,6 +126,10 @@ class TinyTruceInterrogator:
         # [TINYTRUCE] Active Intelligence Faculty
         self.situation_room = SituationRoomFaculty()
         self.agent.add_mental_faculty(self.situation_room)
+
+        # World and scenario documents are searched for when needed, rather than carried whole in memory
+        self.agent.add_mental_faculty(FilesAndWebGroundingFaculty(
+            folders_paths=[sim.GROUNDING_FOLDER], index_path=str(self.session_dir / sim.GROUNDING_INDEX_FILE)))
         
         # Agent Grounding
         grounding = sim.extract_agent_grounding(self.agent.name)
@@ -123,7 +137,8 @@ class TinyTruceInterrogator:
             layer0_bundle += f"### {self.agent.name} FORENSIC PROFILE ###\n{grounding}\n\n"
             self.agent.think(f"### LAYER 0: GROUNDING ###\n{grounding}")
         
-        self.agent.think(f"### GLOBAL INTELLIGENCE (2026) ###\n{global_grounding}")
+        if grounding_files:
+            self.agent.think(sim.grounding_briefing("GLOBAL INTELLIGENCE (2026)", grounding_files))
         
         if context_stimulus:
             self.agent.think(f"### SCENARIO CONTEXT ###\n{context_stimulus}")
@@ -139,6 +154,9 @@ class TinyTruceInterrogator:
              "5. Do not guess on current theater status if the Situation Room is available.\n"
              "6. Keep your turn to 1-4 actions if queries are needed. Always end with 'DONE'.")
         
+        # Grounding and protocol must survive context window compaction
+        self.agent.episodic_memory.pin()
+        
         # 4. Mandatory Cache Setup
         if self.use_cache:
             self.cache_manager = sim.GeopoliticalCacheManager(layer0_bundle, session_id=self.session_id)
@@ -171,7 +189,7 @@ class TinyTruceInterrogator:
                     redline_prompt = "### [BANNED BEHAVIORS: FRAGMENT REDLINES] ###\n"
                     redline_prompt += "\n".join([f"- [CONSTRAIN]: {rl}" for rl in new_redlines])
                     redline_prompt += "\n\nCRITICAL: These are hard constraints. Violating these results in immediate tactical failure."
-                    self.agent.think(redline_prompt)
+                    self.agent.set_directive(f"redlines:{f_name}", redline_prompt)
                     
                 console.print(f"[bold green]Fragment loaded: {f_name}[/bold green]")
             else:
@@ -226,8 +244,8 @@ class TinyTruceInterrogator:
             with Live(console=console, refresh_per_second=4) as live:
                 live.update(f"[cyan]{self.agent.name} is formulating response...[/cyan]")
                 
-                # Prune memory to keep context clean
-                sim.compress_agent_memory([self.agent], window_size=8, prune_count=4)
+                # Summarize old exchanges only if the prompt exceeds the token budget
+                sim.compress_agent_memory([self.agent], context_manager=self.context_manager)
                 
                 # Respond
                 action_items = self.agent.act(return_actions=True)
@@ -246,7 +264,7 @@ class TinyTruceInterrogator:
                                 mood = cog_state.get('emotions', 'NEUTRAL')
                                 intensity = float(cog_state.get('emotional_intensity', 0.5))
                                 
-                                mood_bar = sim.draw_mood_bar(self.agent.name, mood, intensity)
+                                mood_bar = sim.draw_mood_bar(self.agent.name, mood, intensity, trend=self.agent.emotional_trajectory().trend_label())
                                 console.print(f"\n{mood_bar}")
                                 console.print(Panel(content, title=f"{self.agent.name}", border_style="green"))
                             
@@ -274,6 +292,7 @@ class TinyTruceInterrogator:
             console.print(f"[red]Unknown command: {cmd}[/red]")
 
     def cleanup(self):
+        self.context_manager.close()
         if self.cache_manager:
             self.cache_manager.delete_cache()
         console.print("[bold cyan]Interrogation session ended.[/bold cyan]")
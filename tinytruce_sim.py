@@ -31,19 +31,40 @@ if os.getenv("GOOGLE_API_KEY"):
 import random
 import datetime
 from google.genai import types
-from tinytroupe.agent import TinyPerson
+from tinytroupe.agent import TinyPerson, ContextWindowManager, FilesAndWebGroundingFaculty
+from tinytroupe.agent.context_window import MemorySummarizer
 from tinytroupe.environment import TinyWorld
 from tinytroupe.asset_manager import AssetManager
 from tinytroupe.extraction import ResultsExtractor
 from tinytroupe.steering.intervention import Intervention
+from tinytroupe.steering.turn_pipeline import TurnPipeline
+from tinytroupe.steering.precondition_gate import RepetitionGate
 import tinytroupe.openai_utils as openai_utils
+import tinytroupe.control as control
+from tinytroupe.control import transactional
 from google import genai
 from tinytroupe.cost_manager import cost_manager
+from tinytroupe.llm_dispatcher import dispatcher, request_context, RequestPriority
 
 
 # Global for context caching
 CURRENT_CACHE = None
 
+# Per-session files used for resuming interrupted runs
+SIMULATION_CACHE_FILE = "simulation.cache.json"
+RUN_CONFIG_FILE = "run_config.json"
+MEMORY_SUMMARIES_FILE = "memory_summaries.jsonl"
+GROUNDING_INDEX_FILE = "grounding_index.json"
+
+# the session subdirectory where agents' older episodes are spilled to, unless another one is given
+SPILL_DIR = "spill"
+
+# the documents the agents can search (SEARCH_DOCUMENTS), instead of carrying them whole in memory
+GROUNDING_FOLDER = "data"
+
+# Estimated similarity above which a stimulus is collapsed with a recent near-identical one
+NEAR_DUPLICATE_THRESHOLD = 0.8
+
 # Configure logging
 logging.basicConfig(level=logging.INFO) 
 logger = logging.getLogger("tinytruce")
@@ -62,9 +83,10 @@ The agents have reached a stalemate. This means:
 3. Neither side is showing signs of backing down or finding common ground.
 """
 
-def cleanup_old_sessions(ttl_hours=24):
+def cleanup_old_sessions(ttl_hours=24, keep=None):
     """
     Automated Housekeeping: Deletes session directories in DOCUMENTS/runs older than ttl_hours.
+    The session named by `keep` (e.g., one being resumed) is never deleted.
     """
     runs_dir = Path("DOCUMENTS/runs")
     if not runs_dir.exists():
@@ -73,7 +95,7 @@ def cleanup_old_sessions(ttl_hours=24):
     now = datetime.datetime.now()
     count = 0
     for session_path in runs_dir.iterdir():
-        if session_path.is_dir():
+        if session_path.is_dir() and session_path.name != keep:
             # Check modification time of the directory
             mtime = datetime.datetime.fromtimestamp(session_path.stat().st_mtime)
             age = now - mtime
@@ -302,82 +324,45 @@ def extract_agent_grounding(agent_name, atlas_path="personas/agents/Forensic_Int
     logger.warning(f"Could not find forensic grounding section for '{agent_name}' in Atlas.")
     return None
 
-def compress_agent_memory(participants, window_size=12, prune_count=6):
+def compress_agent_memory(participants, window_size=None, prune_count=None, context_manager=None):
     """
-    Stabilizes context window by summarizing old conversational turns and archiving to anchors.
-    Ensures the system message is protected.
+    Stabilizes context windows by summarizing old episodes into anchors and evicting them, only when an agent's
+    prompt exceeds its token budget. Pinned episodes (Layer 0 grounding) and the system message are protected.
+
+    If `window_size` and `prune_count` are given, the fixed-count policy is used instead: whenever an agent has
+    more than `window_size` episodes, its oldest `prune_count` unpinned episodes are archived.
+
+    Returns:
+        list: The context window reports of the agents (empty for the fixed-count policy).
     """
-    print(f"\n[SYSTEM]: Elastic Context Check. Archiving memory buffer for stability...")
-    
+    if context_manager is None:
+        context_manager = ContextWindowManager()
+
+    reports = []
     for agent in participants:
-        # Check episodic memory length
-        # EpisodicMemory stores actions/stimuli as turns.
-        memory_size = agent.episodic_memory.count()
-        
-        if memory_size > window_size:
-            # Shielding: We prune from the beginning of memory up to prune_count.
-            # In TinyTroupe, the system message is NOT in episodic_memory.
-            # So pruning index 0 is safe as it's just the first interaction.
-            
-            to_summarize = agent.episodic_memory.memory[:prune_count]
-            
-            # Format turns for the summarizer
-            formatted_turns = ""
-            for msg in to_summarize:
-                role = msg.get('role', 'unknown')
-                content = msg.get('content', '')
-                # Handle dict content (Eco-Mode JSON)
-                if isinstance(content, dict):
-                    content = json.dumps(content)
-                formatted_turns += f"{role.upper()}: {content}\n---\n"
-            
-            summary_prompt = (
-                f"Summarize the following interaction turns into 1-2 bullet points. "
-                f"Focus on the core strategic pivot and current status of resolved points. "
-                f"Be concise and clinical.\n\n{formatted_turns}"
-            )
-            
-            try:
-                # Use a direct engine call to avoid polluting the agent's current thought process
-                response = openai_utils.client().send_message([
-                    {"role": "system", "content": "You are a memory compressor for high-stakes simulations. Condense history into architectural bullet points."},
-                    {"role": "user", "content": summary_prompt}
-                ])
-                
-                new_summary = response['content'].strip()
-                
-                # Append to agent's persistent anchors
-                if not hasattr(agent, '_episodic_anchors'):
-                    agent._episodic_anchors = []
-                
-                agent._episodic_anchors.append(new_summary)
-                
-                # Summary of Summaries: Condense if anchors > 3 entries
-                if len(agent._episodic_anchors) > 3:
-                    print(f"[{agent.name}]: Condensing historical anchors (Summary of Summaries)...")
-                    meta_prompt = "Condense the following historical anchors into exactly two comprehensive bullet points:\n\n" + "\n".join(agent._episodic_anchors)
-                    
-                    meta_response = openai_utils.client().send_message([
-                        {"role": "system", "content": "Condense historical anchors into exactly two high-level bullet points."},
-                        {"role": "user", "content": meta_prompt}
-                    ])
-                    agent._episodic_anchors = [meta_response['content'].strip()]
-                
-                # Prune the episodic memory
-                agent.episodic_memory.delete_episodes(0, prune_count)
-                
-                # Rebuild current_messages to reflect the purged history
-                agent.reset_prompt()
-                logger.info(f"[{agent.name}]: Context window archived. Memory pruned by {prune_count} turns.")
-                
-            except Exception as e:
-                logger.warning(f"Failed to compress memory for {agent.name}: {e}")
+        memory = agent.episodic_memory
+        if window_size is None:
+            reports.append(context_manager.manage(agent))
+        elif memory.count() > window_size:
+            start = min(memory.pinned_length, memory.count())
+            context_manager.compact(agent, start, min(start + prune_count, memory.count()))
+
+    return reports
+
+def format_context_report(participants):
+    """
+    Formats the size, in tokens, of the last prompt each agent sent.
+    """
+    sizes = [f"{agent.name} {agent._last_prompt_tokens:,}" for agent in participants if agent._last_prompt_tokens is not None]
+    return "[CONTEXT]: Prompt tokens this turn: " + " | ".join(sizes) if sizes else ""
 
 # Note: Context Caching monkeypatch removed due to incompatibility with OpenAI-to-Gemini adapter.
 # Caching is still performed at the SDK level for specialized tools, but disabled for standard TinyTroupe calls.
 
-def draw_mood_bar(agent_name, emotion, intensity):
-    """Draws a simple ASCII mood bar for the console."""
+TREND_ARROWS = {"rising": "↑", "falling": "↓", "stable": "→"}
+
+def draw_mood_bar(agent_name, emotion, intensity, trend=None):
+    """Draws a simple ASCII mood bar for the console, optionally with the trend of the emotional trajectory."""
     bar_length = 10
     filled_length = int(bar_length * intensity)
     bar = "█" * filled_length + "░" * (bar_length - filled_length)
@@ -388,7 +373,8 @@ def draw_mood_bar(agent_name, emotion, intensity):
     elif intensity >= 0.7: label = "TENSE"
     elif intensity >= 0.4: label = "STEADY"
     
-    return f"[{agent_name:<15}] {label:<10} [{bar}] {intensity:.1f}"
+    arrow = f" {TREND_ARROWS[trend]}" if trend in TREND_ARROWS else ""
+    return f"[{agent_name:<15}] {label:<10} [{bar}] {intensity:.1f}{arrow}"
 
 def get_verbosity_constraint(verbosity_mode, current_turn, total_turns=15):
     """Returns a specific constraint string based on the verbosity mode and simulation turn."""
@@ -416,9 +402,36 @@ def get_verbosity_constraint(verbosity_mode, current_turn, total_turns=15):
     
     return "Constraint: Output maximum 150 words. Do not acknowledge this word limit."
 
-def run_tinytruce_simulation(scenario_key, turns, agent_names=None, fragment_names=None, roast_level="spicy", hide_thoughts=False, monologue=False, disable_injects=False, eco_mode=False, verbosity="lean", session_id=None):
+def grounding_briefing(title, paths):
+    """
+    Briefs agents on grounding documents with their headings only: the documents themselves are retrieved from
+    the grounding index, passage by passage, when the agents need them.
+    """
+    lines = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            heading = next((line.strip() for line in f if line.strip()), "")
+        lines.append(f"- {os.path.basename(path)}: {heading[:160]}")
+
+    return (f"### {title} ###\n" + "\n".join(lines) + "\n\n"
+            "These documents are in my files. I SEARCH_DOCUMENTS for the specific facts, figures and positions I need.")
+
+def save_run_config(session_dir, config):
+    """Persists the arguments of a run, so that it can later be resumed with the exact same setup."""
+    with open(Path(session_dir) / RUN_CONFIG_FILE, "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=4)
+
+def load_run_config(session_id):
+    """Loads the arguments of a previous run, for resuming it."""
+    config_path = Path(f"DOCUMENTS/runs/{session_id}") / RUN_CONFIG_FILE
+    if not config_path.exists():
+        raise FileNotFoundError(f"Session '{session_id}' cannot be resumed: {config_path} not found.")
+    with open(config_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def run_tinytruce_simulation(scenario_key, turns, agent_names=None, fragment_names=None, roast_level="spicy", hide_thoughts=False, monologue=False, disable_injects=False, eco_mode=False, verbosity="lean", session_id=None, resume=False, seed=None, spill_dir=None):
     # Perform Housekeeping first
-    cleanup_old_sessions(ttl_hours=24)
+    cleanup_old_sessions(ttl_hours=24, keep=session_id)
     
     # [TINYTRUCE] Strict Turn Control: Ensure agents don't loop endlessly.
     TinyPerson.MAX_ACTIONS_BEFORE_DONE = 2
@@ -429,6 +442,10 @@ def run_tinytruce_simulation(scenario_key, turns, agent_names=None, fragment_nam
     
     session_dir = Path(f"DOCUMENTS/runs/{session_id}")
     session_dir.mkdir(parents=True, exist_ok=True)
+
+    # Older episodes are spilled to memory-mapped files, keeping the resident size of long runs flat
+    if spill_dir is None:
+        spill_dir = str(session_dir / SPILL_DIR)
     
     # Configure logging to also save to the session directory
     log_file = session_dir / "tinytruce_simulation.log"
@@ -442,9 +459,29 @@ def run_tinytruce_simulation(scenario_key, turns, agent_names=None, fragment_nam
     logger.info(f"Initialized Session: {session_id}")
     logger.info(f"Output Directory: {session_dir}")
 
+    # [TINYTRUCE] Resumable Runs: every LLM-backed step goes through the transactional simulation cache,
+    # so that a crashed run can be resumed, fast-forwarding through whatever was already computed.
+    # Randomness is seeded per turn from the session, so injects and quips replay identically.
+    if seed is None:
+        seed = session_id
+    
+    cache_path = session_dir / SIMULATION_CACHE_FILE
+    if resume:
+        if not cache_path.exists():
+            print(f"Error: Session '{session_id}' has no simulation cache to resume from.")
+            return
+        logger.info(f"Resuming session {session_id} from {cache_path}")
+    elif cache_path.exists():
+        # a fresh run must not silently replay an older one
+        cache_path.unlink()
+    
+    control.reset()
+    control.begin(cache_path=str(cache_path), fast_forward=True)
+
     print(f"DEBUG: agent_names={agent_names}, fragment_names={fragment_names}, session_id={session_id}")
     if scenario_key not in SCENARIOS:
         print(f"Error: Scenario '{scenario_key}' not found.")
+        control.end()
         return
 
     scenario = SCENARIOS[scenario_key]
@@ -455,6 +492,7 @@ def run_tinytruce_simulation(scenario_key, turns, agent_names=None, fragment_nam
     
     # Initialize/Reset cost tracking for the new simulation run
     cost_manager.reset()
+    dispatcher.reset()
     
     # Configure Gemini SDK
         # Configuration is now handled via genai.Client() in GeopoliticalCacheManager
@@ -464,6 +502,7 @@ def run_tinytruce_simulation(scenario_key, turns, agent_names=None, fragment_nam
     dynamic_grounding = ""
     grounding_payload = scenario.get("grounding_payload", [])
     
+    global_grounding_files = []
     if grounding_payload:
         loaded_files = []
         for gf in grounding_payload:
@@ -472,6 +511,7 @@ def run_tinytruce_simulation(scenario_key, turns, agent_names=None, fragment_nam
                     dynamic_grounding += f.read() + "\n"
                 loaded_files.append(gf)
         if loaded_files:
+            global_grounding_files = loaded_files
             logger.info(f"Loaded Dynamic Grounding: {loaded_files}")
         else:
             logger.warning("grounding_payload specified but no files found. Using fallback.")
@@ -486,6 +526,7 @@ def run_tinytruce_simulation(scenario_key, turns, agent_names=None, fragment_nam
         if os.path.exists(world_facts_path):
             with open(world_facts_path, "r", encoding="utf-8") as f:
                 global_grounding = f.read()
+            global_grounding_files.append(world_facts_path)
             logger.info(f"Loaded Global Grounding (Core): {world_facts_path}")
             
         # [TINYTRUCE] Chronical Integration: Load Daily Intelligence Briefing
@@ -493,6 +534,7 @@ def run_tinytruce_simulation(scenario_key, turns, agent_names=None, fragment_nam
             with open(daily_intel_path, "r", encoding="utf-8") as f:
                 daily_intel = f.read()
                 global_grounding = f"### [CORE WORLD GROUNDING] ###\n{global_grounding}\n\n{daily_intel}"
+            global_grounding_files.append(daily_intel_path)
             logger.info(f"Loaded Geopolitical Chronicler Update: {daily_intel_path}")
     else:
         # If we have dynamic grounding, we treat it as the "Global Grounding" for this sim
@@ -500,13 +542,20 @@ def run_tinytruce_simulation(scenario_key, turns, agent_names=None, fragment_nam
 
     # Load Scenario-Specific Intelligence (Legacy/Supplemental)
     scenario_grounding = ""
+    scenario_grounding_files = []
     grounding_files = scenario.get("grounding_files", [])
     for gf in grounding_files:
         if os.path.exists(gf):
             with open(gf, "r", encoding="utf-8") as f:
                 scenario_grounding += f.read() + "\n"
+            scenario_grounding_files.append(gf)
             logger.info(f"Loaded Scenario Grounding: {gf}")
 
+    # The grounding documents are indexed passage by passage (incrementally, if the session is resumed), so that
+    # agents retrieve what they need, rather than carrying whole files in every prompt
+    grounding_faculty = FilesAndWebGroundingFaculty(folders_paths=[GROUNDING_FOLDER],
+                                                    index_path=str(session_dir / GROUNDING_INDEX_FILE))
+
     # 1. Load & Mix Personas (Casting)
     agent_dir = "personas/agents"
     frag_dir = "personas/fragments"
@@ -543,6 +592,14 @@ def run_tinytruce_simulation(scenario_key, turns, agent_names=None, fragment_nam
                 agent_names.append(select_from_pool(agent_pool, f"Base Agent for Seat {i+1}"))
                 fragment_names.append(select_from_pool(frag_pool, f"Behavior Fragment for Seat {i+1}"))
     
+    # Persist the final casting, so that resuming does not need to ask for it again
+    save_run_config(session_dir, {
+        "scenario_key": scenario_key, "turns": turns, "agent_names": agent_names, "fragment_names": fragment_names,
+        "roast_level": roast_level, "hide_thoughts": hide_thoughts, "monologue": monologue, 
+        "disable_injects": disable_injects, "eco_mode": eco_mode, "verbosity": verbosity, "seed": seed,
+        "spill_dir": spill_dir
+    })
+    
     # While we might have more fragments than agents or vice versa (unlikely via CLI but possible)
     # we'll match them by index.
     participants = []
@@ -579,6 +636,12 @@ def run_tinytruce_simulation(scenario_key, turns, agent_names=None, fragment_nam
         
         person = TinyPerson.load_specification(agent_path, new_agent_name=actual_name)
         
+        # Repeated broadcasts and alerts are kept once, with a repeat count
+        person.episodic_memory.dedup_threshold = NEAR_DUPLICATE_THRESHOLD
+        person.episodic_memory.spill_dir = spill_dir
+
+        person.add_mental_faculty(grounding_faculty)
+        
         # [TINYTRUCE] Redline Aggregation
         person._fragment_redlines = []
         
@@ -619,13 +682,14 @@ def run_tinytruce_simulation(scenario_key, turns, agent_names=None, fragment_nam
                 person.think(f"### LAYER 0: HISTORICAL & PSYCHOLOGICAL GROUNDING ###\n{grounding}\n\nI must act and think with this foundational identity in mind. This is my core baseline.")
                 logger.info(f"Layer 0 Grounding injected for {person.name}")
             
-            if scenario_grounding:
-                person.think(f"### SCENARIO-SPECIFIC INTELLIGENCE: {scenario_key.upper()} ###\n{scenario_grounding}\n\nThis data is specific to the current summit.")
-                logger.info(f"Scenario Grounding injected for {person.name}")
+            # only briefings on the world and scenario documents: their contents are searched for when needed
+            if scenario_grounding_files:
+                person.think(grounding_briefing(f"SCENARIO-SPECIFIC INTELLIGENCE: {scenario_key.upper()}", scenario_grounding_files))
+                logger.info(f"Scenario Grounding briefing injected for {person.name}")
             
-            if global_grounding:
-                person.think(f"### GLOBAL INTELLIGENCE BRIEFING: FEBRUARY 2026 ###\n{global_grounding}\n\nThis is the current state of the world.")
-                logger.info(f"Global Grounding injected for {person.name}")
+            if global_grounding_files:
+                person.think(grounding_briefing("GLOBAL INTELLIGENCE BRIEFING: FEBRUARY 2026", global_grounding_files))
+                logger.info(f"Global Grounding briefing injected for {person.name}")
             
             # Scenario Knowledge Injection (Layer 2.5)
             scenario_intel = scenario.get("scenario_knowledge", "")
@@ -657,6 +721,9 @@ def run_tinytruce_simulation(scenario_key, turns, agent_names=None, fragment_nam
             person.think(sam_prompt)
             logger.info(f"Scenario Allegory Map (SAM) injected for {person.name}")
         
+        # Grounding must survive context window compaction
+        person.episodic_memory.pin()
+        
         participants.append(person)
 
     # Context Caching: Collect all Layer 0 profiles and the Global Grounding
@@ -755,6 +822,12 @@ def run_tinytruce_simulation(scenario_key, turns, agent_names=None, fragment_nam
     peace_intervention.set_turn_buffer(1)
     peace_intervention.set_confidence_threshold(0.7)
     peace_intervention.set_monitor_model("gemini-2.5-flash-lite-preview-09-2025")
+    # a stalemate check that cannot run within the turn is skipped rather than delaying it
+    peace_intervention.set_monitor_deadline(30)
+    # turns full of fresh arguments are not stalemates, so the LLM is only asked once positions start repeating
+    # (every 4th skipped check still goes to the LLM, to keep track of the gate's accuracy)
+    stalemate_gate = RepetitionGate(threshold=0.1, audit_every=4)
+    peace_intervention.set_precondition_gate(stalemate_gate)
     
     world.add_intervention(peace_intervention)
 
@@ -790,17 +863,27 @@ def run_tinytruce_simulation(scenario_key, turns, agent_names=None, fragment_nam
         "[NETWORK FEED: Breaking News Crawl - 'President Defies Tariff Ruling']"
     ]
 
-    # Track which injects have already fired to prevent duplicates
-    fired_injects = set()
+    # Track which injects have already fired to prevent duplicates. This is kept in the world, so that
+    # it is part of the cached simulation state.
+    world._fired_injects = []
     dynamic_injects = scenario.get("dynamic_injects", [])
 
-    for turn in range(turns):
-        if cache_manager:
-            cache_manager.renew_if_needed()
-        
-        # Context Window Elasticity: Prune and summarize if history is too long
-        compress_agent_memory(participants, window_size=8, prune_count=4)
-            
+    # summaries are prepared in the background during a turn, and swapped in at the start of the next one
+    context_manager = ContextWindowManager(background=True,
+                                           summarizer=MemorySummarizer(cache_path=str(session_dir / MEMORY_SUMMARIES_FILE)))
+
+    # [TINYTRUCE] Pacing Layer: Prevent 429 RESOURCE_EXHAUSTED by spacing the starts of consecutive agent calls,
+    # especially in 'detailed' or 'monologue' modes. The next turn is prepared meanwhile.
+    turn_pipeline = TurnPipeline(min_interval=(2 if verbosity == "lean" else 5) if len(participants) > 1 else 0)
+
+    @transactional
+    def run_turn(world, turn):
+        """
+        Runs a single turn of the summit. Turns are the unit of caching: when resuming, completed turns
+        are replayed from the simulation cache rather than executed again.
+        """
+        rng = random.Random(f"{seed}:{turn}")
+
         # Sequential Execution for UX Mode
         header_idx = min(turn // 2, len(narrative_headers) - 1)
         print(f"\n--- {narrative_headers[header_idx]} (Phase {turn + 1}/{turns}) ---")
@@ -808,7 +891,7 @@ def run_tinytruce_simulation(scenario_key, turns, agent_names=None, fragment_nam
         # Check for Dynamic Injects (Mid-Simulation Crisis)
         if not disable_injects:
             for i, inject in enumerate(dynamic_injects):
-                if i in fired_injects:
+                if i in world._fired_injects:
                     continue
                 
                 condition = inject.get("trigger_condition", {})
@@ -816,7 +899,7 @@ def run_tinytruce_simulation(scenario_key, turns, agent_names=None, fragment_nam
                 probability = condition.get("probability", 0.0)
                 
                 # Fire if we reached min turn and beat the probability roll
-                if (turn + 1) >= min_turn and random.random() < probability:
+                if (turn + 1) >= min_turn and rng.random() < probability:
                     print(f"\n[🚨 DYNAMIC INJECT / CRISIS EVENT DETECTED 🚨]")
                     
                     inject_bc = inject["broadcast"]
@@ -829,35 +912,29 @@ def run_tinytruce_simulation(scenario_key, turns, agent_names=None, fragment_nam
                     if hide_thoughts:
                         console.print(Panel(inject_bc, title="DYNAMIC INJECT / CRISIS", border_style="red"))
                     world.broadcast(inject_bc)
-                    fired_injects.add(i)
+                    world._fired_injects.append(i)
                     break # Only fire one inject per turn
 
-        for participant in participants:
-            # Audience Stimulus injection for Monologue Mode
+        def prepare_turn(participant):
+            """
+            Builds the participant's standing directives, and renders its prompt with them ahead of time. It runs in
+            the background while the previous participant's call is in flight, so it must not draw from `rng`,
+            change any agent or call transactional methods: the directives are applied by `act_turn`, in the main
+            thread, which then finds the rendered prompt and its token counts memoized.
+            """
+            directives = {}
             if monologue:
-                seg_idx = min(turn, len(address_segments) - 1)
-                stimulus = random.choice(audience_stimuli)
-                print(f"\n[STIMULUS]: {stimulus}")
-                
-                print(f"\n[CHAPTER {turn+1}]: {address_segments[seg_idx]}")
-                print(f"--- President Trump is taking the podium for Segment {turn+1}... ---")
-                sys.stdout.flush()
-                
                 # Add Hard Constraint for Address Mode
                 constraint = "Constraint: Output exactly 200-300 words. Do not mention this limit. Finish with the DONE action."
                 
-                # Identity Reinforcement (Combat Context Bleed)
+                # Identity Reinforcement (Combat Context Bleed). Standing directives are rendered once in the
+                # system prompt, rather than stored in memory again every turn.
                 if hasattr(participant, "_persona") and "name" in participant._persona:
                     reinforcement = f"REINFORCE IDENTITY: You are {participant._persona['name']}. Focus purely on your specific banned words and syntactic constraints. Clear all technical jargon from other participants from your immediate memory."
-                    participant.think(reinforcement)
-
-                # [TINYTRUCE] Verbosity Pressure: Inject as internal intent to force compliance
-                participant.think(f"### CORE DIRECTIVE: VERBOSITY ###\n{constraint}")
+                    directives["identity"] = reinforcement
 
-                participant.listen_and_act(f"ACTION: Deliver Segment {turn+1} of your address: {address_segments[seg_idx]}\nContext: {stimulus}\n{constraint}")
-                
-                print(f"--- Segment {turn+1} concluded. ---")
-                sys.stdout.flush()
+                # [TINYTRUCE] Verbosity Pressure: Inject as a standing directive to force compliance
+                directives["verbosity"] = f"### CORE DIRECTIVE: VERBOSITY ###\n{constraint}"
             else:
                 # Normal dialogue mode: Dynamic Verbosity Constraint
                 constraint = get_verbosity_constraint(verbosity, turn + 1, total_turns=turns)
@@ -866,10 +943,11 @@ def run_tinytruce_simulation(scenario_key, turns, agent_names=None, fragment_nam
                 others = [p.name for p in participants if p.name != participant.name]
                 others_str = ", ".join(others)
                 
-                # Identity Reinforcement (Combat Context Bleed)
+                # Identity Reinforcement (Combat Context Bleed). Standing directives are rendered once in the
+                # system prompt, rather than stored in memory again every turn.
                 if hasattr(participant, "_persona") and "name" in participant._persona:
                     reinforcement = f"REINFORCE IDENTITY: You are {participant._persona['name']}. Use only your specific persona's allowed vocabulary. Ignore all 'technical' or 'geopolitical' tokens used by other actors."
-                    participant.think(reinforcement)
+                    directives["identity"] = reinforcement
 
                 # Fragment Redline Injection (Layer 2)
                 f_redlines = getattr(participant, "_fragment_redlines", [])
@@ -877,23 +955,50 @@ def run_tinytruce_simulation(scenario_key, turns, agent_names=None, fragment_nam
                     redline_prompt = "### [BANNED BEHAVIORS: FRAGMENT REDLINES] ###\n"
                     redline_prompt += "\n".join([f"- [CONSTRAIN]: {rl}" for rl in f_redlines])
                     redline_prompt += "\n\nCRITICAL: These are hard constraints. Violating these results in immediate tactical failure."
-                    participant.think(redline_prompt)
+                    directives["redlines"] = redline_prompt
 
-                # [TINYTRUCE] Verbosity Pressure: Inject as internal intent to force compliance
-                participant.think(f"### CORE DIRECTIVE: INTERACTIVITY & VERBOSITY ###\n{constraint}\nADVISORY: You are in a high-stakes negotiation.\nCRITICAL: You are NOT here to give a speech. You are here to debate. You MUST explicitly address others by name and rebut their specific arguments. Do not monologue. Engage directly.")
+                # [TINYTRUCE] Verbosity Pressure: Inject as a standing directive to force compliance
+                directives["verbosity"] = f"### CORE DIRECTIVE: INTERACTIVITY & VERBOSITY ###\n{constraint}\nADVISORY: You are in a high-stakes negotiation.\nCRITICAL: You are NOT here to give a speech. You are here to debate. You MUST explicitly address others by name and rebut their specific arguments. Do not monologue. Engage directly."
 
                 address_nudge = f"CRITICAL: Address the arguments made by {others_str} immediately. Use their names. Be forensic and adversarial. {constraint}"
-                participant.think(address_nudge)
-                participant.act()
+                directives["engagement"] = address_nudge
+
+            # the persona, memories and token counts, for the context window check, are the expensive part
+            participant.prepare_prompt(directives)
+
+            return {"directives": directives, "constraint": constraint}
+
+        def act_turn(participant, prepared):
+            participant.set_directives(prepared["directives"])
+
+            # Context Window Elasticity: Summarize and evict old episodes only if prompts exceed the token budget
+            report = context_manager.manage(participant)
+            if report["evicted_episodes"] > 0:
+                print(f"[SYSTEM]: {report['agent']} context archived: {report['evicted_episodes']} episodes "
+                      f"({report['tokens_before']:,} -> {report['tokens_after']:,} of {report['budget']:,} tokens).")
+
+            # Audience Stimulus injection for Monologue Mode
+            if monologue:
+                seg_idx = min(turn, len(address_segments) - 1)
+                stimulus = rng.choice(audience_stimuli)
+                print(f"\n[STIMULUS]: {stimulus}")
+                
+                print(f"\n[CHAPTER {turn+1}]: {address_segments[seg_idx]}")
+                print(f"--- President Trump is taking the podium for Segment {turn+1}... ---")
+                sys.stdout.flush()
                 
-            # [TINYTRUCE] Pacing Layer: Prevent 429 RESOURCE_EXHAUSTED by adding a small cooldown 
-            # between heavy agent actions, especially in 'detailed' or 'monologue' modes.
-            if len(participants) > 1:
-                cooldown = 2 if verbosity == "lean" else 5
-                time.sleep(cooldown)
+                participant.listen_and_act(f"ACTION: Deliver Segment {turn+1} of your address: {address_segments[seg_idx]}\nContext: {stimulus}\n{prepared['constraint']}")
+                
+                print(f"--- Segment {turn+1} concluded. ---")
+                sys.stdout.flush()
+            else:
+                # the prompt is gathered again right before the call, so anything that reached the participant
+                # while its turn was being prepared is included (its system message is only rendered again if
+                # something in it changed meanwhile)
+                participant.act()
             
             # Layer 1.5: Leaky Sarcasm (Internal)
-            if random.random() < 0.12:
+            if rng.random() < 0.12:
                 tonality = "professional"
                 if hasattr(participant, "_persona") and "communication" in participant._persona:
                     tonality = participant._persona["communication"].get("tonality", "professional")
@@ -905,6 +1010,9 @@ def run_tinytruce_simulation(scenario_key, turns, agent_names=None, fragment_nam
                     "DO NOT say this out loud. KEEP IT INTERNAL."
                 )
                 participant.think(quip_prompt)
+
+        # Each participant's turn is prepared while the previous one's call is in flight
+        turn_pipeline.run(participants, prepare_turn, act_turn)
         
         # Display Mood Bars
         print("\n[PSYCHOLOGICAL MOMENTUM]")
@@ -914,9 +1022,36 @@ def run_tinytruce_simulation(scenario_key, turns, agent_names=None, fragment_nam
                 emotion = emotion[:17] + "..."
             
             intensity = agent._mental_state.get("emotional_intensity", 0.5)
-            print(draw_mood_bar(agent.name, emotion, intensity))
+            print(draw_mood_bar(agent.name, emotion, intensity, trend=agent.emotional_trajectory().trend_label()))
         print("------------------------\n")
 
+        context_report = format_context_report(participants)
+        if context_report:
+            print(context_report)
+
+        pipeline_report = turn_pipeline.report()
+        print(f"[PIPELINE]: Phase critical path {pipeline_report['critical_path_seconds']:.1f}s, against "
+              f"{pipeline_report['sequential_seconds']:.1f}s sequentially ({pipeline_report['saved_seconds']:.2f}s saved); "
+              f"{pipeline_report['overlapped_seconds']:.2f}s of turn preparation overlapped with calls in flight.")
+
+    for turn in range(turns):
+        if cache_manager:
+            cache_manager.renew_if_needed()
+        
+        hits_before = control.cache_hits()
+        with request_context(session=session_id):
+            run_turn(world, turn)
+        if control.cache_hits() > hits_before:
+            print(f"[RESUME]: Phase {turn + 1}/{turns} replayed from cache.")
+        
+        # persist every completed turn, so that a crash loses at most the turn in progress
+        control.checkpoint()
+
+    # replayed turns are only decoded on demand, so make sure the final state is in place before the analysis
+    control.materialize()
+    context_manager.close()
+    turn_pipeline.close()
+
 
     # 4. Results Analysis & Extraction (Strategic Auditor)
     print("\n--- Running Strategic Auditor & Briefing Generation ---")
@@ -1024,6 +1159,16 @@ def run_tinytruce_simulation(scenario_key, turns, agent_names=None, fragment_nam
     
     print(f"\n[COST ANALYSIS]: Total Run Cost: ${cost_summary['total_cost']:.6f}")
     print(f"Total Tokens: {cost_summary['total_input_tokens']} in, {cost_summary['total_output_tokens']} out, {cost_summary['total_cached_tokens']} cached.")
+    repairs = cost_summary['response_repairs']
+    print(f"Action messages: {repairs['valid']} valid, {repairs['repaired']} repaired locally, {repairs['retries']} retried, {repairs['failed']} failed.")
+    for priority, stats in dispatcher.report().items():
+        if stats["requests"] or stats["expired"]:
+            print(f"{priority.title()} requests: {stats['requests']} dispatched, {stats['expired']} expired, "
+                  f"{stats['max_wait_seconds']:.1f}s longest wait for a slot.")
+    gate_report = stalemate_gate.report()
+    agreement = "n/a" if gate_report["agreement_rate"] is None else f"{gate_report['agreement_rate']:.0%}"
+    print(f"Stalemate checks: {gate_report['skipped'] - gate_report['audited']} of {gate_report['checks']} skipped locally "
+          f"(agreement with the LLM: {agreement} of {gate_report['judged']} verdicts, {gate_report['false_skips']} false skips).")
     
     results_path = session_dir / "tinytruce_results.json"
     with open(results_path, "w", encoding="utf-8") as f:
@@ -1090,7 +1235,8 @@ def run_tinytruce_simulation(scenario_key, turns, agent_names=None, fragment_nam
             
             bartender.listen(generation_prompt)
             # Use until_done=True to ensure it finishes the thought
-            actions = bartender.act(return_actions=True, until_done=True)
+            with request_context(priority=RequestPriority.ANALYTICS, session=session_id):
+                actions = bartender.act(return_actions=True, until_done=True)
             
             # Extract content from ALL TALK actions
             roast_output_raw = ""
@@ -1151,6 +1297,8 @@ def run_tinytruce_simulation(scenario_key, turns, agent_names=None, fragment_nam
     # Explicit cleanup (No finally required for single-run recovery)
     if cache_manager:
         cache_manager.delete_cache()
+    
+    control.end()
 
 if __name__ == "__main__":
     SCENARIOS = load_scenarios()
@@ -1171,6 +1319,9 @@ if __name__ == "__main__":
     
     output_group = parser.add_argument_group('Output & UX Options')
     output_group.add_argument("--session-id", type=str, default=None, help="Explicit session ID for isolation (Auto-generated if omitted).")
+    output_group.add_argument("--resume", type=str, default=None, metavar="SESSION_ID", help="Resume an interrupted session, replaying completed turns from its simulation cache.")
+    output_group.add_argument("--seed", type=str, default=None, help="Seed for injects and quips (defaults to the session ID).")
+    output_group.add_argument("--spill-dir", type=str, default=None, help="Directory where agents' older episodes are spilled to disk (defaults to the session's 'spill' folder).")
     output_group.add_argument("--roast-level", type=str, choices=["off", "mild", "spicy", "nuclear"], default="spicy", help="Set the intensity of the Roast Recap (or 'off' to disable).")
     output_group.add_argument("--verbosity", type=str, choices=["lean", "detailed", "monologue", "dynamic"], default="dynamic", help="Control the length and depth of agent responses.")
     output_group.add_argument("--hide-thoughts", action="store_true", help="UX Mode: Hide internal agent thinking blocks for a cinematic feed.")
@@ -1180,6 +1331,12 @@ if __name__ == "__main__":
     
     args = parser.parse_args()
     
+    if args.resume:
+        # the original arguments are restored from the session, so that the replay matches the cache
+        run_config = load_run_config(args.resume)
+        run_tinytruce_simulation(**run_config, session_id=args.resume, resume=True)
+        sys.exit(0)
+    
     run_tinytruce_simulation(
         args.scenario, 
         args.turns, 
@@ -1191,5 +1348,7 @@ if __name__ == "__main__":
         args.disable_injects,
         args.eco_mode,
         args.verbosity,
-        args.session_id
+        args.session_id,
+        seed=args.seed,
+        spill_dir=args.spill_dir
     )